@@ -1,8 +1,14 @@
 from .agents import AIAgent
 from .agents import GeneralAgent
-from .strategies import OpenAIStrategy
-from .strategies import AnthropicStrategy
 from .strategies import DummyStrategy
 from .functions import list_all_projects
+from .settings import Settings, get_settings
 
-__all__ = ['AIAgent', 'GeneralAgent', 'OpenAIStrategy', 'AnthropicStrategy', 'DummyStrategy', 'list_all_projects']
\ No newline at end of file
+def __getattr__(name):
+    # Provider strategies import their SDK, so they are only loaded when asked for
+    if name in ('OpenAIStrategy', 'AnthropicStrategy'):
+        from . import strategies
+        return getattr(strategies, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = ['AIAgent', 'GeneralAgent', 'OpenAIStrategy', 'AnthropicStrategy', 'DummyStrategy', 'list_all_projects', 'Settings', 'get_settings']
\ No newline at end of file
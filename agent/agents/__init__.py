@@ -1,4 +1,5 @@
 from .ai_agent import AIAgent
 from .general_agent import GeneralAgent
+from .project_cache import ProjectAgentCache
 
-__all__ = ['AIAgent', 'GeneralAgent']
\ No newline at end of file
+__all__ = ['AIAgent', 'GeneralAgent', 'ProjectAgentCache']
\ No newline at end of file
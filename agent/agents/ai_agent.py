@@ -1,25 +1,35 @@
-from typing import Optional, List, Dict, Callable, Any
+import asyncio
+import concurrent.futures
+from typing import Optional, List, Dict, Callable, Any, Sequence
 from abc import ABC, abstractmethod
-from dotenv import load_dotenv
-import os
-from ..strategies import OpenAIStrategy, AnthropicStrategy, AIStrategy, DummyStrategy
+from ..strategies import AIStrategy, DummyStrategy, HedgedStrategy
+from ..settings import get_settings
 from ..logger_config import logger
+from ..telemetry import Telemetry
+from .context_window import ContextWindow
 
 class AIAgent(ABC):
-    def __init__(self):
+    def __init__(self, env: Optional[Dict[str, Any]] = None):
         self.strategy: Optional[AIStrategy] = None
         self.on_stream: Optional[Callable[[str], None]] = None
         self.chat_history: List[Dict[str, str]] = []
         self.tools: Dict[str, Dict[str, Any]] = {}
+        self.context = ContextWindow()
+        # The system prompt may depend on the environment, so it is set first
+        self.env = env or {}
+        self.on_change: Optional[Callable[[object], None]] = None
+        self.use_response_cache = True
         self.init_chat_history()
         self._register_tools()
-        self.env = {}
-        self.on_change: Optional[Callable[[object], None]] = None
 
     def set_change_callback(self, callback: Callable[[object], None]):
         self.on_change = callback
     
-    def _register_tools() -> str:
+    def _register_tools(self) -> None:
+        pass
+
+    def _prepare_turn(self) -> None:
+        """Called before each turn, e.g. to refresh context in the system prompt"""
         pass
 
     def environment_setup(self, env) -> str:
@@ -44,7 +54,9 @@ class AIAgent(ABC):
         """
         pass
 
-    def register_tool(self, name: str, func: Callable, description: str, input_schema: Dict[str, Any]) -> None:
+    def register_tool(self, name: str, func: Callable, description: str, input_schema: Dict[str, Any],
+                      idempotent: bool = False, ttl: Optional[float] = None, key: Optional[Sequence[str]] = None,
+                      invalidated_by: Sequence[str] = ()) -> None:
         """
         Register a new tool that can be used by the AI agent.
         
@@ -53,25 +65,40 @@ class AIAgent(ABC):
             func: The function to be called when the tool is used
             description: A description of what the tool does
             input_schema: JSON schema describing the expected input format
+            idempotent: Whether repeated calls with the same arguments may be served from the tool cache
+            ttl: Seconds a cached result stays valid (no limit if None)
+            key: Names of the arguments that determine the result (all arguments if None)
+            invalidated_by: Events that drop the cached results, see ``ToolCache.invalidate_all``
         """
+        if not idempotent and (ttl is not None or key is not None or invalidated_by):
+            raise ValueError(f"Tool {name}: ttl, key and invalidated_by only apply to idempotent tools")
         self.tools[name] = {
             "function": func,
             "description": description,
-            "input_schema": input_schema
+            "input_schema": input_schema,
+            "idempotent": idempotent,
+            "ttl": ttl,
+            "key": list(key) if key is not None else None,
+            "invalidated_by": tuple(invalidated_by)
         }
 
     def initialize_strategy(self) -> None:
-        load_dotenv()
-        
-        anthropic_key = os.getenv('ANTHROPIC_API_KEY')
-        openai_key = os.getenv('OPENAI_API_KEY')
-        debug = os.getenv('DEBUG')
+        settings = get_settings()
+        anthropic_key = settings.anthropic_api_key
+        openai_key = settings.openai_api_key
         
-        if debug == "True":
+        # Provider strategies are imported here so only the selected SDKs are loaded
+        if settings.debug:
             self.strategy = DummyStrategy("")
-        elif anthropic_key and anthropic_key.strip():
+        elif settings.hedge_requests and anthropic_key and openai_key:
+            from ..strategies import AnthropicStrategy, OpenAIStrategy
+            # Race both providers when a turn is slow to start, and fail over on errors
+            self.strategy = HedgedStrategy([AnthropicStrategy(anthropic_key), OpenAIStrategy(openai_key)])
+        elif anthropic_key:
+            from ..strategies import AnthropicStrategy
             self.strategy = AnthropicStrategy(anthropic_key)
-        elif openai_key and openai_key.strip():
+        elif openai_key:
+            from ..strategies import OpenAIStrategy
             self.strategy = OpenAIStrategy(openai_key)
         else:
             logger.error("No valid API keys found")
@@ -80,6 +107,8 @@ class AIAgent(ABC):
         if hasattr(self.strategy, 'on_stream'):
             self.strategy.on_stream = self.on_stream
         
+        self.strategy.use_response_cache = self.use_response_cache
+        
         # Pass tools to strategy
         if self.tools and hasattr(self.strategy, 'set_tools'):
             self.strategy.set_tools(self.tools)
@@ -102,7 +131,37 @@ class AIAgent(ABC):
         if not self.strategy:
             self.initialize_strategy()
         
+        self._prepare_turn()
+        self.add_message("user", message)
+        try:
+            with Telemetry.get().turn(self.strategy, model or self.strategy.default_model):
+                messages = self.context.build(self.chat_history, model or self.strategy.default_model)
+                response = self.strategy.chat(messages, model)
+        except (asyncio.CancelledError, concurrent.futures.CancelledError):
+            # Cancelled on the runtime loop (see AIStrategy.cancel_current_stream); as in achat
+            self.chat_history.pop()
+            raise
+        self.add_message("assistant", response)
+        return response
+
+    async def achat(self, message: str, model: Optional[str] = None) -> str:
+        """Process a single message on the strategy runtime loop and return the response."""
+        if not self.strategy:
+            self.initialize_strategy()
+        
+        # Refreshing the prompt and fitting the context can read indexes and count tokens;
+        # both run on a worker thread so other turns on the loop keep streaming
+        await asyncio.to_thread(self._prepare_turn)
         self.add_message("user", message)
-        response = self.strategy.chat(self.chat_history, model)
+        try:
+            with Telemetry.get().turn(self.strategy, model or self.strategy.default_model):
+                messages = await asyncio.to_thread(
+                    self.context.build, self.chat_history, model or self.strategy.default_model
+                )
+                response = await self.strategy.achat(messages, model)
+        except asyncio.CancelledError:
+            # Leave no unanswered user message behind for the next turn
+            self.chat_history.pop()
+            raise
         self.add_message("assistant", response)
         return response
\ No newline at end of file
@@ -0,0 +1,149 @@
+from typing import List, Dict, Optional
+from ..logger_config import logger
+from ..settings import get_settings
+
+# Approximate context sizes (in tokens) for the models the strategies use.
+# Prefix matching keeps dated model names working without listing each one.
+MODEL_CONTEXT_LIMITS: Dict[str, int] = {
+    "claude": 200000,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5": 16385,
+}
+
+DEFAULT_CONTEXT_LIMIT = 8192
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token plus per-message overhead)"""
+    return len(text) // 4 + 4
+
+
+class ContextWindow:
+    """Token-budgeted view over an agent's chat history.
+
+    The full history is never modified; ``build`` returns the messages that
+    should be sent for the next turn. System messages are always kept, older
+    turns are evicted once the budget is exceeded and folded into a rolling
+    summary that is appended to the system prompt.
+
+    The budget is the model's context size (``MODEL_CONTEXT_LIMITS``) less
+    ``reserve_tokens`` for the reply, capped at ``max_tokens`` if that is
+    set (``CONTEXT_MAX_TOKENS``, unset by default).
+
+    Eviction happens in blocks: when the window overflows it shrinks to
+    ``low_water`` of the budget, so the front of the window (and therefore the
+    provider-side prompt prefix) stays stable for several turns.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        reserve_tokens: int = 1000,
+        low_water: float = 0.6,
+        summary_tokens: int = 600,
+        summary_line_chars: int = 160,
+    ):
+        self.max_tokens = max_tokens if max_tokens is not None else get_settings().context_max_tokens
+        self.reserve_tokens = reserve_tokens
+        self.low_water = low_water
+        self.summary_tokens = summary_tokens
+        self.summary_line_chars = summary_line_chars
+        self._token_cache: Dict[str, int] = {}
+        self._summary_lines: List[str] = []
+        self._summary_tokens_used = 0
+        self._window_start = 0
+        self._history_id: Optional[int] = None
+
+    def budget_for(self, model: Optional[str]) -> int:
+        """Token budget for history on the given model"""
+        limit = DEFAULT_CONTEXT_LIMIT
+        if model:
+            for prefix, size in MODEL_CONTEXT_LIMITS.items():
+                if model.startswith(prefix):
+                    limit = size
+                    break
+        budget = limit - self.reserve_tokens
+        if self.max_tokens:
+            budget = min(budget, self.max_tokens)
+        return max(budget, 0)
+
+    def count(self, message: Dict[str, str]) -> int:
+        """Token count of a message, cached by content"""
+        content = message["content"]
+        tokens = self._token_cache.get(content)
+        if tokens is None:
+            tokens = estimate_tokens(content)
+            self._token_cache[content] = tokens
+        return tokens
+
+    @property
+    def summary(self) -> str:
+        return "\n".join(self._summary_lines)
+
+    def reset(self) -> None:
+        """Forget the window position and summary (e.g. after the history is replaced)"""
+        self._summary_lines = []
+        self._summary_tokens_used = 0
+        self._window_start = 0
+        self._token_cache.clear()
+
+    def build(self, history: List[Dict[str, str]], model: Optional[str] = None) -> List[Dict[str, str]]:
+        """Return the messages to send for the next turn"""
+        if id(history) != self._history_id or self._window_start > len(history):
+            self.reset()
+            self._history_id = id(history)
+
+        system = history[:self._leading_system(history)]
+        first_turn = len(system)
+        start = max(self._window_start, first_turn)
+        budget = self.budget_for(model)
+
+        fixed = sum(self.count(m) for m in system) + self._summary_tokens_used
+        used = fixed + sum(self.count(m) for m in history[start:])
+
+        if used > budget and start < len(history) - 1:
+            target = fixed + int((budget - fixed) * self.low_water)
+            new_start = start
+            # Drop from the front until under the low-water mark, always keeping
+            # the newest message and starting the window on a user turn
+            while new_start < len(history) - 1 and used > target:
+                used -= self.count(history[new_start])
+                new_start += 1
+            while new_start < len(history) - 1 and history[new_start]["role"] != "user":
+                new_start += 1
+            self._summarize(history[start:new_start], min(self.summary_tokens, budget // 4))
+            logger.info(f"Context window evicted {new_start - start} messages (window starts at {new_start})")
+            start = new_start
+
+        self._window_start = start
+        messages = [dict(m) for m in system]
+        if self._summary_lines:
+            note = f"\n\n## Summary of earlier conversation\n{self.summary}"
+            if messages:
+                messages[-1]["content"] += note
+            else:
+                messages.append({"role": "system", "content": note.lstrip()})
+        messages.extend(history[start:])
+        return messages
+
+    def _leading_system(self, history: List[Dict[str, str]]) -> int:
+        index = 0
+        while index < len(history) and history[index]["role"] == "system":
+            index += 1
+        return index
+
+    def _summarize(self, evicted: List[Dict[str, str]], limit: int) -> None:
+        """Fold evicted messages into the rolling summary, oldest lines dropped first"""
+        for message in evicted:
+            self._token_cache.pop(message["content"], None)
+            text = " ".join(message["content"].split())
+            if len(text) > self.summary_line_chars:
+                text = text[:self.summary_line_chars - 3].rstrip() + "..."
+            line = f"- {message['role']}: {text}"
+            self._summary_lines.append(line)
+            self._summary_tokens_used += estimate_tokens(line)
+
+        while self._summary_lines and self._summary_tokens_used > limit:
+            self._summary_tokens_used -= estimate_tokens(self._summary_lines.pop(0))
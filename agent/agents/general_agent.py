@@ -1,6 +1,6 @@
 from .ai_agent import AIAgent
-from ..functions import list_all_projects, open_project
-from .project_agent import ProjectAgent
+from ..functions import PROJECTS_CHANGED, list_all_projects, search_history
+from .project_cache import ProjectAgentCache
 
 class GeneralAgent(AIAgent):
     def init_chat_history(self):
@@ -26,16 +26,20 @@ Returns:
                 "type": "object",
                 "properties": {},
                 "required": []
-            }
+            },
+            idempotent=True,
+            ttl=300,
+            invalidated_by=(PROJECTS_CHANGED,)
         )
         self.register_tool(
             name="open_project",
-            func=open_project,
+            func=self.open_project,
             description="""Open a project in Visual Studio Code.
 
 This function loads the environment variable 'PROJECTS' to determine
 the directory where projects are stored. It then opens the specified
-project directory in VS Code.
+project directory in VS Code and continues the conversation with the
+project's agent, which remembers earlier conversations about it.
 
 Args:
     project_name: Name of the project directory to open
@@ -53,11 +57,35 @@ Raises:
                 "required": ["project_name"]
             }
         )
+        self.register_tool(
+            name="search_history",
+            func=search_history,
+            description="""Search earlier chat sessions.
+
+Use this before answering questions that may already have been discussed
+in a previous conversation. Returns the best matching messages, ranked by
+relevance, with the session file and date they come from.
+
+Args:
+    query: Words to search for
+    limit: Maximum number of results (default 5)
+
+Returns:
+    str: Ranked snippets of matching messages""",
+            input_schema={
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string"},
+                    "limit": {"type": "integer"}
+                },
+                "required": ["query"]
+            },
+            idempotent=True,
+            ttl=60
+        )
 
-    def open_project(self, project_name: str):
-        open_project(project_name)
-        project_agent = ProjectAgent(self.env)
-        self.on_change(project_agent)
+    def open_project(self, project_name: str) -> str:
+        return ProjectAgentCache.shared().open(project_name, self)
         
     def system_prompt(self) -> str:
         return """# ALFRED is an AI agent designed to assist with research, engineering, and development projects. It has the following core capabilities:
@@ -80,5 +108,6 @@ Raises:
 - When not given a specific command, ALFRED can engage in open-ended conversation and provide knowledgeable answers on a wide range of topics.
 - Maintains context of the current conversation and task to provide relevant and helpful information.
 - Has broad knowledge spanning computer science, software engineering, math, science, and technology that it can draw upon.
+- Can search earlier conversations with tool use, to pick up questions that were already answered.
 
 ALFRED aims to be a capable and personable assistant to enhance your productivity in software development and research pursuits. Let me know how I can help!"""
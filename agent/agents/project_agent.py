@@ -1,5 +1,15 @@
+import time
+from functools import partial
+from typing import Optional
 from .ai_agent import AIAgent
-from ..functions import list_all_projects, open_project
+from ..functions import (
+    PROJECTS_CHANGED, get_code_index, get_symbol_index, list_all_projects, lookup_symbol, search_code
+)
+from ..functions.codebase import SymbolIndex
+from ..settings import get_settings
+
+# Seconds between checks of the project files for changes, at most once per turn
+INDEX_REFRESH_INTERVAL = 30.0
 
 class ProjectAgent(AIAgent):
     def init_chat_history(self):
@@ -8,7 +18,122 @@ class ProjectAgent(AIAgent):
             {"role": "assistant", "content": f"Hello! Type your message and press Enter. Press Escape to exit. {self.env}"}
         ]
 
+    def _register_tools(self):
+        """Register the tools of a project agent; projects can be listed and switched from here too."""
+        self.register_tool(
+            name="list_all_projects",
+            func=list_all_projects,
+            description="""Retrieve a list of all project directories.
+
+Returns:
+    list: A list of project directory names.""",
+            input_schema={
+                "type": "object",
+                "properties": {},
+                "required": []
+            },
+            idempotent=True,
+            ttl=300,
+            invalidated_by=(PROJECTS_CHANGED,)
+        )
+        self.register_tool(
+            name="open_project",
+            func=self.open_project,
+            description="""Open another project in Visual Studio Code and continue the
+conversation with that project's agent.
+
+Args:
+    project_name: Name of the project directory to open
+
+Returns:
+    str: Success message if project opened successfully""",
+            input_schema={
+                "type": "object",
+                "properties": {"project_name": {"type": "string"}},
+                "required": ["project_name"]
+            }
+        )
+        project_path = self.env.get("project_path")
+        if project_path:
+            self.register_tool(
+                name="lookup_symbol",
+                func=partial(lookup_symbol, project_path),
+                description="""Find where a class, function, method or constant of this project is defined.
+
+Args:
+    name: Symbol name, optionally qualified (e.g. 'ChatUI.update_current_message')
+    limit: Maximum number of definitions (default 5)
+
+Returns:
+    str: Matching definitions with file, line and signature, and the source of the best match""",
+                input_schema={
+                    "type": "object",
+                    "properties": {
+                        "name": {"type": "string"},
+                        "limit": {"type": "integer"}
+                    },
+                    "required": ["name"]
+                }
+            )
+            self.register_tool(
+                name="search_code",
+                func=partial(search_code, project_path),
+                description="""Search the files of this project for words and identifiers, ranked by relevance.
+
+Use it to find where something is used or mentioned; use lookup_symbol to find definitions.
+
+Args:
+    query: Words or identifiers to look for; camelCase and snake_case names also match their parts
+    limit: Maximum number of files (default 10)
+
+Returns:
+    str: Matching files, best first, each with its best matching lines as path:line: text""",
+                input_schema={
+                    "type": "object",
+                    "properties": {
+                        "query": {"type": "string"},
+                        "limit": {"type": "integer"}
+                    },
+                    "required": ["query"]
+                }
+            )
+            # Build the search index alongside the symbol index, so the first search finds it ready
+            get_code_index(project_path)
+
+    def open_project(self, project_name: str) -> str:
+        # Imported here: the cache builds ProjectAgents itself
+        from .project_cache import ProjectAgentCache
+        return ProjectAgentCache.shared().open(project_name, self)
+
+    def _symbol_index(self) -> Optional[SymbolIndex]:
+        project_path = self.env.get("project_path")
+        return get_symbol_index(project_path) if project_path else None
+
+    def _prepare_turn(self) -> None:
+        """Pick up code changes: refresh the indexes in the background and the outline in the prompt"""
+        index = self._symbol_index()
+        if index is None:
+            return
+        for project_index in (index, get_code_index(self.env["project_path"])):
+            if project_index.updated_at and time.monotonic() - project_index.updated_at > INDEX_REFRESH_INTERVAL:
+                project_index.start_update()
+        # Only a changed outline replaces the system prompt, which keeps the provider's prompt cache warm
+        prompt = self.system_prompt()
+        if self.chat_history and self.chat_history[0]["content"] != prompt:
+            self.chat_history[0] = {"role": "system", "content": prompt}
+
+    def project_outline(self) -> str:
+        index = self._symbol_index()
+        if index is None:
+            return ""
+        outline = index.outline(get_settings().project_outline_tokens)
+        if not outline and not index.updated_at:
+            return "The project's code is being indexed; use the lookup_symbol tool to find definitions."
+        return outline
+
     def system_prompt(self) -> str:
+        outline = self.project_outline()
+        outline = f"\n## Project outline:\n{outline}\n" if outline else ""
         return f"""# ALFRED is an AI agent designed to assist with research, engineering, and development projects. It has the following core capabilities:
 
 ## Projects:
@@ -18,5 +143,5 @@ class ProjectAgent(AIAgent):
 - Can list all projects with tool use.
 
 {self.env}
-
+{outline}
 ALFRED aims to be a capable and personable assistant to enhance your productivity in software development and research pursuits. Let me know how I can help!"""
@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import quote
+from ..functions import launch_project, resolve_project
+from ..logger_config import logger
+from ..settings import get_settings
+from .ai_agent import AIAgent
+from .project_agent import ProjectAgent
+
+
+class ProjectAgentCache:
+    """Per-project agents that survive switching between projects.
+
+    ``get`` hands back the agent a project had the last time it was open,
+    with its chat history and strategy (client, tool cache, context window),
+    so reattaching costs a dictionary lookup. At most ``max_warm`` agents are
+    kept (``PROJECT_AGENTS_WARM``); the least recently used one is reduced to
+    a compact JSON snapshot of its conversation in ``directory`` and rebuilt
+    from it when its project is opened again, also after a restart.
+    """
+
+    _shared: Optional["ProjectAgentCache"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        agent_factory: Callable[[Dict[str, Any]], AIAgent] = ProjectAgent,
+        directory: str = os.path.join(".cache", "projects"),
+        max_warm: Optional[int] = None,
+    ):
+        self.agent_factory = agent_factory
+        self.directory = directory
+        self.max_warm = max_warm if max_warm is not None else get_settings().project_agents_warm
+        self._warm: "OrderedDict[str, AIAgent]" = OrderedDict()  # Least recently used first
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.restores = 0
+        self.builds = 0
+
+    @classmethod
+    def shared(cls) -> "ProjectAgentCache":
+        """Process-wide cache instance"""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    def _snapshot_path(self, project: str) -> str:
+        return os.path.join(self.directory, f"{quote(project, safe='')}.json")
+
+    def get(self, project: str, env: Dict[str, Any]) -> AIAgent:
+        """The agent of ``project``: warm if recently used, else restored from its snapshot or new"""
+        with self._lock:
+            agent = self._warm.get(project)
+            if agent is not None:
+                self._warm.move_to_end(project)
+                self.hits += 1
+                return agent
+
+            started = time.perf_counter()
+            agent = self.agent_factory(env)
+            snapshot = self._load(project)
+            if snapshot is not None:
+                # The system prompt is rebuilt from env; the rest is the conversation
+                agent.chat_history[1:] = snapshot["history"]
+                self.restores += 1
+            else:
+                self.builds += 1
+            self._warm[project] = agent
+            self._evict()
+        logger.info(
+            f"{'Restored' if snapshot is not None else 'Built'} agent for project {project} "
+            f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        return agent
+
+    def open(self, project_name: str, opener: AIAgent) -> str:
+        """Open a project in VS Code and hand ``opener``'s conversation over to the project's agent.
+
+        Without a change callback on ``opener`` (e.g. in the headless server)
+        only the project is opened.
+        """
+        project, path, candidates = resolve_project(project_name)
+        result = launch_project(project, path, candidates)
+        if opener.on_change:
+            agent = self.get(project, {**opener.env, "project": project, "project_path": path})
+            opener.on_change(agent)
+        return result
+
+    def _load(self, project: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._snapshot_path(project), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable snapshot of project {project}: {e}")
+            return None
+
+    def _save(self, project: str, agent: AIAgent) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        data = {"project": project, "saved": time.time(), "history": agent.chat_history[1:]}
+        path = self._snapshot_path(project)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def _evict(self) -> None:
+        while len(self._warm) > self.max_warm:
+            project, agent = self._warm.popitem(last=False)
+            try:
+                self._save(project, agent)
+            except OSError as e:
+                logger.error(f"Could not snapshot agent of project {project}: {e}")
+
+    def shutdown(self) -> None:
+        """Snapshot every warm agent, so their conversations survive a restart"""
+        with self._lock:
+            for project, agent in self._warm.items():
+                try:
+                    self._save(project, agent)
+                except OSError as e:
+                    logger.error(f"Could not snapshot agent of project {project}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"warm": len(self._warm), "hits": self.hits, "restores": self.restores, "builds": self.builds}
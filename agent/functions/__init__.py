@@ -1,3 +1,8 @@
-from .projects import list_all_projects, open_project
+from .projects import PROJECTS_CHANGED, launch_project, list_all_projects, open_project, resolve_project
+from .history import get_history_index, search_history
+from .codebase import get_code_index, get_symbol_index, lookup_symbol, search_code
 
-__all__ = ['list_all_projects', 'open_project']
\ No newline at end of file
+__all__ = [
+    'PROJECTS_CHANGED', 'launch_project', 'list_all_projects', 'open_project', 'resolve_project', 'search_history',
+    'get_code_index', 'get_history_index', 'get_symbol_index', 'lookup_symbol', 'search_code'
+]
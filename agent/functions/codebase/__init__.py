@@ -0,0 +1,6 @@
+from .code_index import CodeSearchIndex, get_code_index
+from .lookup import lookup_symbol
+from .search import search_code
+from .symbols import SymbolIndex, get_symbol_index
+
+__all__ = ['CodeSearchIndex', 'SymbolIndex', 'get_code_index', 'get_symbol_index', 'lookup_symbol', 'search_code']
@@ -0,0 +1,580 @@
+import hashlib
+import heapq
+import math
+import mmap
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+from agent.logger_config import logger
+from .files import TEXT_EXTENSIONS, iter_source_files, map_files
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|[0-9]+")
+# Parts of camelCase, PascalCase, snake_case and ACRONYMWords identifiers
+_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+MAX_TERM = 64
+
+
+def _terms(words: Counter) -> Counter:
+    """Lower-cased words plus the parts of compound identifiers, with their counts"""
+    terms: Counter = Counter()
+    for word, count in words.items():
+        if len(word) > MAX_TERM:
+            continue
+        terms[word.lower()] += count
+        parts = _PART.findall(word)
+        if len(parts) > 1:
+            for part in parts:
+                terms[part.lower()] += count
+    return terms
+
+
+def tokenize(text: str) -> List[str]:
+    """Distinct search terms of ``text`` in order of appearance"""
+    return list(dict.fromkeys(_terms(Counter(_WORD.findall(text)))))
+
+
+def _tokenize_file(job: Tuple[str, str, Optional[str]]) -> Tuple[str, Optional[str], Optional[List[Tuple[str, int]]], int]:
+    """``(path, content hash, term counts, length)`` of a file; term counts are None if the hash is unchanged.
+
+    Runs in worker processes, so it only takes and returns plain data.
+    """
+    path, full_path, known_hash = job
+    try:
+        with open(full_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return path, None, None, 0
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    if digest == known_hash:
+        return path, digest, None, 0
+    words = Counter(_WORD.findall(data.decode("utf-8", errors="replace")))
+    # The path counts as content too, so "tool cache" finds tool_cache.py
+    words.update(_WORD.findall(path))
+    terms = _terms(words)
+    return path, digest, list(terms.items()), sum(terms.values())
+
+
+class _SegmentWriter:
+    """Postings of the documents added since the last segment was written"""
+
+    def __init__(self, first_doc: int):
+        self.first_doc = first_doc
+        self.next_doc = first_doc
+        self.postings: Dict[str, Tuple[array, array]] = {}
+
+    @property
+    def docs(self) -> int:
+        return self.next_doc - self.first_doc
+
+    def add(self, terms: List[Tuple[str, int]]) -> int:
+        doc = self.next_doc
+        self.next_doc += 1
+        postings = self.postings
+        for term, count in terms:
+            entry = postings.get(term)
+            if entry is None:
+                entry = postings[term] = (array("I"), array("I"))
+            entry[0].append(doc)
+            entry[1].append(count)
+        return doc
+
+    def write(self, path: str) -> List[Tuple[str, int, int]]:
+        """Write the postings file; return ``(term, offset, count)`` for the lexicon"""
+        return _write_postings(path, ((term, *self.postings[term]) for term in sorted(self.postings)))
+
+
+def _write_postings(path: str, postings) -> List[Tuple[str, int, int]]:
+    """Write ``(term, doc ids, counts)`` as each term's doc ids followed by its counts (uint32)"""
+    lexicon = []
+    offset = 0
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        for term, docs, counts in postings:
+            if not docs:
+                continue
+            docs.tofile(f)
+            counts.tofile(f)
+            lexicon.append((term, offset, len(docs)))
+            offset += 8 * len(docs)
+    os.replace(tmp_path, path)
+    return lexicon
+
+
+@dataclass
+class CodeHit:
+    path: str
+    score: float
+    lines: List[Tuple[int, str]] = field(default_factory=list)
+
+
+class CodeSearchIndex:
+    """BM25 full-text index over a project's source, documentation and configuration files.
+
+    Files are split into terms (identifiers, lower-cased, plus the parts of
+    camelCase and snake_case names) in a process pool. Their postings, the
+    documents and counts per term, are written to immutable segment files
+    of at most ``segment_docs`` documents each; the lexicon mapping every
+    term to its offset in a segment lives in SQLite next to the files table.
+    Queries memory-map the segments, so only the postings of the query terms
+    are read and the index never has to fit in memory.
+
+    ``update`` works like ``SymbolIndex.update``: unchanged files cost a
+    ``stat``, and changed files go into a new segment while their old
+    documents are marked deleted. Once there are more than ``max_segments``
+    segments the smallest ones are merged, dropping deleted documents.
+
+    Terms found in more than ``common_fraction`` of all files (``self``,
+    ``return``) only add to the scores of files that match a rarer term;
+    their weight is small anyway and scoring them everywhere would dominate
+    the query time. Queries made only of such terms rank the
+    ``recent_window`` most recently indexed files containing the rarest one.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        directory: Optional[str] = None,
+        workers: Optional[int] = None,
+        parallel_threshold: int = 512,
+        segment_docs: int = 10000,
+        max_segments: int = 12,
+        common_fraction: float = 0.05,
+        recent_window: int = 10000,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.root = os.path.abspath(root)
+        if directory is None:
+            digest = hashlib.blake2b(os.path.normcase(self.root).encode("utf-8"), digest_size=8).hexdigest()
+            name = re.sub(r"[^\w.-]", "_", os.path.basename(self.root)) or "root"
+            directory = os.path.join(".cache", "code_search", f"{name}-{digest}")
+        self.directory = directory
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.parallel_threshold = parallel_threshold
+        self.segment_docs = segment_docs
+        self.max_segments = max_segments
+        self.common_fraction = common_fraction
+        self.recent_window = recent_window
+        self.k1 = k1
+        self.b = b
+        self.updated_at = 0.0  # time.monotonic() of the last finished update
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._update_lock = threading.Lock()
+        self._maps: Dict[int, mmap.mmap] = {}
+        # Per document id: length in terms, BM25 length normalization and whether it is live
+        self._lengths = array("I")
+        self._norms = array("d")
+        self._live = bytearray()
+        self._live_docs = 0
+        self._total_length = 0
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"segment-{segment}.postings")
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, "
+                "hash TEXT NOT NULL, doc_id INTEGER NOT NULL, length INTEGER NOT NULL)"
+            )
+            self._db.execute("CREATE UNIQUE INDEX IF NOT EXISTS files_doc ON files(doc_id)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS segments ("
+                "id INTEGER PRIMARY KEY, docs INTEGER NOT NULL, first_doc INTEGER NOT NULL, last_doc INTEGER NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS terms ("
+                "term TEXT NOT NULL, segment INTEGER NOT NULL, offset INTEGER NOT NULL, count INTEGER NOT NULL, "
+                "PRIMARY KEY (term, segment)) WITHOUT ROWID"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._load()
+        return self._db
+
+    def _load(self) -> None:
+        """Map the segments and read the document lengths of an existing index"""
+        try:
+            for (segment,) in self._db.execute("SELECT id FROM segments").fetchall():
+                self._map(segment)
+        except OSError as e:
+            logger.warning(f"Rebuilding the code search index of {self.root}: {e}")
+            for data in self._maps.values():
+                data.close()
+            self._maps.clear()
+            with self._db:
+                for table in ("files", "segments", "terms", "meta"):
+                    self._db.execute(f"DELETE FROM {table}")
+        self._live_docs = 0
+        self._total_length = 0
+        next_doc = self._meta("next_doc")
+        self._lengths = array("I", bytes(4 * next_doc))
+        self._live = bytearray(next_doc)
+        for doc_id, length in self._db.execute("SELECT doc_id, length FROM files"):
+            self._lengths[doc_id] = length
+            self._live[doc_id] = 1
+            self._live_docs += 1
+            self._total_length += length
+        self._normalize()
+
+    def _meta(self, key: str) -> int:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _map(self, segment: int) -> None:
+        with open(self._segment_path(segment), "rb") as f:
+            if os.fstat(f.fileno()).st_size:
+                self._maps[segment] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _normalize(self) -> None:
+        """Recompute the BM25 length normalization ``k1 * (1 - b + b * length / average length)``"""
+        average = self._total_length / self._live_docs if self._live_docs else 1.0
+        scale = self.k1 * self.b / (average or 1.0)
+        base = self.k1 * (1 - self.b)
+        self._norms = array("d", [base + scale * length for length in self._lengths])
+
+    def update(self) -> int:
+        """Index new and changed files, drop deleted ones; return the number of files (re)indexed.
+
+        Concurrent calls do not queue up: a call made while another update
+        runs returns 0 straight away.
+        """
+        if not self._update_lock.acquire(blocking=False):
+            return 0
+        try:
+            return self._update()
+        finally:
+            self.updated_at = time.monotonic()
+            self._update_lock.release()
+
+    def _update(self) -> int:
+        started = time.perf_counter()
+        with self._lock:
+            known: Dict[str, Tuple[int, int, str, int]] = {
+                path: (mtime_ns, size, digest, doc_id)
+                for path, mtime_ns, size, digest, doc_id
+                in self._connection().execute("SELECT path, mtime_ns, size, hash, doc_id FROM files")
+            }
+            next_doc = self._meta("next_doc")
+
+        stats: Dict[str, Tuple[int, int]] = {}
+        jobs: List[Tuple[str, str, Optional[str]]] = []
+        for path, full_path, stat in iter_source_files(self.root, extensions=TEXT_EXTENSIONS):
+            stats[path] = (stat.st_mtime_ns, stat.st_size)
+            previous = known.get(path)
+            if previous is None or previous[:2] != stats[path]:
+                jobs.append((path, full_path, previous[2] if previous else None))
+        deleted = known.keys() - stats.keys()
+
+        indexed = 0
+        writer = _SegmentWriter(next_doc)
+        rows: List[Tuple[str, int, int, str, int, int]] = []
+        touched: List[Tuple[int, int, str]] = []
+        for batch in map_files(_tokenize_file, jobs, self.workers, self.parallel_threshold):
+            for path, digest, terms, length in batch:
+                if digest is None:
+                    continue
+                if terms is None:
+                    # Same content, new mtime
+                    touched.append((*stats[path], path))
+                    continue
+                rows.append((path, *stats[path], digest, writer.add(terms), length))
+                indexed += 1
+                if writer.docs >= self.segment_docs:
+                    self._commit(writer, rows, touched, known, ())
+                    writer, rows, touched = _SegmentWriter(writer.next_doc), [], []
+        if writer.docs or touched or deleted:
+            self._commit(writer, rows, touched, known, deleted)
+
+        with self._lock:
+            segments = self._connection().execute("SELECT id, docs FROM segments ORDER BY docs").fetchall()
+        if len(segments) > self.max_segments:
+            self._merge([segment for segment, _ in segments[:len(segments) - self.max_segments // 2 + 1]])
+
+        if indexed or deleted:
+            logger.info(
+                f"Code search index of {self.root} updated: {indexed} files indexed, {len(deleted)} removed, "
+                f"{len(stats)} files in {time.perf_counter() - started:.2f} s"
+            )
+        return indexed
+
+    def _commit(self, writer: _SegmentWriter, rows, touched, known, deleted) -> None:
+        """Write ``writer``'s segment and make it and the file changes visible to queries"""
+        segment = None
+        lexicon: List[Tuple[str, int, int]] = []
+        if writer.docs:
+            with self._lock:
+                segment = self._connection().execute("SELECT COALESCE(MAX(id), 0) + 1 FROM segments").fetchone()[0]
+            lexicon = writer.write(self._segment_path(segment))
+        # Old documents of changed and deleted files stay in their segments until a merge, marked dead
+        dead = [known[path][3] for path, *_ in rows if path in known] + [known[path][3] for path in deleted]
+
+        with self._lock:
+            db = self._connection()
+            with db:
+                if segment is not None:
+                    db.execute(
+                        "INSERT INTO segments (id, docs, first_doc, last_doc) VALUES (?, ?, ?, ?)",
+                        (segment, writer.docs, writer.first_doc, writer.next_doc - 1)
+                    )
+                    db.executemany(
+                        "INSERT INTO terms (term, segment, offset, count) VALUES (?, ?, ?, ?)",
+                        [(term, segment, offset, count) for term, offset, count in lexicon]
+                    )
+                    db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_doc', ?)", (writer.next_doc,))
+                db.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in deleted])
+                db.executemany(
+                    "INSERT OR REPLACE INTO files (path, mtime_ns, size, hash, doc_id, length) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                db.executemany("UPDATE files SET mtime_ns = ?, size = ? WHERE path = ?", touched)
+
+            if segment is not None:
+                self._map(segment)
+            grow = writer.next_doc - len(self._live)
+            if grow > 0:
+                self._live.extend(bytes(grow))
+                self._lengths.frombytes(bytes(4 * grow))
+            for doc_id in dead:
+                if self._live[doc_id]:
+                    self._live[doc_id] = 0
+                    self._live_docs -= 1
+                    self._total_length -= self._lengths[doc_id]
+            for *_, doc_id, length in rows:
+                self._lengths[doc_id] = length
+                self._live[doc_id] = 1
+                self._live_docs += 1
+                self._total_length += length
+            self._normalize()
+
+    def start_update(self) -> None:
+        """Run ``update`` on a background thread"""
+        threading.Thread(target=self.update, name="code-search-index", daemon=True).start()
+
+    def search(self, query: str, limit: int = 10, lines_per_file: int = 2) -> List[CodeHit]:
+        """The ``limit`` files ranked best by BM25 for ``query``, each with its best matching lines"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            db = self._connection()
+            if not self._live_docs:
+                return []
+            lists = []
+            for term in terms:
+                parts = db.execute("SELECT segment, offset, count FROM terms WHERE term = ?", (term,)).fetchall()
+                frequency = sum(count for _, _, count in parts)
+                if frequency:
+                    lists.append((frequency, term, parts))
+            if not lists:
+                return []
+            lists.sort()
+            documents, live, norms = self._live_docs, self._live, self._norms
+            common = self.common_fraction * documents
+            weights = {}
+            scores: Dict[int, float] = {}
+            for position, (frequency, term, parts) in enumerate(lists):
+                idf = math.log(1 + (documents - frequency + 0.5) / (frequency + 0.5))
+                weight = weights[term] = idf * (self.k1 + 1)
+                postings = [(segment, *self._postings(segment, offset, count)) for segment, offset, count in parts]
+                # Common terms only refine the files a rarer term already found
+                restrict = frequency > common and position > 0
+                if position == 0 and frequency > common and frequency > self.recent_window:
+                    postings = self._recent(postings)
+                for segment, docs, counts in postings:
+                    if restrict:
+                        if len(scores) * 16 < len(docs):
+                            for doc in list(scores):
+                                i = bisect_left(docs, doc)
+                                if i < len(docs) and docs[i] == doc:
+                                    count = counts[i]
+                                    scores[doc] += weight * count / (count + norms[doc])
+                        else:
+                            found = dict(zip(docs, counts))
+                            for doc in list(scores):
+                                count = found.get(doc)
+                                if count:
+                                    scores[doc] += weight * count / (count + norms[doc])
+                    elif position == 0 and self._clean(docs):
+                        # Segments hold disjoint documents, so the first term's scores need no summing
+                        scores.update({doc: weight * count / (count + norms[doc]) for doc, count in zip(docs, counts)})
+                    else:
+                        get = scores.get
+                        for doc, count in zip(docs, counts):
+                            if live[doc]:
+                                scores[doc] = get(doc, 0.0) + weight * count / (count + norms[doc])
+            best = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+            marks = ",".join("?" * len(best))
+            paths = dict(db.execute(f"SELECT doc_id, path FROM files WHERE doc_id IN ({marks})", [doc for doc, _ in best]))
+
+        hits = [CodeHit(paths[doc], score) for doc, score in best if doc in paths]
+        for hit in hits:
+            hit.lines = self._best_lines(hit.path, weights, lines_per_file)
+        return hits
+
+    def _clean(self, docs: array) -> bool:
+        """Whether none of ``docs`` (sorted) was deleted"""
+        return not docs or self._live.find(0, docs[0], docs[-1] + 1) == -1
+
+    def _recent(self, postings: List[Tuple[int, array, array]]) -> List[Tuple[int, array, array]]:
+        """The postings of the ``recent_window`` highest (most recently indexed) documents"""
+        low, high = 0, len(self._live)
+        while low < high:
+            middle = (low + high) // 2
+            if sum(len(docs) - bisect_left(docs, middle) for _, docs, _ in postings) > self.recent_window:
+                low = middle + 1
+            else:
+                high = middle
+        cut = []
+        for segment, docs, counts in postings:
+            start = bisect_left(docs, low)
+            cut.append((segment, docs[start:], counts[start:]))
+        return cut
+
+    def _best_lines(self, path: str, weights: Dict[str, float], count: int) -> List[Tuple[int, str]]:
+        """The ``count`` lines of a file containing the highest weight of query terms, in file order.
+
+        Terms are matched as substrings of the lower-cased line, which also
+        finds them inside compound identifiers without tokenizing every line.
+        """
+        weighted = sorted(weights.items(), key=itemgetter(1), reverse=True)
+        ranked = []
+        try:
+            with open(os.path.join(self.root, path), encoding="utf-8", errors="replace") as f:
+                for number, line in enumerate(f, 1):
+                    low = line.lower()
+                    score = sum(weight for term, weight in weighted if term in low)
+                    if score:
+                        ranked.append((score, -number, line.rstrip()))
+        except OSError:
+            return []
+        best = heapq.nlargest(count, ranked)
+        return sorted((-number, line) for _, number, line in best)
+
+    def count(self) -> int:
+        """Number of indexed files"""
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            for data in self._maps.values():
+                data.close()
+            self._maps.clear()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _postings(self, segment: int, offset: int, count: int) -> Tuple[array, array]:
+        data = self._maps[segment]
+        docs, counts = array("I"), array("I")
+        docs.frombytes(data[offset:offset + 4 * count])
+        counts.frombytes(data[offset + 4 * count:offset + 8 * count])
+        return docs, counts
+
+    def _merge(self, segments: List[int]) -> None:
+        """Rewrite ``segments`` as one without their deleted documents"""
+        started = time.perf_counter()
+        with self._lock:
+            db = self._connection()
+            merged = db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM segments").fetchone()[0]
+            marks = ",".join("?" * len(segments))
+            ranges = db.execute(
+                f"SELECT id, first_doc, last_doc FROM segments WHERE id IN ({marks}) ORDER BY first_doc", segments
+            ).fetchall()
+            order = {segment: position for position, (segment, _, _) in enumerate(ranges)}
+            lexicon_rows = db.execute(
+                f"SELECT term, segment, offset, count FROM terms WHERE segment IN ({marks})", segments
+            ).fetchall()
+            live = bytes(self._live)
+        lexicon_rows.sort(key=lambda row: (row[0], order[row[1]]))
+        # Segments written one after another hold ascending document ranges, so their
+        # postings can simply be concatenated; ranges that interleave (after earlier
+        # merges) need sorting
+        disjoint = all(ranges[i][2] < ranges[i + 1][1] for i in range(len(ranges) - 1))
+        # Segments without deleted documents are copied as they are
+        clean = {segment for segment, first, last in ranges if live.find(0, first, last + 1) == -1}
+        kept = set()
+
+        def postings():
+            term_rows: List[Tuple[int, int, int]] = []
+            for index, (term, segment, offset, count) in enumerate(lexicon_rows):
+                term_rows.append((segment, offset, count))
+                if index + 1 < len(lexicon_rows) and lexicon_rows[index + 1][0] == term:
+                    continue
+                docs, counts = array("I"), array("I")
+                for part in term_rows:
+                    part_docs, part_counts = self._postings(*part)
+                    if part[0] in clean:
+                        docs.extend(part_docs)
+                        counts.extend(part_counts)
+                        continue
+                    for doc, count in zip(part_docs, part_counts):
+                        if live[doc]:
+                            docs.append(doc)
+                            counts.append(count)
+                term_rows = []
+                if not disjoint and docs:
+                    pairs = sorted(zip(docs, counts))
+                    docs, counts = array("I", [doc for doc, _ in pairs]), array("I", [count for _, count in pairs])
+                kept.update(docs)
+                yield term, docs, counts
+
+        lexicon = _write_postings(self._segment_path(merged), postings())
+        with self._lock:
+            db = self._connection()
+            with db:
+                db.execute(f"DELETE FROM terms WHERE segment IN ({marks})", segments)
+                db.execute(f"DELETE FROM segments WHERE id IN ({marks})", segments)
+                if lexicon:
+                    db.execute(
+                        "INSERT INTO segments (id, docs, first_doc, last_doc) VALUES (?, ?, ?, ?)",
+                        (merged, len(kept), min(kept), max(kept))
+                    )
+                    db.executemany(
+                        "INSERT INTO terms (term, segment, offset, count) VALUES (?, ?, ?, ?)",
+                        [(term, merged, offset, count) for term, offset, count in lexicon]
+                    )
+            if lexicon:
+                self._map(merged)
+            for segment in segments:
+                data = self._maps.pop(segment, None)
+                if data is not None:
+                    data.close()
+            for segment in segments if lexicon else segments + [merged]:
+                try:
+                    os.remove(self._segment_path(segment))
+                except OSError as e:
+                    logger.warning(f"Could not remove code search segment {segment}: {e}")
+        logger.info(
+            f"Merged {len(segments)} code search segments of {self.root} "
+            f"({len(kept)} files) in {time.perf_counter() - started:.2f} s"
+        )
+
+
+_indexes: Dict[str, CodeSearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_code_index(root: str) -> CodeSearchIndex:
+    """Return the shared search index of the project at ``root``, catching up with changes in the background"""
+    key = os.path.normcase(os.path.abspath(root))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = CodeSearchIndex(root)
+            index.start_update()
+    return index
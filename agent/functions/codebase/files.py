@@ -0,0 +1,111 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AbstractSet, Any, Callable, Iterator, List, Optional, Sequence, Tuple
+from agent.logger_config import logger
+
+# Dependency, build and tool directories that are never indexed (dot-directories are skipped too)
+SKIP_DIRS = frozenset({
+    "node_modules", "__pycache__", "venv", "env", "build", "dist", "target", "vendor",
+    "bower_components", "site-packages", "out", "bin", "obj",
+})
+MAX_FILE_BYTES = 1024 * 1024
+
+LANGUAGES = {
+    ".py": "Python", ".pyw": "Python",
+    ".js": "JavaScript", ".jsx": "JavaScript", ".mjs": "JavaScript", ".cjs": "JavaScript",
+    ".ts": "TypeScript", ".tsx": "TypeScript",
+    ".go": "Go", ".rs": "Rust",
+    ".java": "Java", ".kt": "Kotlin", ".kts": "Kotlin", ".scala": "Scala", ".cs": "C#",
+    ".rb": "Ruby", ".php": "PHP", ".swift": "Swift", ".dart": "Dart",
+    ".c": "C", ".h": "C", ".cc": "C++", ".cpp": "C++", ".cxx": "C++", ".hpp": "C++", ".hh": "C++",
+}
+# Full-text search also covers documentation, configuration and build files
+TEXT_EXTENSIONS = frozenset(LANGUAGES) | {
+    ".md", ".rst", ".txt", ".json", ".yaml", ".yml", ".toml", ".ini", ".cfg", ".xml",
+    ".html", ".css", ".scss", ".vue", ".svelte", ".sql", ".sh", ".bat", ".ps1", ".lua",
+    ".proto", ".graphql", ".gradle", ".cmake",
+}
+# Generated files that would only add noise to search results
+SKIP_FILES = frozenset({"package-lock.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock", "Cargo.lock", "composer.lock"})
+
+
+def iter_source_files(
+    root: str,
+    max_bytes: int = MAX_FILE_BYTES,
+    extensions: Optional[AbstractSet[str]] = None,
+) -> Iterator[Tuple[str, str, os.stat_result]]:
+    """Yield ``(relative path, absolute path, stat)`` of the source files below ``root``.
+
+    Only files with one of ``extensions`` (those in ``LANGUAGES`` by default)
+    are listed. Relative paths use ``/`` on every platform. Symlinks,
+    dot-directories, ``SKIP_DIRS``, ``SKIP_FILES`` and files larger than
+    ``max_bytes`` are skipped.
+    """
+    extensions = LANGUAGES.keys() if extensions is None else extensions
+    root = os.path.abspath(root)
+    prefix = len(root) + 1
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as scan:
+                entries = list(scan)
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS and not entry.name.startswith("."):
+                        stack.append(entry.path)
+                    continue
+                if os.path.splitext(entry.name)[1].lower() not in extensions or entry.name in SKIP_FILES \
+                        or not entry.is_file(follow_symlinks=False):
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            if stat.st_size <= max_bytes:
+                yield entry.path[prefix:].replace(os.sep, "/"), entry.path, stat
+
+
+def language_of(path: str) -> str:
+    return LANGUAGES.get(os.path.splitext(path)[1].lower(), "")
+
+
+def map_files(
+    func: Callable[[Any], Any],
+    jobs: Sequence[Any],
+    workers: int,
+    parallel_threshold: int = 512,
+    batch_size: int = 1000,
+) -> Iterator[List[Any]]:
+    """Yield ``func(job)`` for all ``jobs`` in order, in batches of ``batch_size``.
+
+    ``parallel_threshold`` or more jobs run in a pool of ``workers`` processes,
+    which also keeps the work from holding the GIL the UI thread needs; ``func``
+    must be a module-level function taking and returning plain data. Should the
+    pool fail, the remaining jobs run in this process.
+    """
+    done = 0
+    if len(jobs) >= parallel_threshold:
+        # Spawned, not forked: forking a process that runs the UI and event loop threads is unsafe
+        try:
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                batch = []
+                for result in pool.map(func, jobs, chunksize=64):
+                    batch.append(result)
+                    if len(batch) >= batch_size:
+                        done += len(batch)
+                        yield batch
+                        batch = []
+                if batch:
+                    done += len(batch)
+                    yield batch
+            return
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning(f"Indexing workers failed ({e}), processing {len(jobs) - done} files in-process")
+
+    for start in range(done, len(jobs), batch_size):
+        yield [func(job) for job in jobs[start:start + batch_size]]
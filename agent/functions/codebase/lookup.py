@@ -0,0 +1,32 @@
+from .symbols import get_symbol_index
+
+def lookup_symbol(project_path: str, name: str, limit: int = 5):
+    """
+    Find where a class, function, method or constant of the open project is defined.
+
+    The project's symbol index is kept up to date incrementally, so only
+    files changed since the last lookup are parsed again.
+
+    Args:
+        project_path: Root directory of the project
+        name: Symbol name, optionally qualified (e.g. 'ChatUI.update_current_message')
+        limit: Maximum number of definitions
+
+    Returns:
+        str: Matching definitions with file, line and signature, and the source of the best match
+    """
+    index = get_symbol_index(project_path)
+    symbols = index.lookup(name, limit=limit)
+    if not symbols:
+        if not index.updated_at:
+            return f"The project is still being indexed; no definition of '{name}' found yet."
+        return f"No definition of '{name}' found."
+
+    lines = []
+    for symbol in symbols:
+        doc = f"  # {symbol.doc}" if symbol.doc else ""
+        lines.append(f"- {symbol.path}:{symbol.line} {symbol.kind} {symbol.qualname}: {symbol.signature}{doc}")
+    source = index.source(symbols[0])
+    if source:
+        lines.append(f"\n{symbols[0].path}:{symbols[0].line}\n{source}")
+    return "\n".join(lines)
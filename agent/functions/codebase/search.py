@@ -0,0 +1,31 @@
+from .code_index import get_code_index
+
+def search_code(project_path: str, query: str, limit: int = 10):
+    """
+    Search the files of the open project for words and identifiers.
+
+    The project's files are kept in an incrementally updated full-text index,
+    so a search reads only the postings of the query terms.
+
+    Args:
+        project_path: Root directory of the project
+        query: Words or identifiers to look for (camelCase and snake_case names also match their parts)
+        limit: Maximum number of files
+
+    Returns:
+        str: Files ranked by relevance (BM25), each with its best matching lines
+    """
+    index = get_code_index(project_path)
+    hits = index.search(query, limit=limit)
+    if not hits:
+        if not index.updated_at:
+            return f"The project is still being indexed; no files match '{query}' yet."
+        return f"No files match '{query}'."
+
+    lines = []
+    for hit in hits:
+        if not hit.lines:
+            lines.append(f"- {hit.path}")
+        for number, text in hit.lines:
+            lines.append(f"- {hit.path}:{number}: {text.strip()[:200]}")
+    return "\n".join(lines)
@@ -0,0 +1,512 @@
+import ast
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Pattern, Tuple
+from agent.logger_config import logger
+from .files import iter_source_files, language_of, map_files
+
+# (name, qualname, kind, line, end line, signature, first docstring line)
+SymbolRow = Tuple[str, str, str, int, Optional[int], str, str]
+
+_IDENTIFIER = r"([A-Za-z_$][\w$]*)"
+_JS_TAGS = [
+    ("class", re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+" + _IDENTIFIER)),
+    ("function", re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*" + _IDENTIFIER)),
+    ("function", re.compile(
+        r"^\s*(?:export\s+)?(?:const|let|var)\s+" + _IDENTIFIER
+        + r"\s*=\s*(?:async\s+)?(?:function\b|\([^)]*\)\s*=>|[A-Za-z_$][\w$]*\s*=>)"
+    )),
+    ("type", re.compile(r"^\s*(?:export\s+)?(?:declare\s+)?(?:interface|type|enum)\s+" + _IDENTIFIER)),
+]
+_JVM_TAGS = [
+    ("class", re.compile(
+        r"^\s*(?:(?:public|private|protected|internal|static|final|abstract|sealed|data|open|partial)\s+)*"
+        r"(?:class|interface|enum|record|struct|object|trait)\s+" + _IDENTIFIER
+    )),
+    ("function", re.compile(r"^\s*(?:(?:public|private|protected|internal|override|suspend|inline)\s+)*fun\s+(?:<[^>]*>\s*)?(?:\w+\.)?" + _IDENTIFIER)),
+    ("method", re.compile(
+        r"^\s*(?:(?:public|private|protected|internal|static|final|abstract|synchronized|override|virtual|async)\s+)+"
+        r"[\w<>\[\],.?]+\s+" + _IDENTIFIER + r"\s*\("
+    )),
+]
+# Line-based tagging for languages without a parser in the standard library
+TAG_PATTERNS: Dict[str, List[Tuple[str, Pattern]]] = {
+    "JavaScript": _JS_TAGS,
+    "TypeScript": _JS_TAGS,
+    "Go": [
+        ("function", re.compile(r"^func\s+(?:\([^)]*\)\s*)?" + _IDENTIFIER)),
+        ("type", re.compile(r"^type\s+" + _IDENTIFIER + r"\s+(?:struct|interface)\b")),
+    ],
+    "Rust": [
+        ("function", re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:const\s+)?(?:async\s+)?(?:unsafe\s+)?fn\s+" + _IDENTIFIER)),
+        ("type", re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:struct|enum|trait|union)\s+" + _IDENTIFIER)),
+    ],
+    "Java": _JVM_TAGS,
+    "Kotlin": _JVM_TAGS,
+    "Scala": _JVM_TAGS + [("function", re.compile(r"^\s*(?:override\s+)?def\s+" + _IDENTIFIER))],
+    "C#": _JVM_TAGS,
+    "Ruby": [
+        ("class", re.compile(r"^\s*(?:class|module)\s+([A-Z][\w:]*)")),
+        ("method", re.compile(r"^\s*def\s+(?:self\.)?([\w?!=]+)")),
+    ],
+    "PHP": [
+        ("class", re.compile(r"^\s*(?:(?:abstract|final)\s+)?(?:class|interface|trait)\s+" + _IDENTIFIER)),
+        ("function", re.compile(r"^\s*(?:(?:public|private|protected|static|abstract|final)\s+)*function\s+&?" + _IDENTIFIER)),
+    ],
+    "Swift": [
+        ("class", re.compile(r"^\s*(?:(?:public|private|internal|open|final)\s+)*(?:class|struct|enum|protocol|extension)\s+" + _IDENTIFIER)),
+        ("function", re.compile(r"^\s*(?:(?:public|private|internal|open|static|override|mutating)\s+)*func\s+" + _IDENTIFIER)),
+    ],
+    "Dart": [
+        ("class", re.compile(r"^\s*(?:abstract\s+)?(?:class|mixin|enum|extension)\s+" + _IDENTIFIER)),
+    ],
+    "C": [
+        ("type", re.compile(r"^\s*(?:typedef\s+)?(?:struct|enum|union)\s+" + _IDENTIFIER + r"\s*\{")),
+    ],
+    "C++": [
+        ("class", re.compile(r"^\s*(?:template\s*<[^>]*>\s*)?(?:class|struct)\s+" + _IDENTIFIER + r"\s*(?:final\s*)?[:{]")),
+        ("type", re.compile(r"^\s*(?:enum(?:\s+class)?|union|namespace)\s+" + _IDENTIFIER + r"\s*\{")),
+    ],
+}
+_PYTHON_FALLBACK = [
+    ("class", re.compile(r"^\s*class\s+" + _IDENTIFIER)),
+    ("function", re.compile(r"^\s*(?:async\s+)?def\s+" + _IDENTIFIER)),
+]
+MAX_SIGNATURE = 160
+
+
+def _like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _doc_line(node) -> str:
+    """First line of a docstring, without ``ast.get_docstring``'s full cleanup"""
+    body = getattr(node, "body", None)
+    if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+            and isinstance(body[0].value.value, str):
+        return body[0].value.value.strip().split("\n", 1)[0].strip()[:MAX_SIGNATURE]
+    return ""
+
+
+def _header(lines: List[str], node) -> str:
+    """The ``def``/``class`` line(s) of ``node`` as written, on one line and without the colon.
+
+    Slicing the source is several times faster than ``ast.unparse``.
+    """
+    first = node.body[0]
+    if first.lineno == node.lineno:
+        # Body on the same line: cut at its column (a UTF-8 byte offset)
+        text = lines[node.lineno - 1].encode("utf-8")[:first.col_offset].decode("utf-8", errors="ignore")
+    else:
+        text = " ".join(lines[node.lineno - 1:first.lineno - 1])
+    text = " ".join(text.split())
+    head, comment, _ = text.rpartition("#")
+    if comment and head.rstrip().endswith(":"):
+        text = head.rstrip()
+    return (text[:-1] if text.endswith(":") else text)[:MAX_SIGNATURE]
+
+
+def python_symbols(text: str, module: str) -> List[SymbolRow]:
+    """Module, classes, functions, methods and upper-case constants of Python source"""
+    tree = ast.parse(text)
+    lines = text.splitlines()
+    symbols: List[SymbolRow] = [(module, module, "module", 1, None, "", _doc_line(tree))]
+
+    def visit(body, prefix: str, in_class: bool) -> None:
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                symbols.append((
+                    node.name, prefix + node.name, "method" if in_class else "function",
+                    node.lineno, node.end_lineno, _header(lines, node), _doc_line(node)
+                ))
+            elif isinstance(node, ast.ClassDef):
+                symbols.append((
+                    node.name, prefix + node.name, "class", node.lineno, node.end_lineno,
+                    _header(lines, node), _doc_line(node)
+                ))
+                visit(node.body, f"{prefix}{node.name}.", True)
+            elif not prefix and isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    if isinstance(target, ast.Name) and target.id.isupper():
+                        symbols.append((
+                            target.id, target.id, "constant", node.lineno, node.end_lineno,
+                            lines[node.lineno - 1].strip()[:MAX_SIGNATURE], ""
+                        ))
+
+    visit(tree.body, "", False)
+    return symbols
+
+
+def tagged_symbols(text: str, patterns: List[Tuple[str, Pattern]]) -> List[SymbolRow]:
+    """Definitions found line by line with ``patterns``; end lines are unknown"""
+    symbols: List[SymbolRow] = []
+    for number, line in enumerate(text.splitlines(), 1):
+        if len(line) > 400:
+            continue
+        for kind, pattern in patterns:
+            match = pattern.match(line)
+            if match:
+                name = match.group(1)
+                symbols.append((name, name, kind, number, None, line.strip().rstrip("{").strip()[:MAX_SIGNATURE], ""))
+                break
+    return symbols
+
+
+def extract_symbols(path: str, text: str) -> List[SymbolRow]:
+    language = language_of(path)
+    if language == "Python":
+        module = os.path.splitext(path)[0].replace("/", ".")
+        if module.endswith(".__init__"):
+            module = module[:-len(".__init__")]
+        try:
+            return python_symbols(text, module)
+        except (SyntaxError, ValueError, RecursionError):
+            return tagged_symbols(text, _PYTHON_FALLBACK)
+    return tagged_symbols(text, TAG_PATTERNS.get(language, []))
+
+
+def _index_file(job: Tuple[str, str, Optional[str]]) -> Tuple[str, Optional[str], Optional[List[SymbolRow]]]:
+    """``(path, content hash, symbols)`` of a file; symbols are None if the hash is unchanged.
+
+    Runs in worker processes, so it only takes and returns plain data.
+    """
+    path, full_path, known_hash = job
+    try:
+        with open(full_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return path, None, None
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    if digest == known_hash:
+        return path, digest, None
+    return path, digest, extract_symbols(path, data.decode("utf-8", errors="replace"))
+
+
+@dataclass
+class Symbol:
+    path: str
+    name: str
+    qualname: str
+    kind: str
+    line: int
+    end_line: Optional[int]
+    signature: str
+    doc: str
+
+
+class SymbolIndex:
+    """Persistent outline of a project's source code.
+
+    Every source file below ``root`` is recorded with its mtime, size and
+    content hash next to the symbols it defines: modules, classes,
+    functions, methods and constants from ``ast`` for Python, definitions
+    tagged with per-language regular expressions elsewhere. ``update`` only
+    reads files whose mtime or size changed and only re-extracts those whose
+    hash did too, so reopening a project costs a directory walk.
+
+    Large batches of changed files (the first build of a big repository) are
+    parsed in a process pool of ``workers`` and written in batches, each in
+    its own transaction, so lookups keep working from another thread while
+    the index is built.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        db_path: Optional[str] = None,
+        workers: Optional[int] = None,
+        parallel_threshold: int = 512,
+        batch_size: int = 1000,
+    ):
+        self.root = os.path.abspath(root)
+        if db_path is None:
+            digest = hashlib.blake2b(os.path.normcase(self.root).encode("utf-8"), digest_size=8).hexdigest()
+            name = re.sub(r"[^\w.-]", "_", os.path.basename(self.root)) or "root"
+            db_path = os.path.join(".cache", "symbols", f"{name}-{digest}.sqlite3")
+        self.db_path = db_path
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.parallel_threshold = parallel_threshold
+        self.batch_size = batch_size
+        self.version = 0  # Increases whenever the indexed files change
+        self.updated_at = 0.0  # time.monotonic() of the last finished update
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._update_lock = threading.Lock()
+        self._outlines: Dict[int, Tuple[int, str]] = {}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, "
+                "hash TEXT NOT NULL, language TEXT NOT NULL, depth INTEGER NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS symbols ("
+                "path TEXT NOT NULL, name TEXT NOT NULL, qualname TEXT NOT NULL, kind TEXT NOT NULL, "
+                "line INTEGER NOT NULL, end_line INTEGER, signature TEXT NOT NULL, doc TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS symbols_path ON symbols(path)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS symbols_name ON symbols(name)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS symbols_name_nocase ON symbols(name COLLATE NOCASE)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS symbols_qualname ON symbols(qualname)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS files_depth ON files(depth, path)")
+        return self._db
+
+    def update(self) -> int:
+        """Index new and changed files, drop deleted ones; return the number of files (re)indexed.
+
+        Concurrent calls do not queue up: a call made while another update
+        runs returns 0 straight away.
+        """
+        if not self._update_lock.acquire(blocking=False):
+            return 0
+        try:
+            indexed = self._update()
+            for max_tokens in list(self._outlines):
+                self._render_outline(max_tokens)
+            return indexed
+        finally:
+            self.updated_at = time.monotonic()
+            self._update_lock.release()
+
+    def _update(self) -> int:
+        started = time.perf_counter()
+        with self._lock:
+            known: Dict[str, Tuple[int, int, str]] = {
+                path: (mtime_ns, size, digest)
+                for path, mtime_ns, size, digest in self._connection().execute("SELECT path, mtime_ns, size, hash FROM files")
+            }
+
+        stats: Dict[str, Tuple[int, int]] = {}
+        jobs: List[Tuple[str, str, Optional[str]]] = []
+        for path, full_path, stat in iter_source_files(self.root):
+            stats[path] = (stat.st_mtime_ns, stat.st_size)
+            previous = known.get(path)
+            if previous is None or previous[:2] != stats[path]:
+                jobs.append((path, full_path, previous[2] if previous else None))
+        deleted = known.keys() - stats.keys()
+
+        indexed = 0
+        for batch in map_files(_index_file, jobs, self.workers, self.parallel_threshold, self.batch_size):
+            rows = [(path, digest, symbols) for path, digest, symbols in batch if digest is not None]
+            indexed += sum(1 for _, _, symbols in rows if symbols is not None)
+            with self._lock:
+                db = self._connection()
+                with db:
+                    for path, digest, symbols in rows:
+                        if symbols is not None:
+                            db.execute("DELETE FROM symbols WHERE path = ?", (path,))
+                            db.executemany(
+                                "INSERT INTO symbols (path, name, qualname, kind, line, end_line, signature, doc) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                [(path, *symbol) for symbol in symbols]
+                            )
+                    # Files whose content did not change only get their new mtime
+                    db.executemany(
+                        "INSERT OR REPLACE INTO files (path, mtime_ns, size, hash, language, depth) VALUES (?, ?, ?, ?, ?, ?)",
+                        [(path, *stats[path], digest, language_of(path), path.count("/")) for path, digest, _ in rows]
+                    )
+                if indexed:
+                    self.version += 1
+
+        if deleted:
+            with self._lock:
+                db = self._connection()
+                with db:
+                    db.executemany("DELETE FROM symbols WHERE path = ?", [(path,) for path in deleted])
+                    db.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in deleted])
+                self.version += 1
+
+        if indexed or deleted:
+            logger.info(
+                f"Symbol index of {self.root} updated: {indexed} files indexed, {len(deleted)} removed, "
+                f"{len(stats)} files in {time.perf_counter() - started:.2f} s"
+            )
+        return indexed
+
+    def start_update(self) -> None:
+        """Run ``update`` on a background thread"""
+        threading.Thread(target=self.update, name="symbol-index", daemon=True).start()
+
+    def lookup(self, name: str, limit: int = 10) -> List[Symbol]:
+        """Symbols named ``name`` (or with that qualified name, e.g. ``Class.method``), best matches first.
+
+        Exact matches come first, then names starting with ``name`` (case-insensitive
+        for plain names) and, if nothing matched, names containing it. Within a
+        stage classes and functions rank before the rest.
+        """
+        name = name.strip()
+        if not name:
+            return []
+        leaf = name.rsplit(".", 1)[-1]
+        # Each stage but the last is answered from an index; the substring scan only runs if nothing matched
+        if "." in name:
+            stages = [
+                ("qualname = ?", (name,)),
+                ("qualname >= ? AND qualname < ?", (name, name + "\U0010ffff")),
+                ("qualname LIKE ? ESCAPE '\\'", (f"%.{_like_escape(name)}",)),
+            ]
+        else:
+            stages = [
+                ("name = ? AND kind != 'module'", (name,)),
+                ("name >= ? COLLATE NOCASE AND name < ? COLLATE NOCASE", (name, name + "\U0010ffff")),
+            ]
+        stages.append(("name LIKE ? ESCAPE '\\'", (f"%{_like_escape(leaf)}%",)))
+        order = "ORDER BY CASE kind WHEN 'class' THEN 0 WHEN 'function' THEN 1 WHEN 'type' THEN 1 ELSE 2 END, path, line"
+        found: List[Symbol] = []
+        seen = set()
+        with self._lock:
+            db = self._connection()
+            for number, (condition, parameters) in enumerate(stages):
+                if len(found) >= limit or (found and number == len(stages) - 1):
+                    break
+                rows = db.execute(
+                    f"SELECT path, name, qualname, kind, line, end_line, signature, doc FROM symbols "
+                    f"WHERE {condition} {order} LIMIT ?",
+                    (*parameters, limit)
+                ).fetchall()
+                for row in rows:
+                    if (row[0], row[4], row[2]) not in seen:
+                        seen.add((row[0], row[4], row[2]))
+                        found.append(Symbol(*row))
+        return found[:limit]
+
+    def source(self, symbol: Symbol, max_lines: int = 40) -> str:
+        """The lines of ``symbol``'s definition, at most ``max_lines``"""
+        last = symbol.end_line or symbol.line + max_lines - 1
+        last = min(last, symbol.line + max_lines - 1)
+        lines = []
+        try:
+            with open(os.path.join(self.root, symbol.path), encoding="utf-8", errors="replace") as f:
+                for number, line in enumerate(f, 1):
+                    if number > last:
+                        break
+                    if number >= symbol.line:
+                        lines.append(line.rstrip("\n"))
+        except OSError:
+            return ""
+        return "\n".join(lines)
+
+    def outline(self, max_tokens: int = 1500) -> str:
+        """Compact overview of the project within about ``max_tokens`` tokens.
+
+        Lists the number of files per language and directory, then the
+        top-level definitions of as many files as fit, shallowest first.
+        """
+        cached = self._outlines.get(max_tokens)
+        # While an update runs the last outline is good enough; the update refreshes it when done
+        if cached is not None and (cached[0] == self.version or self._update_lock.locked()):
+            return cached[1]
+        return self._render_outline(max_tokens)
+
+    def _render_outline(self, max_tokens: int) -> str:
+        budget = max_tokens * 4  # Characters, see context_window.estimate_tokens
+        with self._lock:
+            db = self._connection()
+            languages = db.execute(
+                "SELECT language, COUNT(*) FROM files GROUP BY language ORDER BY COUNT(*) DESC"
+            ).fetchall()
+            total = sum(count for _, count in languages)
+            if not total:
+                self._outlines[max_tokens] = (self.version, "")
+                return ""
+            directories = Counter(
+                path.split("/", 1)[0] + "/"
+                for (path,) in db.execute("SELECT path FROM files WHERE depth > 0")
+            )
+            lines = [
+                f"{total} source files: " + ", ".join(f"{language} {count}" for language, count in languages),
+                "Directories: " + ", ".join(
+                    f"{directory} ({count})" for directory, count in directories.most_common(20)
+                ),
+                "",
+            ]
+            used = sum(len(line) + 1 for line in lines)
+            listed = 0
+            files = db.execute("SELECT path FROM files ORDER BY depth, path")
+            for (path,) in files:
+                line = self._outline_line(db, path)
+                if used + len(line) + 1 > budget:
+                    break
+                lines.append(line)
+                used += len(line) + 1
+                listed += 1
+            if listed < total:
+                lines.append(f"... {total - listed} more files, use lookup_symbol to find definitions")
+
+        text = "\n".join(lines)
+        self._outlines[max_tokens] = (self.version, text)
+        return text
+
+    @staticmethod
+    def _outline_line(db: sqlite3.Connection, path: str) -> str:
+        """``path: doc | class A(method, ...), function(), CONSTANT`` of a file's top-level symbols"""
+        doc = ""
+        parts: List[str] = []
+        members: Dict[str, List[str]] = {}
+        rows = db.execute("SELECT name, qualname, kind, doc FROM symbols WHERE path = ? ORDER BY line", (path,))
+        for name, qualname, kind, symbol_doc in rows:
+            if kind == "module":
+                doc = symbol_doc
+            elif kind == "method" and "." in qualname:
+                owner = qualname.rsplit(".", 1)[0]
+                if owner in members and not name.startswith("_"):
+                    members[owner].append(name)
+            elif "." not in qualname:
+                if kind == "class":
+                    members[qualname] = []
+                parts.append(qualname)
+        rendered = []
+        for part in parts:
+            if part in members:
+                methods = members[part]
+                shown = ", ".join(methods[:8]) + (", ..." if len(methods) > 8 else "")
+                rendered.append(f"class {part}({shown})")
+            else:
+                rendered.append(part)
+        line = path
+        if doc:
+            line += f" - {doc[:80]}"
+        if rendered:
+            line += ": " + ", ".join(rendered)
+        return line
+
+    def count(self) -> int:
+        """Number of indexed files"""
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_indexes: Dict[str, SymbolIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_symbol_index(root: str) -> SymbolIndex:
+    """Return the shared index of the project at ``root``, catching up with changes in the background"""
+    key = os.path.normcase(os.path.abspath(root))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = SymbolIndex(root)
+            index.start_update()
+    return index
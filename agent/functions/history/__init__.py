@@ -0,0 +1,4 @@
+from .index import get_history_index
+from .search import search_history
+
+__all__ = ['get_history_index', 'search_history']
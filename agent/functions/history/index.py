@@ -0,0 +1,302 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from agent.logger_config import logger
+
+SESSION_EXTENSIONS = (".json", ".jsonl")
+_SESSION_DATE = re.compile(r"_(\d{4})(\d{2})(\d{2})_")
+
+
+@dataclass
+class HistoryHit:
+    session: str
+    date: Optional[str]
+    role: str
+    snippet: str
+    score: float
+
+
+class HistoryIndex:
+    """SQLite FTS5 index over the archived chat sessions in ``.history``.
+
+    Both the legacy ``.json`` dumps and the ``.jsonl`` session journals are
+    indexed, one row per user or assistant message. ``update`` only touches
+    files whose size or mtime changed since the last run; journals that only
+    grew are indexed from the previous end of file onwards.
+
+    Query terms that occur in more than ``common_fraction`` of all messages
+    are left out of the match while more selective terms remain, since
+    ranking hundreds of thousands of hits for a stopword dominates the query
+    time. Queries made only of such terms search the ``recent_window`` most
+    recent messages.
+    """
+
+    def __init__(
+        self,
+        directory: str = ".history",
+        db_path: str = os.path.join(".cache", "history.sqlite3"),
+        common_fraction: float = 0.05,
+        recent_window: int = 10000,
+    ):
+        self.directory = directory
+        self.db_path = db_path
+        self.common_fraction = common_fraction
+        self.recent_window = recent_window
+        self._message_count = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._dir_mtime: Optional[int] = None
+        self._open: Dict[str, Tuple[int, int]] = {}  # (mtime_ns, size) of the journals that may still grow
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # ``open`` marks journals without an ``end`` record, the only files that are appended to
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "name TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, open INTEGER NOT NULL DEFAULT 0)"
+            )
+            if "open" not in {row[1] for row in self._db.execute("PRAGMA table_info(files)")}:
+                with self._db:
+                    self._db.execute("ALTER TABLE files ADD COLUMN open INTEGER NOT NULL DEFAULT 0")
+                    journals = [name for (name,) in self._db.execute("SELECT name FROM files WHERE name LIKE '%.jsonl'")]
+                    self._db.executemany(
+                        "UPDATE files SET open = 1 WHERE name = ?",
+                        [(name,) for name in journals if self._journal_open(os.path.join(self.directory, name))]
+                    )
+            # Message metadata lives in a plain indexed table sharing the FTS rowid,
+            # so a session's rows can be found without scanning the FTS table
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "id INTEGER PRIMARY KEY, session TEXT NOT NULL, role TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_session ON entries(session)")
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5(content, tokenize='porter unicode61')"
+            )
+            self._message_count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return self._db
+
+    @staticmethod
+    def _read_messages(path: str, size: int, offset: int = 0) -> Tuple[List[Tuple[str, str]], int]:
+        """``(role, content)`` of the conversational messages in a session file, and the bytes consumed.
+
+        Journals are read from ``offset`` up to the last complete line within
+        ``size``, so a line that is still being appended (or was torn) is left
+        for the next update instead of being skipped or read twice.
+        """
+        messages = []
+        if path.endswith(".jsonl"):
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read(max(0, size - offset))
+            complete = data.rfind(b"\n") + 1
+            for line in data[:complete].splitlines():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("type") == "message":
+                    messages.append((record.get("role", ""), record.get("content", "")))
+            return messages, offset + complete
+
+        with open(path, encoding="utf-8") as f:
+            history = json.load(f)
+        for message in history:
+            content = message.get("content")
+            if message.get("role") in ("user", "assistant") and isinstance(content, str):
+                messages.append((message["role"], content))
+        return messages, size
+
+    @staticmethod
+    def _journal_open(path: str) -> bool:
+        """Whether a journal may still be appended to, i.e. its last record is not ``end``"""
+        try:
+            with open(path, "rb") as f:
+                f.seek(max(0, os.path.getsize(path) - 4096))
+                lines = f.read().splitlines()
+            return not lines or json.loads(lines[-1]).get("type") != "end"
+        except (OSError, ValueError):
+            return True
+
+    def _changed(self) -> bool:
+        """Whether session files were added, removed or appended to since the last update.
+
+        Adding or removing a file changes the directory's mtime; appending a
+        turn to a journal does not, so the open journals are checked one by one.
+        """
+        if self._dir_mtime is None or os.stat(self.directory).st_mtime_ns != self._dir_mtime:
+            return True
+        for name, state in self._open.items():
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                return True
+            if (stat.st_mtime_ns, stat.st_size) != state:
+                return True
+        return False
+
+    def update(self) -> int:
+        """Index new and changed session files; return the number of files (re)indexed"""
+        try:
+            dir_mtime = os.stat(self.directory).st_mtime_ns
+            scan = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return 0
+
+        with self._lock:
+            db = self._connection()
+            known: Dict[str, Tuple[int, int]] = {
+                name: (mtime_ns, size) for name, mtime_ns, size in db.execute("SELECT name, mtime_ns, size FROM files")
+            }
+            updated = 0
+            next_id = db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM entries").fetchone()[0]
+            with db:
+                seen = set()
+                for entry in scan:
+                    if not entry.name.endswith(SESSION_EXTENSIONS):
+                        continue
+                    seen.add(entry.name)
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    previous = known.get(entry.name)
+                    if previous == (stat.st_mtime_ns, stat.st_size):
+                        continue
+
+                    # Journals are append-only: only read what was added since the last run
+                    offset = 0
+                    if previous and entry.name.endswith(".jsonl") and stat.st_size > previous[1]:
+                        offset = previous[1]
+                    elif previous:
+                        self._remove(db, entry.name)
+                    try:
+                        messages, indexed = self._read_messages(entry.path, stat.st_size, offset)
+                    except (OSError, ValueError) as e:
+                        logger.warning(f"Skipping unreadable history file {entry.name}: {e}")
+                        continue
+                    ids = range(next_id, next_id + len(messages))
+                    next_id += len(messages)
+                    db.executemany(
+                        "INSERT INTO entries (id, session, role) VALUES (?, ?, ?)",
+                        [(rowid, entry.name, role) for rowid, (role, _) in zip(ids, messages)]
+                    )
+                    db.executemany(
+                        "INSERT INTO messages (rowid, content) VALUES (?, ?)",
+                        [(rowid, content) for rowid, (_, content) in zip(ids, messages)]
+                    )
+                    db.execute(
+                        "INSERT OR REPLACE INTO files (name, mtime_ns, size, open) VALUES (?, ?, ?, ?)",
+                        (entry.name, stat.st_mtime_ns, indexed,
+                         entry.name.endswith(".jsonl") and self._journal_open(entry.path))
+                    )
+                    updated += 1
+
+                for name in known.keys() - seen:
+                    self._remove(db, name)
+                    db.execute("DELETE FROM files WHERE name = ?", (name,))
+
+            self._dir_mtime = dir_mtime
+            self._open = {
+                name: (mtime_ns, size)
+                for name, mtime_ns, size in db.execute("SELECT name, mtime_ns, size FROM files WHERE open = 1")
+            }
+            if updated or len(known) != len(seen):
+                self._message_count = db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if updated:
+            logger.info(f"History index updated: {updated} session files")
+        return updated
+
+    @staticmethod
+    def _remove(db: sqlite3.Connection, session: str) -> None:
+        db.execute("DELETE FROM messages WHERE rowid IN (SELECT id FROM entries WHERE session = ?)", (session,))
+        db.execute("DELETE FROM entries WHERE session = ?", (session,))
+
+    @staticmethod
+    def _match_expression(terms: List[str], operator: str) -> str:
+        """Quote each term so user input is never parsed as FTS5 syntax"""
+        return f" {operator} ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+    def _is_common(self, db: sqlite3.Connection, term: str) -> bool:
+        # Counting through MATCH sees the stemmed term; the LIMIT keeps it cheap for common ones
+        threshold = int(self._message_count * self.common_fraction)
+        matches = db.execute(
+            "SELECT COUNT(*) FROM (SELECT rowid FROM messages WHERE messages MATCH ? LIMIT ?)",
+            (self._match_expression([term], "AND"), threshold + 1)
+        ).fetchone()[0]
+        return matches > threshold
+
+    def search(self, query: str, limit: int = 10) -> List[HistoryHit]:
+        """Best matching messages, most relevant first.
+
+        All terms must match; if nothing does, any term may match.
+        """
+        if not query.split():
+            return []
+        try:
+            if self._changed():
+                self.update()
+        except FileNotFoundError:
+            return []
+
+        with self._lock:
+            db = self._connection()
+            terms = query.split()
+            selective = [term for term in terms if not self._is_common(db, term)]
+            min_rowid = 0
+            if not selective:
+                min_rowid = db.execute("SELECT COALESCE(MAX(id), 0) FROM entries").fetchone()[0] - self.recent_window
+            for operator in ("AND", "OR"):
+                rows = db.execute(
+                    "SELECT entries.session, entries.role, hits.snippet, hits.score FROM ("
+                    "SELECT rowid, snippet(messages, 0, '[', ']', '…', 16) AS snippet, bm25(messages) AS score "
+                    "FROM messages WHERE messages MATCH ? AND rowid > ? ORDER BY rank LIMIT ?"
+                    ") AS hits JOIN entries ON entries.id = hits.rowid ORDER BY hits.score",
+                    (self._match_expression(selective or terms, operator), min_rowid, limit)
+                ).fetchall()
+                if rows:
+                    break
+
+        hits = []
+        for session, role, snippet, score in rows:
+            date = _SESSION_DATE.search(session)
+            hits.append(HistoryHit(
+                session=session,
+                date="-".join(date.groups()) if date else None,
+                role=role,
+                snippet=snippet,
+                score=-score
+            ))
+        return hits
+
+    def count(self) -> int:
+        """Number of indexed session files"""
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+
+_index: Optional[HistoryIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_history_index() -> HistoryIndex:
+    """Return the shared history index, catching up with new sessions in the background.
+
+    The apps call this at startup, so the first search finds the index built.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = HistoryIndex()
+                threading.Thread(target=_index.update, name="history-index", daemon=True).start()
+    return _index
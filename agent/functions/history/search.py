@@ -0,0 +1,26 @@
+from .index import get_history_index
+
+def search_history(query: str, limit: int = 5):
+    """
+    Search the archived chat sessions for earlier questions and answers.
+
+    Sessions in the '.history' directory are kept in a full-text index that
+    is updated incrementally, so only new or changed session files are read.
+
+    Args:
+        query: Words to look for
+        limit: Maximum number of results
+
+    Returns:
+        str: Ranked matching messages with their session and date
+    """
+    hits = get_history_index().search(query, limit=limit)
+    if not hits:
+        return f"No earlier conversations match '{query}'."
+
+    lines = []
+    for hit in hits:
+        speaker = "User" if hit.role == "user" else "Alfred"
+        when = f" ({hit.date})" if hit.date else ""
+        lines.append(f"- {hit.session}{when}, {speaker}: {hit.snippet}")
+    return "\n".join(lines)
@@ -1,4 +1,5 @@
+from .index import PROJECTS_CHANGED
 from .list import list_all_projects
-from .open import open_project
+from .open import launch_project, open_project, resolve_project
 
-__all__ = ['list_all_projects', 'open_project']
\ No newline at end of file
+__all__ = ['PROJECTS_CHANGED', 'launch_project', 'list_all_projects', 'open_project', 'resolve_project']
\ No newline at end of file
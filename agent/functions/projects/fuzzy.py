@@ -0,0 +1,64 @@
+from array import array
+from collections import defaultdict
+from difflib import SequenceMatcher
+import heapq
+from typing import Dict, Iterable, List, Tuple
+
+
+def trigrams(text: str) -> List[str]:
+    """Distinct trigrams of a lower-cased, space-padded string"""
+    padded = f"  {text.lower()} "
+    return list({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+def similarity_score(a: str, b: str) -> float:
+    """Case-insensitive SequenceMatcher ratio"""
+    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+
+
+class FuzzyMatcher:
+    """Ranked fuzzy name lookup backed by a trigram inverted index.
+
+    Candidates are found through the postings of the query's trigrams and
+    ranked by their Dice coefficient, which costs time proportional to the
+    postings touched rather than to the number of names. Only the best
+    ``shortlist`` candidates are re-scored with ``SequenceMatcher`` so scores
+    stay comparable with the plain ratio (and its thresholds).
+    """
+
+    def __init__(self, names: Iterable[str], shortlist: int = 20):
+        self.names: List[str] = list(names)
+        self.shortlist = shortlist
+        self._gram_counts = array('H')
+        postings: Dict[str, array] = defaultdict(lambda: array('I'))
+        for index, name in enumerate(self.names):
+            grams = trigrams(name)
+            self._gram_counts.append(min(len(grams), 0xFFFF))
+            for gram in grams:
+                postings[gram].append(index)
+        self._postings = dict(postings)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def search(self, query: str, k: int = 5, threshold: float = 0.0) -> List[Tuple[str, float]]:
+        """Return up to ``k`` ``(name, score)`` pairs with score >= threshold, best first"""
+        query_grams = trigrams(query)
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in query_grams:
+            for index in self._postings.get(gram, ()):
+                shared[index] += 1
+        if not shared:
+            return []
+
+        query_count = len(query_grams)
+        counts = self._gram_counts
+        candidates = heapq.nlargest(
+            max(k, self.shortlist),
+            shared.items(),
+            key=lambda item: 2 * item[1] / (query_count + counts[item[0]])
+        )
+
+        scored = [(self.names[index], similarity_score(query, self.names[index])) for index, _ in candidates]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return [(name, score) for name, score in scored[:k] if score >= threshold]
@@ -0,0 +1,179 @@
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from agent.logger_config import logger
+from agent.settings import get_settings
+from agent.strategies.tool_cache import ToolCache
+from .fuzzy import FuzzyMatcher
+
+# Tool cache event raised when the project entries change
+PROJECTS_CHANGED = "projects_changed"
+
+# Marker files used to detect a project's main language, checked in order
+LANGUAGE_MARKERS = [
+    ("pyproject.toml", "Python"),
+    ("setup.py", "Python"),
+    ("requirements.txt", "Python"),
+    ("package.json", "JavaScript"),
+    ("tsconfig.json", "TypeScript"),
+    ("Cargo.toml", "Rust"),
+    ("go.mod", "Go"),
+    ("pom.xml", "Java"),
+    ("build.gradle", "Java"),
+    ("CMakeLists.txt", "C++"),
+    ("Gemfile", "Ruby"),
+    ("composer.json", "PHP"),
+    ("pubspec.yaml", "Dart"),
+]
+
+
+@dataclass
+class ProjectEntry:
+    name: str
+    path: str
+    modified: float
+    language: Optional[str]
+    has_git: bool
+
+
+class ProjectIndex:
+    """In-memory index of the project directories below one root.
+
+    Entries carry the directory's last-modified time, detected language and
+    whether it is a git repository. Reads check only the root's mtime (one
+    ``stat``) and rescan when it changed; metadata of unchanged directories is
+    reused. A background thread refreshes the index periodically so changes
+    inside project directories are picked up without blocking tool calls.
+    """
+
+    def __init__(self, root: Path, refresh_interval: float = 30.0):
+        self.root = root
+        self.refresh_interval = refresh_interval
+        self._entries: Dict[str, ProjectEntry] = {}
+        self._sorted: List[ProjectEntry] = []
+        self._root_mtime: Optional[int] = None
+        self._matcher: Optional[FuzzyMatcher] = None
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[["ProjectIndex"], None]] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def entries(self) -> List[ProjectEntry]:
+        """All project entries, sorted by name"""
+        self._ensure_fresh()
+        return self._sorted
+
+    def names(self) -> List[str]:
+        return [entry.name for entry in self.entries()]
+
+    def get(self, name: str) -> Optional[ProjectEntry]:
+        self._ensure_fresh()
+        return self._entries.get(name)
+
+    def matcher(self) -> FuzzyMatcher:
+        """Fuzzy matcher over the project names, rebuilt only when the entries change"""
+        self._ensure_fresh()
+        matcher = self._matcher
+        if matcher is None:
+            matcher = self._matcher = FuzzyMatcher(self.names())
+        return matcher
+
+    def add_listener(self, callback: Callable[["ProjectIndex"], None]) -> None:
+        """Call ``callback(index)`` whenever the set of entries or their metadata changes"""
+        self._listeners.append(callback)
+
+    def _ensure_fresh(self) -> None:
+        try:
+            mtime = os.stat(self.root).st_mtime_ns
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Directory {self.root} does not exist")
+        if mtime != self._root_mtime:
+            self.refresh()
+
+    def refresh(self) -> None:
+        """Rescan the root, reusing metadata of directories whose mtime is unchanged"""
+        with self._lock:
+            root_mtime = os.stat(self.root).st_mtime_ns
+            entries: Dict[str, ProjectEntry] = {}
+            changed = False
+            with os.scandir(self.root) as scan:
+                for item in scan:
+                    try:
+                        if not item.is_dir():
+                            continue
+                        modified = item.stat().st_mtime
+                    except OSError:
+                        continue
+                    previous = self._entries.get(item.name)
+                    if previous and previous.modified == modified:
+                        entries[item.name] = previous
+                    else:
+                        entries[item.name] = self._describe(item.name, item.path, modified)
+                        changed = True
+
+            if entries.keys() != self._entries.keys():
+                self._matcher = None
+                changed = True
+            self._entries = entries
+            self._sorted = sorted(entries.values(), key=lambda entry: entry.name.lower())
+            self._root_mtime = root_mtime
+
+        if changed:
+            logger.info(f"Project index refreshed: {len(entries)} projects in {self.root}")
+            for callback in self._listeners:
+                try:
+                    callback(self)
+                except Exception as e:
+                    logger.error(f"Project index listener failed: {e}", exc_info=True)
+
+    def _describe(self, name: str, path: str, modified: float) -> ProjectEntry:
+        try:
+            with os.scandir(path) as scan:
+                children = {child.name for child in scan}
+        except OSError:
+            children = set()
+        language = next((lang for marker, lang in LANGUAGE_MARKERS if marker in children), None)
+        return ProjectEntry(name, path, modified, language, ".git" in children)
+
+    def start_watching(self) -> None:
+        """Refresh in a background thread every ``refresh_interval`` seconds"""
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="project-index", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Background project index refresh failed: {e}")
+
+
+_indexes: Dict[str, ProjectIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_project_index() -> ProjectIndex:
+    """Return the shared index for the directory named by the PROJECTS env var"""
+    project_dir = get_settings().projects
+    if not project_dir:
+        raise ValueError("PROJECTS environment variable is not set")
+
+    index = _indexes.get(project_dir)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(project_dir)
+            if index is None:
+                index = ProjectIndex(Path(project_dir).expanduser().resolve())
+                # Cached results of tools that read the projects go stale with the index
+                index.add_listener(lambda _: ToolCache.invalidate_all(PROJECTS_CHANGED))
+                index.start_watching()
+                _indexes[project_dir] = index
+    return index
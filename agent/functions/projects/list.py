@@ -1,8 +1,4 @@
-import dotenv
-import os
-from pathlib import Path
-
-dotenv.load_dotenv()
+from .index import get_project_index
 
 def list_all_projects():
     """
@@ -10,22 +6,20 @@ def list_all_projects():
 
     This function loads the environment variable 'PROJECTS' to determine
     the directory where projects are stored. It then lists all directories
-    within the specified path and returns them.
+    within the specified path and returns them, annotated with the detected
+    language and whether the project is a git repository.
+
+    Directory entries are served from the shared project index, which only
+    rescans the projects root when it changed.
 
     Returns:
         list: A list of project directory names.
     """
-    project_dir = os.getenv("PROJECTS")
-    
-    if not project_dir:
-        raise ValueError("PROJECTS environment variable is not set")
-    
-    # Convert to Path object for cross-platform compatibility
-    project_path = Path(project_dir).expanduser().resolve()
-    
-    # Check if directory exists
-    if not project_path.exists():
-        raise FileNotFoundError(f"Directory {project_path} does not exist")
-    
+    entries = get_project_index().entries()
+
+    def describe(entry):
+        tags = [tag for tag in (entry.language, "git" if entry.has_git else None) if tag]
+        return f"- {entry.name} ({', '.join(tags)})" if tags else f"- {entry.name}"
+
     # Convert list of directories to formatted string
-    return "\n".join([f"- {item.name}" for item in project_path.iterdir() if item.is_dir()])
+    return "\n".join(describe(entry) for entry in entries)
@@ -1,74 +1,94 @@
-import dotenv
 import os
-from pathlib import Path
+from typing import List, Tuple
 from agent.logger_config import logger
+from agent.settings import get_settings
+from .index import get_project_index
 import subprocess
 
-dotenv.load_dotenv()
-
-def open_project(project_name: str):
+def resolve_project(project_name: str) -> Tuple[str, str, List[Tuple[str, float]]]:
     """
-    Open a project in Visual Studio Code.
-
-    This function loads the environment variable 'PROJECTS' to determine
-    the directory where projects are stored. It then opens the specified
-    project directory in VS Code.
+    Find the project directory that best matches a (possibly inexact) name.
 
     Args:
-        project_name: Name of the project directory to open
+        project_name: Name of the project directory to look for
 
     Returns:
-        str: Success message if project opened successfully
+        tuple: The matched directory name, its full path and the ranked
+        candidates as (name, score) pairs
 
     Raises:
         ValueError: If PROJECTS env var not set
-        FileNotFoundError: If project directory doesn't exist
+        FileNotFoundError: If no project directory is similar enough
     """
-    logger.info(f"Attempting to open project: '{project_name}'")
-    
-    project_dir = os.getenv("PROJECTS")
-    logger.info(f"Retrieved PROJECTS env var: {project_dir}")
-    
-    if not project_dir:
+    try:
+        index = get_project_index()
+    except ValueError:
         logger.error("PROJECTS environment variable is not set")
-        raise ValueError("PROJECTS environment variable is not set")
-    project_dir = os.path.expanduser(project_dir)
+        raise
+    project_dir = str(index.root)
     
-    # Use fuzzy matching to find best matching project directory
-    from difflib import SequenceMatcher
-
-    def similarity_score(a: str, b: str) -> float:
-        return SequenceMatcher(None, a.lower(), b.lower()).ratio()
-
-    # Get all project directories
-    logger.info(f"Scanning directory: {project_dir}")
-    project_dirs = [
-        d for d in os.listdir(project_dir)
-        if os.path.isdir(os.path.join(project_dir, d))
-    ]
-    logger.info(f"Found {len(project_dirs)} potential project directories")
+    # Get all project directories from the shared index
+    matcher = index.matcher()
+    logger.info(f"Found {len(matcher)} potential project directories")
     
-    if not project_dirs:
+    if not len(matcher):
         logger.error(f"No projects found in {project_dir}")
         raise FileNotFoundError(f"No projects found in {project_dir}")
         
-    # Find best match using fuzzy string matching
-    logger.info("Starting fuzzy matching process")
-    matches = [(d, similarity_score(project_name, d)) for d in project_dirs]
-    best_match = max(matches, key=lambda x: x[1])
+    # Rank candidates through the trigram index
+    threshold = get_settings().project_match_threshold
+    candidates = matcher.search(project_name, k=5)
+    best_match = candidates[0] if candidates else (None, 0.0)
     logger.info(f"Best match: '{best_match[0]}' with similarity score: {best_match[1]:.2f}")
     
-    # Require minimum similarity threshold of 0.3
-    if best_match[1] < 0.3:
+    # Require minimum similarity threshold
+    if best_match[1] < threshold:
         logger.error(f"No projects found similar to '{project_name}' (best match: '{best_match[0]}' with score {best_match[1]:.2f})")
-        raise FileNotFoundError(f"No projects found similar to '{project_name}'")
+        closest = ", ".join(f"{name} ({score:.2f})" for name, score in candidates)
+        raise FileNotFoundError(
+            f"No projects found similar to '{project_name}'" + (f". Closest: {closest}" if closest else "")
+        )
         
-    project_name = best_match[0]
-    
     # Build full path to project
-    project_path = os.path.join(project_dir, project_name)
+    project_path = os.path.join(project_dir, best_match[0])
     logger.info(f"Full project path: {project_path}")
-    
+    return best_match[0], project_path, candidates
+
+def open_project(project_name: str):
+    """
+    Open a project in Visual Studio Code.
+
+    This function loads the environment variable 'PROJECTS' to determine
+    the directory where projects are stored. It then opens the specified
+    project directory in VS Code.
+
+    Args:
+        project_name: Name of the project directory to open
+
+    Returns:
+        str: Success message if project opened successfully, listing other
+        close matches with their scores so the caller can disambiguate
+
+    Raises:
+        ValueError: If PROJECTS env var not set
+        FileNotFoundError: If project directory doesn't exist
+    """
+    logger.info(f"Attempting to open project: '{project_name}'")
+    return launch_project(*resolve_project(project_name))
+
+
+def launch_project(project_name: str, project_path: str, candidates: List[Tuple[str, float]]) -> str:
+    """
+    Open an already resolved project in Visual Studio Code.
+
+    Args:
+        project_name: Project name as returned by ``resolve_project``
+        project_path: Project directory as returned by ``resolve_project``
+        candidates: Ranked matches as returned by ``resolve_project``
+
+    Returns:
+        str: The same message as ``open_project``
+    """
     # Open VS Code in new process
     logger.info(f"Launching VS Code for project: {project_name}")
     try:
@@ -78,4 +98,9 @@ def open_project(project_name: str):
         logger.error(f"Failed to launch VS Code: {str(e)}")
         raise
     
-    return f"Opened project '{project_name}' in VS Code"
+    threshold = get_settings().project_match_threshold
+    result = f"Opened project '{project_name}' in VS Code"
+    alternatives = [f"{name} ({score:.2f})" for name, score in candidates[1:] if score >= threshold]
+    if alternatives:
+        result += f". Other close matches: {', '.join(alternatives)}"
+    return result
@@ -1,16 +1,136 @@
+import atexit
 import logging
+import logging.handlers
+import queue
+import time
 from datetime import datetime
 
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+STREAM_LOGGER = 'ai_chat.stream'
+TRANSCRIPT_LOGGER = 'ai_chat.transcript'
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """File handler that flushes on a timer instead of after every record.
+
+    Errors are flushed immediately; everything else is written through the
+    file object's buffer and flushed at most every ``flush_interval`` seconds.
+    """
+
+    def __init__(self, filename, flush_interval: float = 1.0, **kwargs):
+        super().__init__(filename, delay=True, encoding='utf-8', **kwargs)
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+
+    def emit(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            now = time.monotonic()
+            if record.levelno >= logging.ERROR or now - self._last_flush >= self.flush_interval:
+                self.stream.flush()
+                self._last_flush = now
+        except Exception:
+            self.handleError(record)
+
+
+class SampleFilter(logging.Filter):
+    """Let through one record in every ``every``"""
+
+    def __init__(self, every: int = 50):
+        super().__init__()
+        self.every = every
+        self._count = 0
+
+    def filter(self, record):
+        self._count += 1
+        return self._count % self.every == 1 or self.every <= 1
+
+
+class _NameFilter(logging.Filter):
+    def __init__(self, name: str, include: bool):
+        super().__init__()
+        self.prefix = name
+        self.include = include
+
+    def filter(self, record):
+        return record.name.startswith(self.prefix) == self.include
+
+
+_IMMUTABLE_ARGS = (str, int, float, bool, bytes, type(None))
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves formatting to the listener thread.
+
+    ``msg % args`` is only deferred while the message is a string and every
+    argument is immutable; anything else (dicts, lists, SDK objects) is
+    merged here, so the log shows its value at the time of the call and the
+    object is never read from another thread.
+    """
+
+    def prepare(self, record):
+        if record.args and not (
+            isinstance(record.msg, str)
+            and isinstance(record.args, tuple)
+            and all(isinstance(arg, _IMMUTABLE_ARGS) for arg in record.args)
+        ):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            # Tracebacks cannot cross threads safely; render them here
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
 def setup_logger():
-    """Configure and return the logger instance"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(f'ai_agent_{datetime.now().strftime("%Y%m%d")}.log'),
-            logging.StreamHandler()
-        ]
+    """Configure the logging pipeline and return the logger instance.
+
+    Loggers only enqueue records; a ``QueueListener`` thread formats them and
+    does all file and console I/O. The UI transcript (``assistant.log``) is
+    served by the same listener through its own buffered handler.
+    """
+    log_queue = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(log_queue)
+
+    file_handler = BufferedFileHandler(f'ai_agent_{datetime.now().strftime("%Y%m%d")}.log')
+    console_handler = logging.StreamHandler()
+    transcript_handler = BufferedFileHandler('assistant.log')
+
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handler.addFilter(_NameFilter(TRANSCRIPT_LOGGER, include=False))
+    transcript_handler.setFormatter(logging.Formatter('[%(asctime)s] %(message)s', '%Y-%m-%d %H:%M:%S'))
+    transcript_handler.addFilter(_NameFilter(TRANSCRIPT_LOGGER, include=True))
+
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, transcript_handler,
+        respect_handler_level=True
     )
+    listener.start()
+
+    def shutdown():
+        listener.stop()
+        for handler in (file_handler, console_handler, transcript_handler):
+            handler.close()
+
+    atexit.register(shutdown)
+
+    # Per-chunk detail: DEBUG only, sampled
+    stream_logger = logging.getLogger(STREAM_LOGGER)
+    stream_logger.addFilter(SampleFilter())
+
+    transcript_logger = logging.getLogger(TRANSCRIPT_LOGGER)
+    transcript_logger.setLevel(logging.INFO)
+    transcript_logger.propagate = False
+    transcript_logger.addHandler(queue_handler)
+
     return logging.getLogger('ai_chat')
 
-logger = setup_logger()
\ No newline at end of file
+logger = setup_logger()
+stream_logger = logging.getLogger(STREAM_LOGGER)
+transcript_logger = logging.getLogger(TRANSCRIPT_LOGGER)
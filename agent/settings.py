@@ -0,0 +1,126 @@
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+PROVIDERS = ("anthropic", "openai")
+
+
+def _flag(name: str, default: str) -> bool:
+    return os.getenv(name, default) == "True"
+
+
+def _text(name: str) -> Optional[str]:
+    value = os.getenv(name)
+    return value.strip() or None if value else None
+
+
+def _number(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Application configuration, read once from the environment and ``.env``.
+
+    Every option keeps the name of its environment variable in lower case,
+    e.g. ``SESSION_IDLE_TIMEOUT`` is ``session_idle_timeout``.
+    """
+
+    # Providers
+    anthropic_api_key: Optional[str] = None
+    openai_api_key: Optional[str] = None
+    anthropic_base_url: Optional[str] = None
+    openai_base_url: Optional[str] = None
+    debug: bool = False
+    hedge_requests: bool = False
+    hedge_deadline: float = 4.0
+    # Per provider ``requests_per_minute``, ``tokens_per_minute`` and ``max_concurrency`` overrides
+    provider_limits: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+    # HTTP connections
+    http_max_connections: int = 20
+    http_max_keepalive_connections: int = 10
+    http_keepalive_expiry: float = 120.0
+    prewarm_connections: bool = True
+
+    # Sessions
+    resume_session: bool = True
+    session_max_resident: int = 100
+    session_memory_limit_mb: float = 256.0
+    session_idle_timeout: float = 1800.0
+    session_spill_retention_days: float = 7.0
+
+    # Headless server
+    alfred_host: str = "127.0.0.1"
+    alfred_port: int = 8765
+    alfred_server_token: Optional[str] = None
+
+    # Context window; None sends as much history as the model's context holds
+    context_max_tokens: Optional[int] = None
+
+    # Projects
+    projects: Optional[str] = None
+    project_match_threshold: float = 0.3
+    project_agents_warm: int = 4
+    project_outline_tokens: int = 1500
+
+    # Telemetry
+    telemetry: bool = False
+    telemetry_dir: str = os.path.join(".cache", "telemetry")
+    telemetry_interval: float = 10.0
+    telemetry_retention_days: float = 7.0
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        provider_limits = {}
+        for provider in PROVIDERS:
+            prefix = provider.upper()
+            limits = {
+                name: float(os.environ[f"{prefix}_{name.upper()}"])
+                for name in ("requests_per_minute", "tokens_per_minute", "max_concurrency")
+                if os.getenv(f"{prefix}_{name.upper()}")
+            }
+            if limits:
+                provider_limits[provider] = limits
+
+        return cls(
+            anthropic_api_key=_text("ANTHROPIC_API_KEY"),
+            openai_api_key=_text("OPENAI_API_KEY"),
+            anthropic_base_url=_text("ANTHROPIC_BASE_URL"),
+            openai_base_url=_text("OPENAI_BASE_URL"),
+            debug=_flag("DEBUG", "False"),
+            hedge_requests=_flag("HEDGE_REQUESTS", "False"),
+            hedge_deadline=_number("HEDGE_DEADLINE", cls.hedge_deadline),
+            provider_limits=provider_limits,
+            http_max_connections=int(_number("HTTP_MAX_CONNECTIONS", cls.http_max_connections)),
+            http_max_keepalive_connections=int(_number("HTTP_MAX_KEEPALIVE_CONNECTIONS", cls.http_max_keepalive_connections)),
+            http_keepalive_expiry=_number("HTTP_KEEPALIVE_EXPIRY", cls.http_keepalive_expiry),
+            prewarm_connections=_flag("PREWARM_CONNECTIONS", "True"),
+            resume_session=_flag("RESUME_SESSION", "True"),
+            session_max_resident=int(_number("SESSION_MAX_RESIDENT", cls.session_max_resident)),
+            session_memory_limit_mb=_number("SESSION_MEMORY_LIMIT_MB", cls.session_memory_limit_mb),
+            session_idle_timeout=_number("SESSION_IDLE_TIMEOUT", cls.session_idle_timeout),
+            session_spill_retention_days=_number("SESSION_SPILL_RETENTION_DAYS", cls.session_spill_retention_days),
+            alfred_host=_text("ALFRED_HOST") or cls.alfred_host,
+            alfred_port=int(_number("ALFRED_PORT", cls.alfred_port)),
+            alfred_server_token=_text("ALFRED_SERVER_TOKEN"),
+            context_max_tokens=int(_number("CONTEXT_MAX_TOKENS", 0)) or None,
+            projects=_text("PROJECTS"),
+            project_match_threshold=_number("PROJECT_MATCH_THRESHOLD", cls.project_match_threshold),
+            project_agents_warm=int(_number("PROJECT_AGENTS_WARM", cls.project_agents_warm)),
+            project_outline_tokens=int(_number("PROJECT_OUTLINE_TOKENS", cls.project_outline_tokens)),
+            telemetry=_flag("TELEMETRY", "False"),
+            telemetry_dir=_text("TELEMETRY_DIR") or cls.telemetry_dir,
+            telemetry_interval=_number("TELEMETRY_INTERVAL", cls.telemetry_interval),
+            telemetry_retention_days=_number("TELEMETRY_RETENTION_DAYS", cls.telemetry_retention_days),
+        )
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """Load ``.env`` and the environment once; ``get_settings.cache_clear()`` reloads them"""
+    load_dotenv()
+    return Settings.from_env()
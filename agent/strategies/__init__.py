@@ -1,6 +1,22 @@
+import importlib
 from .base import AIStrategy
-from .openai_strategy import OpenAIStrategy
-from .anthropic_strategy import AnthropicStrategy
+from .synthetic_strategy import SyntheticStrategy, SyntheticError
 from .dummy_strategy import DummyStrategy
+from .hedged_strategy import HedgedStrategy
+from .clients import prewarm_clients
 
-__all__ = ['AIStrategy', 'OpenAIStrategy', 'AnthropicStrategy', 'DummyStrategy']
\ No newline at end of file
+# Importing a provider SDK dominates startup time, so these are loaded on first access
+_LAZY = {
+    'OpenAIStrategy': '.openai_strategy',
+    'AnthropicStrategy': '.anthropic_strategy',
+    'ClientRegistry': '.clients',
+}
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+__all__ = ['AIStrategy', 'OpenAIStrategy', 'AnthropicStrategy', 'DummyStrategy', 'SyntheticStrategy', 'SyntheticError', 'HedgedStrategy', 'ClientRegistry', 'prewarm_clients']
\ No newline at end of file
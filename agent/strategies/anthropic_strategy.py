@@ -1,171 +1,214 @@
-from anthropic import Anthropic
+from anthropic import APIConnectionError
 from typing import List, Dict, Optional, Any
 import asyncio
 import json
 from .base import AIStrategy
-from ..logger_config import logger
+from .clients import ClientRegistry
+from .streaming_json import IncrementalJSONParser
+from .scheduler import THROTTLE_STATUSES, Attempt, RequestScheduler, estimate_request_tokens
+from ..logger_config import logger, stream_logger
+from ..telemetry import current_turn
+import logging
+import time
 
 class AnthropicStrategy(AIStrategy):
     def __init__(self, api_key: str):
         super().__init__()
         self.api_key = api_key
         self.client = None
-        self.current_stream = None
-        self.current_tool_calls = {} 
-    
-    @property
-    def default_model(self) -> str:
-        return "claude-3-5-sonnet-20241022"
-    
-    def initialize_client(self) -> None:
-        if not self.client:
-            logger.info("Initializing Anthropic client")
-            self.client = Anthropic(api_key=self.api_key)
-    
-    def cancel_current_stream(self):
-        if self.current_stream and not self.current_stream.done():
-            self.current_stream.cancel()
-    
-    from anthropic import Anthropic
-from typing import List, Dict, Optional, Any
-import asyncio
-import json
-from .base import AIStrategy
-from ..logger_config import logger
+        self.prompt_caching = True
+        self.sampling_params = {"max_tokens": 1000, "temperature": 0}
+        self.scheduler = RequestScheduler.shared("anthropic", retryable_errors=(APIConnectionError,))
 
-class AnthropicStrategy(AIStrategy):
-    def __init__(self, api_key: str):
-        super().__init__()
-        self.api_key = api_key
-        self.client = None
-        self.current_stream = None
-        self.current_tool_calls = {}  # Store incomplete tool calls
-    
     @property
     def default_model(self) -> str:
         return "claude-3-5-sonnet-20241022"
-    
+
     def initialize_client(self) -> None:
         if not self.client:
-            logger.info("Initializing Anthropic client")
-            self.client = Anthropic(api_key=self.api_key)
-    
-    def cancel_current_stream(self):
-        if self.current_stream and not self.current_stream.done():
-            self.current_stream.cancel()
-    
-    async def stream_message(self, messages: List[Dict], system: str, model: str):
-        try:
-            chunks = []
-            current_tool_call = None
-            current_json = ""
-            
-            kwargs = {
-                "model": model,
-                "max_tokens": 1000,
-                "temperature": 0,
-                "system": system,
-                "messages": messages
-            }
-            
-            # Add tools if available
-            if self.tools:
-                kwargs["tools"] = self.get_tool_definitions()
-            
-            with self.client.messages.stream(**kwargs) as stream:
-                for chunk in stream:
-                    logger.info(f"Received chunk type: {chunk.type}")
-                    logger.info(f"Received chunk: {chunk}")
-                    
-                    if chunk.type == "content_block_start":
+            # Shared across strategies, so a new agent reuses the warm connection pool
+            self.client = ClientRegistry.get().anthropic(self.api_key)
+
+    def build_cached_request(self, messages: List[Dict], system: str) -> Dict[str, Any]:
+        """Build system, tools and messages with prompt-cache breakpoints.
+
+        Breakpoints go on the tool block, the system block, the previous user
+        message (written by the last turn, read back now) and the newest message
+        (written for the next turn). That is the API maximum of four.
+        """
+        cache_control = {"type": "ephemeral"}
+        request: Dict[str, Any] = {
+            "system": [{"type": "text", "text": system, "cache_control": cache_control}]
+        }
+
+        if self.tools:
+            tools = self.get_tool_definitions()
+            tools[-1] = {**tools[-1], "cache_control": cache_control}
+            request["tools"] = tools
+
+        user_turns = [i for i, message in enumerate(messages) if message["role"] == "user"]
+        breakpoints = {len(messages) - 1}
+        if len(user_turns) > 1:
+            breakpoints.add(user_turns[-2])
+
+        cached_messages = list(messages)
+        for index in breakpoints:
+            if index < 0:
+                continue
+            message = cached_messages[index]
+            content = list(message["content"])
+            content[-1] = {**content[-1], "cache_control": cache_control}
+            cached_messages[index] = {**message, "content": content}
+        request["messages"] = cached_messages
+        return request
+
+    async def stream_message(self, messages: List[Dict], system: str, model: str, chunks: List[str],
+                             separator: str = "") -> Dict[str, Any]:
+        """Stream one model step.
+
+        Text is streamed as it arrives and collected into ``chunks``. Returns the
+        assistant content blocks of the step and the tool calls it requested.
+        The request goes through the shared scheduler, which paces it against
+        the rate limits and retries it if it is throttled before streaming.
+        """
+        kwargs = {
+            "model": model,
+            **self.sampling_params,
+            "system": system,
+            "messages": messages
+        }
+
+        # Add tools if available
+        if self.tools:
+            kwargs["tools"] = self.get_tool_definitions()
+
+        if self.prompt_caching:
+            kwargs.update(self.build_cached_request(messages, system))
+
+        async def attempt(slot: Attempt) -> Dict[str, Any]:
+            tool_calls: Dict[int, Dict[str, Any]] = {}  # Keyed by content block index
+            completed_calls: List[Dict[str, Any]] = []
+            text_blocks: Dict[int, List[str]] = {}
+
+            usage = {"input": 0, "cache_read": 0, "cache_write": 0, "output": 0}
+            event_count = 0
+            text_count = 0
+            started = time.monotonic()
+            log_chunks = stream_logger.isEnabledFor(logging.DEBUG)
+
+            def emit(index: int, text: str) -> None:
+                nonlocal separator, text_count
+                slot.mark_streamed()
+                self.output_started()
+                text_count += 1
+                if separator:
+                    chunks.append(separator)
+                    self.stream_chunk(separator)
+                    separator = ""
+                text_blocks.setdefault(index, []).append(text)
+                chunks.append(text)
+                self.stream_chunk(text)
+
+            async with self.client.messages.stream(**kwargs) as stream:
+                response = getattr(stream, 'response', None)
+                slot.observe_headers(getattr(response, 'headers', None))
+
+                async for chunk in stream:
+                    event_count += 1
+                    if log_chunks:
+                        stream_logger.debug("Received chunk %s: %r", chunk.type, chunk)
+
+                    if chunk.type == "message_start":
+                        message_usage = getattr(chunk.message, 'usage', None)
+                        if message_usage:
+                            usage["input"] = message_usage.input_tokens or 0
+                            usage["cache_read"] = getattr(message_usage, 'cache_read_input_tokens', 0) or 0
+                            usage["cache_write"] = getattr(message_usage, 'cache_creation_input_tokens', 0) or 0
+
+                    elif chunk.type == "message_delta":
+                        if getattr(chunk, 'usage', None):
+                            usage["output"] = chunk.usage.output_tokens or 0
+
+                    elif chunk.type == "content_block_start":
                         if hasattr(chunk, 'content_block'):
                             if getattr(chunk.content_block, 'type', None) == 'tool_use':
+                                slot.mark_streamed()
+                                self.output_started()
                                 tool_name = chunk.content_block.name
-                                current_tool_call = {
+                                tool_calls[chunk.index] = {
+                                    'id': chunk.content_block.id,
                                     'name': tool_name,
-                                    'arguments': {},  # Initialize empty dict
-                                    'complete': True  # Mark as complete immediately for no-argument tools
+                                    'parser': IncrementalJSONParser()
                                 }
                                 logger.info(f"Starting tool call: {tool_name}")
                             elif getattr(chunk.content_block, 'type', None) == 'text':
                                 if hasattr(chunk.content_block, 'text') and chunk.content_block.text:
-                                    text = chunk.content_block.text
-                                    chunks.append(text)
-                                    self.stream_chunk(text)
-                    
+                                    emit(chunk.index, chunk.content_block.text)
+
                     elif chunk.type == "content_block_delta":
-                        if current_tool_call and hasattr(chunk.delta, 'type') and chunk.delta.type == 'input_json_delta':
-                            if hasattr(chunk.delta, 'partial_json'):
-                                current_json += chunk.delta.partial_json
-                                logger.info(f"Accumulated JSON: {current_json}")
-                                
-                                # Only try to parse JSON if it's not empty
-                                if current_json.strip():
-                                    try:
-                                        args = json.loads(current_json)
-                                        current_tool_call['arguments'] = args
-                                        current_tool_call['complete'] = True
-                                        logger.info(f"Completed tool arguments: {json.dumps(args, indent=2)}")
-                                    except json.JSONDecodeError:
-                                        # If JSON is incomplete, continue accumulating
-                                        continue
+                        if getattr(chunk.delta, 'type', None) == 'input_json_delta':
+                            tool_call = tool_calls.get(chunk.index)
+                            if tool_call and getattr(chunk.delta, 'partial_json', None):
+                                tool_call['parser'].feed(chunk.delta.partial_json)
                         elif hasattr(chunk.delta, 'text'):
-                            text = chunk.delta.text
-                            chunks.append(text)
-                            self.stream_chunk(text)
-                    
+                            emit(chunk.index, chunk.delta.text)
+
                     elif chunk.type == "content_block_stop":
-                        if current_tool_call and current_tool_call['complete']:
-                            tool_name = current_tool_call['name']
-                            args = current_tool_call['arguments']
-                            
-                            if tool_name in self.tools:
-                                try:
-                                    logger.info(f"Executing tool: {tool_name}")
-                                    tool_func = self.tools[tool_name]["function"]
-                                    
-                                    # Execute tool with or without arguments
-                                    if asyncio.iscoroutinefunction(tool_func):
-                                        result = await tool_func(**args) if args else await tool_func()
-                                    else:
-                                        result = tool_func(**args) if args else tool_func()
-                                    
-                                    logger.info(f"Tool {tool_name} executed successfully")
-                                    logger.info(f"Tool result: {result}")
-                                    
-                                    response_text = f"\n{result}"
-                                    chunks.append(response_text)
-                                    self.stream_chunk(response_text)
-                                    
-                                except Exception as e:
-                                    logger.error(f"Error executing tool {tool_name}: {str(e)}", exc_info=True)
-                                    error_msg = f"\nError executing tool {tool_name}: {str(e)}\n"
-                                    chunks.append(error_msg)
-                                    self.stream_chunk(error_msg)
-                            
-                            current_tool_call = None
-                            current_json = ""
-                            
-                    await asyncio.sleep(0)
-            
-            return "".join(chunks)
-            
+                        tool_call = tool_calls.pop(getattr(chunk, 'index', None), None)
+                        if tool_call:
+                            call = {'index': chunk.index, 'id': tool_call['id'], 'name': tool_call['name']}
+                            try:
+                                call['arguments'] = tool_call['parser'].result()
+                                logger.info(f"Tool call {call['name']} arguments: {json.dumps(call['arguments'])}")
+                            except json.JSONDecodeError as e:
+                                call['arguments'] = {}
+                                call['error'] = f"Invalid JSON arguments for tool {call['name']}: {e}"
+                            completed_calls.append(call)
+
+            slot.record_usage(usage["input"] + usage["cache_write"] + usage["output"])
+            turn = current_turn()
+            if turn is not None:
+                turn.step("anthropic", slot, usage["input"] + usage["cache_read"] + usage["cache_write"], usage["output"])
+            logger.info(
+                f"Anthropic step: events={event_count} text_chunks={text_count} "
+                f"tool_calls={len(completed_calls)} duration={time.monotonic() - started:.2f}s "
+                f"usage: input={usage['input']} cache_read={usage['cache_read']} "
+                f"cache_write={usage['cache_write']} output={usage['output']}"
+            )
+
+            blocks = [
+                (index, {"type": "text", "text": "".join(parts)})
+                for index, parts in text_blocks.items() if any(parts)
+            ]
+            blocks += [
+                (call['index'], {"type": "tool_use", "id": call['id'], "name": call['name'], "input": call['arguments']})
+                for call in completed_calls
+            ]
+            return {
+                "content": [block for _, block in sorted(blocks, key=lambda item: item[0])],
+                "tool_calls": completed_calls
+            }
+
+        try:
+            estimated_tokens = estimate_request_tokens(kwargs["messages"]) + self.sampling_params["max_tokens"]
+            return await self.scheduler.run(attempt, estimated_tokens)
+        except asyncio.CancelledError:
+            logger.info("Anthropic stream cancelled")
+            raise
         except Exception as e:
             logger.error(f"Error in Anthropic stream: {e}", exc_info=True)
             raise
 
-    def chat(self, prompts: List[Dict[str, str]], model: Optional[str] = None) -> str:
+    async def achat(self, prompts: List[Dict[str, str]], model: Optional[str] = None) -> str:
+        chunks: List[str] = []
         try:
             self.initialize_client()
             model = model or self.default_model
             logger.info(f"Starting Anthropic chat with model: {model}")
 
-            if self.current_stream:
-                self.cancel_current_stream()
-
             system = "You are a helpful assistant."
             messages = []
-            
+
             for prompt in prompts:
                 if prompt["role"] == "system":
                     system = prompt["content"]
@@ -180,25 +223,54 @@ class AnthropicStrategy(AIStrategy):
                         ]
                     })
 
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            try:
-                self.current_stream = asyncio.ensure_future(
-                    self.stream_message(messages, system, model),
-                    loop=loop
+            cache_key = self.response_cache_key(
+                provider="anthropic", model=model, system=system,
+                messages=messages, tools=self.get_tool_definitions()
+            )
+            cached = await self.replay_cached_response(cache_key)
+            if cached is not None:
+                return cached
+
+            # Agentic loop: feed tool results back until the model stops calling tools
+            used_tools = False
+            for iteration in range(self.max_tool_iterations + 1):
+                step = await self.stream_message(
+                    messages, system, model, chunks,
+                    separator="\n\n" if chunks else ""
                 )
-                return loop.run_until_complete(self.current_stream)
-            finally:
-                loop.close()
+                if not step["tool_calls"]:
+                    break
+                used_tools = True
+                if iteration == self.max_tool_iterations:
+                    logger.warning(f"Stopping after {self.max_tool_iterations} tool iterations")
+                    break
+
+                results = await self.run_tool_calls(step["tool_calls"])
+                messages.append({"role": "assistant", "content": step["content"]})
+                messages.append({
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "tool_result",
+                            "tool_use_id": result["id"],
+                            "content": result["result"],
+                            "is_error": result["is_error"]
+                        }
+                        for result in results
+                    ]
+                })
+
+            self.store_response(cache_key, chunks, used_tools)
+            return "".join(chunks)
 
         except Exception as e:
-            if "rate_limit" in str(e).lower():
+            status = getattr(e, 'status_code', None)
+            if status in THROTTLE_STATUSES:
                 logger.error(f"Anthropic rate limit error: {e}")
-            elif "status" in str(e).lower():
-                logger.error(f"Anthropic status error: {e}")
-            elif "bad_request" in str(e).lower():
+            elif status == 400:
                 logger.error(f"Anthropic bad request error: {e}")
+            elif status is not None:
+                logger.error(f"Anthropic status error: {e}")
             else:
                 logger.error(f"Unexpected error in Anthropic chat: {e}", exc_info=True)
-            raise
\ No newline at end of file
+            raise
@@ -1,43 +1,90 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional, Callable, Any
+from typing import List, Dict, Optional, Callable, Any, Set
+import asyncio
+import threading
+import time
+from .runtime import StrategyRuntime
+from .response_cache import ResponseCache
+from .tool_cache import ToolCache
+from ..logger_config import logger
+from ..telemetry import Telemetry, current_turn
 
 class AIStrategy(ABC):
     """Abstract base class for AI chat strategies"""
-    
+
     def __init__(self):
         """Initialize strategy with stream callback support"""
         self.on_stream: Optional[Callable[[str], None]] = None
+        self.on_output: Optional[Callable[[], None]] = None
         self.tools: Dict[str, Dict[str, Any]] = {}
-    
+        self.max_tool_iterations = 5
+        self.sampling_params: Dict[str, Any] = {}
+        self.use_response_cache = True
+        self.response_cache: Optional[ResponseCache] = None
+        self.tool_cache = ToolCache()
+        self.runtime = StrategyRuntime.get()
+        self._inflight: Set[asyncio.Task] = set()
+        self._inflight_lock = threading.Lock()
+
     @abstractmethod
     def initialize_client(self) -> None:
         """Initialize the API client"""
         pass
-    
+
     @abstractmethod
-    def chat(self, prompts: List[Dict[str, str]], model: Optional[str] = None) -> str:
-        """Execute chat with the AI model"""
+    async def achat(self, prompts: List[Dict[str, str]], model: Optional[str] = None) -> str:
+        """Execute chat with the AI model on the runtime event loop"""
         pass
-    
+
+    def chat(self, prompts: List[Dict[str, str]], model: Optional[str] = None) -> str:
+        """Execute chat with the AI model, blocking until the turn completes"""
+        return self.runtime.run(self._tracked(self.achat(prompts, model)))
+
+    async def _tracked(self, coro):
+        """Await a turn while keeping its task visible to cancel_current_stream"""
+        task = asyncio.current_task()
+        with self._inflight_lock:
+            self._inflight.add(task)
+        try:
+            return await coro
+        finally:
+            with self._inflight_lock:
+                self._inflight.discard(task)
+
+    def cancel_current_stream(self) -> None:
+        """Cancel every turn of this strategy that is still in flight"""
+        with self._inflight_lock:
+            tasks = list(self._inflight)
+        for task in tasks:
+            self.runtime.loop.call_soon_threadsafe(task.cancel)
+
     @property
     @abstractmethod
     def default_model(self) -> str:
         """Default model to use for this strategy"""
         pass
-    
+
     def set_stream_callback(self, callback: Optional[Callable[[str], None]]) -> None:
         """Set the callback function for streaming responses"""
         self.on_stream = callback
-    
+
+    def output_started(self) -> None:
+        """Report streamed output of any kind, text or a tool call, before it is handled"""
+        if self.on_output:
+            self.on_output()
+
     def stream_chunk(self, chunk: str) -> None:
         """Safely stream a chunk of text through the callback if it exists"""
+        turn = current_turn()
+        if turn is not None and turn.strategy is self:
+            turn.chunk()
         if self.on_stream:
             self.on_stream(chunk)
 
     def set_tools(self, tools: Dict[str, Dict[str, Any]]) -> None:
         """Set the available tools for this strategy"""
         self.tools = tools
-    
+
     def get_tool_definitions(self) -> List[Dict[str, Any]]:
         """Convert tools dictionary to format expected by LLM APIs"""
         return [
@@ -47,4 +94,90 @@ class AIStrategy(ABC):
                 "input_schema": tool["input_schema"]
             }
             for name, tool in self.tools.items()
-        ]
\ No newline at end of file
+        ]
+
+    async def execute_tool(self, name: str, args: Dict[str, Any]) -> Any:
+        """Run a registered tool without blocking the event loop.
+
+        Coroutine tools are awaited directly; plain functions are pushed to the
+        default executor so other turns keep streaming while they run. Tools
+        registered as idempotent are served from the tool cache when possible.
+        """
+        tool = self.tools[name]
+        tool_func = tool["function"]
+        args = args or {}
+        key = ToolCache.key(name, tool, args)
+        if key is not None:
+            hit, result = self.tool_cache.get(key)
+            Telemetry.get().increment("alfred_tool_cache_total", tool=name, result="hit" if hit else "miss")
+            if hit:
+                logger.info(f"Tool cache hit for {name} ({self.tool_cache.stats(name)})")
+                return result
+
+        if asyncio.iscoroutinefunction(tool_func):
+            result = await tool_func(**args)
+        else:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(None, lambda: tool_func(**args))
+        if key is not None:
+            self.tool_cache.put(key, tool, result)
+        return result
+
+    async def run_tool_calls(self, calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Execute the tool calls requested in one model step concurrently.
+
+        Each call has ``id``, ``name`` and ``arguments`` (or an ``error`` if its
+        arguments could not be decoded). The returned calls carry the tool output
+        as ``result`` text plus an ``is_error`` flag, ready to be sent back.
+        """
+        async def run(call: Dict[str, Any]) -> Dict[str, Any]:
+            name = call["name"]
+            if call.get("error"):
+                return {**call, "result": call["error"], "is_error": True}
+            if name not in self.tools:
+                return {**call, "result": f"Unknown tool: {name}", "is_error": True}
+            turn = current_turn()
+            started = time.perf_counter()
+            try:
+                logger.info(f"Executing tool: {name}")
+                result = await self.execute_tool(name, call["arguments"])
+                logger.info(f"Tool {name} executed successfully")
+                if turn is not None:
+                    turn.tool(name, time.perf_counter() - started, False)
+                return {**call, "result": str(result), "is_error": False}
+            except Exception as e:
+                logger.error(f"Error executing tool {name}: {str(e)}", exc_info=True)
+                if turn is not None:
+                    turn.tool(name, time.perf_counter() - started, True)
+                return {**call, "result": f"Error executing tool {name}: {str(e)}", "is_error": True}
+
+        return list(await asyncio.gather(*(run(call) for call in calls)))
+
+    def response_cache_key(self, **request: Any) -> Optional[str]:
+        """Cache key for a request, or None if its response is not reproducible.
+
+        Only requests sampled at temperature 0 are cached, and only when the
+        strategy has not been opted out via ``use_response_cache``.
+        """
+        if not self.use_response_cache or self.sampling_params.get("temperature") != 0:
+            return None
+        if self.response_cache is None:
+            self.response_cache = ResponseCache.shared()
+        return ResponseCache.make_key(params=self.sampling_params, **request)
+
+    async def replay_cached_response(self, key: Optional[str]) -> Optional[str]:
+        """Stream a cached response through the callback and return it, if present"""
+        if key is None:
+            return None
+        chunks = await self.response_cache.aget(key)
+        if chunks is None:
+            return None
+        logger.info(f"Response cache hit ({self.response_cache.stats()})")
+        for chunk in chunks:
+            self.stream_chunk(chunk)
+        return "".join(chunks)
+
+    def store_response(self, key: Optional[str], chunks: List[str], used_tools: bool) -> None:
+        """Cache a finished response; turns that ran tools are never cached"""
+        if key is not None and not used_tools and chunks:
+            self.response_cache.put(key, list(chunks))
@@ -0,0 +1,155 @@
+import asyncio
+import importlib
+import threading
+from types import ModuleType
+from typing import Any, Dict, List, Optional, Tuple
+from .runtime import StrategyRuntime
+from ..logger_config import logger
+from ..settings import get_settings
+
+# Hosts the provider SDKs talk to, used for pre-warming
+BASE_URLS = {
+    "anthropic": "https://api.anthropic.com",
+    "openai": "https://api.openai.com/v1",
+}
+
+
+class ClientRegistry:
+    """Process-wide provider clients on shared, pooled HTTP connections.
+
+    Each provider gets one pooled HTTP client (the SDK's own
+    ``DefaultAsyncHttpxClient``) whose connections are used by every SDK
+    client created for it, and SDK clients are shared per
+    API key, so a new agent or strategy reuses warm keep-alive connections
+    instead of paying for a new pool and TLS handshake on its first turn.
+
+    Pool limits default to ``HTTP_MAX_CONNECTIONS`` (20),
+    ``HTTP_MAX_KEEPALIVE_CONNECTIONS`` (10) and ``HTTP_KEEPALIVE_EXPIRY``
+    (120 seconds of idle time before a pooled connection is dropped). SDK
+    clients are created with ``max_retries=0``; retries belong to the
+    ``RequestScheduler``. The SDKs are imported on first use.
+    """
+
+    _instance: Optional["ClientRegistry"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        connect_timeout: float = 10.0,
+    ):
+        settings = get_settings()
+        self.limits = {
+            "max_connections": max_connections if max_connections is not None else settings.http_max_connections,
+            "max_keepalive_connections": (
+                max_keepalive_connections if max_keepalive_connections is not None
+                else settings.http_max_keepalive_connections
+            ),
+            "keepalive_expiry": keepalive_expiry if keepalive_expiry is not None else settings.http_keepalive_expiry,
+        }
+        self.connect_timeout = connect_timeout
+        self._http: Dict[str, Any] = {}
+        self._clients: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get(cls) -> "ClientRegistry":
+        """Return the shared registry, creating it on first use"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def _http_package(client_class: type) -> ModuleType:
+        """The httpx package an SDK client class is built on (``httpx`` or ``httpx2``)"""
+        for cls in client_class.__mro__:
+            package = cls.__module__.partition(".")[0]
+            if package.startswith("httpx"):
+                return importlib.import_module(package)
+        raise TypeError(f"{client_class.__name__} is not an httpx client")
+
+    def http_client(self, provider: str) -> Any:
+        """Pooled HTTP client shared by all SDK clients of ``provider``.
+
+        It is the SDK's own ``DefaultAsyncHttpxClient``, since the SDKs only
+        accept clients of the httpx package they were built on.
+        """
+        with self._lock:
+            client = self._http.get(provider)
+            if client is None or client.is_closed:
+                client_class = importlib.import_module(provider).DefaultAsyncHttpxClient
+                http = self._http_package(client_class)
+                client = client_class(
+                    limits=http.Limits(**self.limits),
+                    timeout=http.Timeout(600.0, connect=self.connect_timeout),
+                    follow_redirects=True,
+                )
+                self._http[provider] = client
+            return client
+
+    def anthropic(self, api_key: str):
+        key = ("anthropic", api_key)
+        with self._lock:
+            client = self._clients.get(key)
+        if client is None:
+            from anthropic import AsyncAnthropic
+            logger.info("Initializing Anthropic client")
+            client = AsyncAnthropic(api_key=api_key, max_retries=0, http_client=self.http_client("anthropic"))
+            with self._lock:
+                client = self._clients.setdefault(key, client)
+        return client
+
+    def openai(self, api_key: str):
+        key = ("openai", api_key)
+        with self._lock:
+            client = self._clients.get(key)
+        if client is None:
+            import openai
+            logger.info("Initializing OpenAI client")
+            client = openai.AsyncOpenAI(api_key=api_key, max_retries=0, http_client=self.http_client("openai"))
+            with self._lock:
+                client = self._clients.setdefault(key, client)
+        return client
+
+    async def prewarm(self, provider: str, timeout: float = 10.0) -> bool:
+        """Open a pooled connection to the provider (DNS, TCP and TLS) ahead of the first request"""
+        url = getattr(get_settings(), f"{provider}_base_url") or BASE_URLS[provider]
+        try:
+            # Any response will do; the point is the connection left in the pool
+            await self.http_client(provider).head(url, timeout=timeout)
+            logger.debug(f"Pre-warmed connection to {url}")
+            return True
+        except Exception as e:
+            logger.debug(f"Pre-warming {url} failed: {e}")
+            return False
+
+
+    async def aclose(self) -> None:
+        with self._lock:
+            clients = list(self._http.values())
+            self._http.clear()
+            self._clients.clear()
+        await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+
+
+async def _prewarm(providers: List[str]) -> None:
+    registry = ClientRegistry.get()
+    await asyncio.gather(*(registry.prewarm(provider) for provider in providers))
+
+
+def prewarm_clients() -> None:
+    """Pre-warm connections to every provider with an API key in the background, unless disabled.
+
+    Set ``PREWARM_CONNECTIONS=False`` to skip; nothing is done in debug mode.
+    Everything, including importing the SDKs, happens on the runtime thread.
+    """
+    settings = get_settings()
+    if not settings.prewarm_connections or settings.debug:
+        return
+    providers = [provider for provider in BASE_URLS if getattr(settings, f"{provider}_api_key")]
+    if providers:
+        StrategyRuntime.get().submit(_prewarm(providers))
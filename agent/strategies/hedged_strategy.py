@@ -0,0 +1,246 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+from .base import AIStrategy
+from .latency import LatencyHistogram
+from ..logger_config import logger
+from ..settings import get_settings
+
+class _Race:
+    """State of one hedged turn: which provider won"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.winner: Optional[int] = None
+        self.won = loop.create_future()
+
+    def claim(self, index: int) -> bool:
+        """Make ``index`` the winner unless another provider got there first"""
+        if self.winner is None:
+            self.winner = index
+            self.won.set_result(index)
+        return self.winner == index
+
+
+# Race of the hedged turn running in this context; provider tasks inherit it, so concurrent turns never mix
+_current_race: ContextVar[Optional[_Race]] = ContextVar("hedged_race", default=None)
+
+
+class HedgedStrategy(AIStrategy):
+    """Composite strategy that races providers to cut tail latency.
+
+    A turn starts on the provider with the best recent record. If it has not
+    produced its first output (text or a tool call) within the hedge
+    deadline, the same turn is also sent to the next provider; whichever
+    reports output first through ``on_output`` wins and the others are
+    cancelled. Output of a provider is only forwarded once it has won, and
+    only the winner may run tools, so side effects never happen twice. Each
+    turn keeps its race in a context variable, so concurrent turns on one
+    instance never see each other's output.
+
+    The deadline is the ``hedge_quantile`` of the first provider's
+    first-output latency histogram, clamped to ``[min_deadline,
+    max_deadline]``; until ``min_samples`` turns have been seen it is
+    ``default_deadline`` (``HEDGE_DEADLINE``). Only observed first outputs
+    are recorded: a provider cancelled after losing only counts in
+    ``censored``, since the time it was cut off would understate its
+    latency and pull its deadline down. A provider that fails before
+    producing output is failed over to the next one immediately, and is not
+    tried first again until ``failure_cooldown`` seconds have passed.
+    """
+
+    def __init__(
+        self,
+        strategies: List[AIStrategy],
+        default_deadline: Optional[float] = None,
+        hedge_quantile: float = 0.95,
+        min_deadline: float = 0.5,
+        max_deadline: float = 30.0,
+        min_samples: int = 10,
+        failure_cooldown: float = 60.0,
+    ):
+        super().__init__()
+        if not strategies:
+            raise ValueError("HedgedStrategy needs at least one strategy")
+        self.strategies = strategies
+        self.default_deadline = default_deadline if default_deadline is not None else get_settings().hedge_deadline
+        self.hedge_quantile = hedge_quantile
+        self.min_deadline = min_deadline
+        self.max_deadline = max_deadline
+        self.min_samples = min_samples
+        self.failure_cooldown = failure_cooldown
+        self.latency = [LatencyHistogram() for _ in strategies]
+        # Turns a provider lost before producing output; their latency is unknown, only longer than the winner's
+        self.censored = [0] * len(strategies)
+        self.failures = [0] * len(strategies)  # Consecutive failures per provider
+        self._failed_at = [0.0] * len(strategies)
+        for index, strategy in enumerate(strategies):
+            strategy.on_stream = self._forwarder(index)
+            strategy.on_output = self._claimer(index)
+            # Whichever provider runs a tool, the session sees one cache
+            strategy.tool_cache = self.tool_cache
+
+    @property
+    def default_model(self) -> str:
+        return self.strategies[0].default_model
+
+    def initialize_client(self) -> None:
+        for strategy in self.strategies:
+            strategy.initialize_client()
+
+    def provider_name(self, index: int) -> str:
+        return type(self.strategies[index]).__name__.replace("Strategy", "")
+
+    def deadline_for(self, index: int) -> float:
+        histogram = self.latency[index]
+        if histogram.count < self.min_samples:
+            return self.default_deadline
+        return min(self.max_deadline, max(self.min_deadline, histogram.quantile(self.hedge_quantile)))
+
+    def ranked(self) -> List[int]:
+        """Provider indices; providers that failed within ``failure_cooldown`` go last, then by median latency"""
+        now = time.monotonic()
+
+        def key(index: int):
+            median = self.latency[index].quantile(0.5)
+            recently_failed = self.failures[index] > 0 and now - self._failed_at[index] < self.failure_cooldown
+            return (recently_failed, median if median is not None else 0.0, index)
+        return sorted(range(len(self.strategies)), key=key)
+
+    def _claimer(self, index: int) -> Callable[[], None]:
+        def claim() -> None:
+            race = _current_race.get()
+            if race is not None:
+                race.claim(index)
+        return claim
+
+    def _forwarder(self, index: int) -> Callable[[str], None]:
+        def forward(chunk: str) -> None:
+            race = _current_race.get()
+            if race is not None and race.claim(index):
+                self.stream_chunk(chunk)
+        return forward
+
+    def set_tools(self, tools: Dict[str, Dict[str, Any]]) -> None:
+        """Give every provider the tools, guarded so only the race winner can run them"""
+        self.tools = tools
+        for index, strategy in enumerate(self.strategies):
+            strategy.set_tools({
+                name: {**tool, "function": self._guarded(index, tool["function"])}
+                for name, tool in tools.items()
+            })
+
+    def _guarded(self, index: int, func: Callable) -> Callable:
+        async def guarded(**kwargs):
+            race = _current_race.get()
+            if race is not None and not race.claim(index):
+                raise asyncio.CancelledError()
+            if asyncio.iscoroutinefunction(func):
+                return await func(**kwargs)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, lambda: func(**kwargs))
+        return guarded
+
+    def _model_for(self, index: int, model: Optional[str]) -> Optional[str]:
+        """Only pass an explicit model to the provider it belongs to"""
+        default = self.strategies[index].default_model or ""
+        if model and model.split("-")[0] == default.split("-")[0]:
+            return model
+        return None
+
+    async def achat(self, prompts: List[Dict[str, str]], model: Optional[str] = None) -> str:
+        loop = asyncio.get_running_loop()
+        race = _Race(loop)
+        # Set before the provider tasks are created, so each copies this turn's race into its context
+        race_token = _current_race.set(race)
+        order = self.ranked()
+        tasks: Dict[asyncio.Task, int] = {}
+        started: Dict[int, float] = {}
+        errors: List[BaseException] = []
+
+        def launch(index: int) -> None:
+            strategy = self.strategies[index]
+            strategy.use_response_cache = self.use_response_cache
+            started[index] = loop.time()
+            tasks[asyncio.ensure_future(strategy.achat(prompts, self._model_for(index, model)))] = index
+
+        def record_latency(index: int) -> None:
+            # Only observed first outputs; a cancelled loser's time would understate its latency
+            self.latency[index].record(loop.time() - started[index])
+
+        launch(order[0])
+        pending = list(order[1:])
+        hedge_at = loop.time() + self.deadline_for(order[0])
+
+        try:
+            while tasks:
+                waiting = set(tasks)
+                timeout = None
+                if race.winner is None:
+                    waiting.add(race.won)
+                    if pending:
+                        timeout = max(0.0, hedge_at - loop.time())
+                done, _ = await asyncio.wait(waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    first = order[0]
+                    hedge = pending.pop(0)
+                    logger.info(
+                        f"No output from {self.provider_name(first)} after {self.deadline_for(first):.2f}s, "
+                        f"hedging with {self.provider_name(hedge)}"
+                    )
+                    launch(hedge)
+                    hedge_at = loop.time() + self.deadline_for(hedge)
+                    continue
+
+                if race.won in done:
+                    record_latency(race.winner)
+                    for task, index in tasks.items():
+                        if index != race.winner:
+                            self.censored[index] += 1
+                            task.cancel()
+                    if len(started) > 1:
+                        logger.info(f"Hedged turn won by {self.provider_name(race.winner)}")
+
+                for task in done:
+                    if task is race.won:
+                        continue
+                    index = tasks.pop(task)
+                    if task.cancelled() or (race.winner is not None and race.winner != index):
+                        continue
+                    error = task.exception()
+                    if error is None:
+                        self.failures[index] = 0
+                        if race.winner is None:
+                            race.claim(index)
+                            record_latency(index)
+                        for other in tasks:
+                            other.cancel()
+                        return task.result()
+
+                    self.failures[index] += 1
+                    self._failed_at[index] = time.monotonic()
+                    errors.append(error)
+                    if race.winner == index:
+                        # Output has already been shown; retrying elsewhere would repeat it
+                        raise error
+                    logger.warning(f"{self.provider_name(index)} failed before responding: {error}")
+                    if pending and len(tasks) == 0:
+                        failover = pending.pop(0)
+                        logger.info(f"Failing over to {self.provider_name(failover)}")
+                        launch(failover)
+                        hedge_at = loop.time() + self.deadline_for(failover)
+
+            raise errors[-1] if errors else RuntimeError("No provider produced a response")
+
+        finally:
+            for task in tasks:
+                task.cancel()
+            _current_race.reset(race_token)
+
+    def stats(self) -> Dict[str, str]:
+        """First-output latency summary per provider, with the number of lost races"""
+        return {
+            self.provider_name(index): f"{histogram.summary()}, lost {self.censored[index]}"
+            for index, histogram in enumerate(self.latency)
+        }
@@ -0,0 +1,63 @@
+import math
+from typing import List, Optional
+
+class LatencyHistogram:
+    """Log-bucketed histogram of latencies in seconds.
+
+    Buckets grow geometrically from ``min_value`` to ``max_value`` so relative
+    precision is the same for fast and slow samples. Once ``window`` samples
+    have been recorded all counts are halved, which lets quantiles follow
+    recent behaviour instead of the whole process lifetime.
+    """
+
+    def __init__(self, min_value: float = 0.01, max_value: float = 120.0,
+                 buckets_per_decade: int = 20, window: int = 500):
+        self.min_value = min_value
+        self.max_value = max_value
+        self._log_factor = math.log(10) / buckets_per_decade
+        self._size = int(math.ceil(math.log(max_value / min_value) / self._log_factor)) + 1
+        self._counts: List[float] = [0.0] * (self._size + 1)
+        self.window = window
+        self.count = 0.0
+        self.total = 0.0
+
+    def _index(self, seconds: float) -> int:
+        if seconds <= self.min_value:
+            return 0
+        return min(self._size, int(math.log(seconds / self.min_value) / self._log_factor) + 1)
+
+    def _upper_bound(self, index: int) -> float:
+        return min(self.max_value, self.min_value * math.exp(index * self._log_factor))
+
+    def record(self, seconds: float) -> None:
+        self._counts[self._index(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if self.count >= self.window:
+            self._counts = [count / 2 for count in self._counts]
+            self.count /= 2
+            self.total /= 2
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the ``q`` quantile, or None if empty"""
+        if self.count <= 0:
+            return None
+        target = q * self.count
+        cumulative = 0.0
+        for index, count in enumerate(self._counts):
+            cumulative += count
+            if cumulative >= target and count:
+                return self._upper_bound(index)
+        return self.max_value
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def summary(self) -> str:
+        if not self.count:
+            return "no samples"
+        return (
+            f"n={self.count:.0f} p50={self.quantile(0.5):.2f}s "
+            f"p95={self.quantile(0.95):.2f}s p99={self.quantile(0.99):.2f}s"
+        )
@@ -1,18 +1,21 @@
 import openai
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Any
 from .base import AIStrategy
-from ..logger_config import logger
-from concurrent.futures import CancelledError
+from .clients import ClientRegistry
+from .streaming_json import IncrementalJSONParser
+from .scheduler import Attempt, RequestScheduler, estimate_request_tokens
+from ..logger_config import logger, stream_logger
+from ..telemetry import current_turn
 import asyncio
-import json
+import logging
+import time
 
 class OpenAIStrategy(AIStrategy):
     def __init__(self, api_key: str):
         super().__init__()
         self.api_key = api_key
         self.client = None
-        self.current_task = None
-        self.current_tool_calls = {}  # Store incomplete tool calls
+        self.scheduler = RequestScheduler.shared("openai", retryable_errors=(openai.APIConnectionError,))
     
     @property
     def default_model(self) -> str:
@@ -20,43 +23,53 @@ class OpenAIStrategy(AIStrategy):
     
     def initialize_client(self) -> None:
         if not self.client:
-            logger.info("Initializing OpenAI client")
-            self.client = openai.OpenAI(api_key=self.api_key)
+            # Shared across strategies, so a new agent reuses the warm connection pool
+            self.client = ClientRegistry.get().openai(self.api_key)
     
-    def cancel_current_stream(self):
-        if self.current_task and not self.current_task.done():
-            self.current_task.cancel()
-    
-    async def stream_message(self, messages: List[Dict[str, str]], model: str, callback):
-        try:
-            self.initialize_client()
-            logger.info(f"Starting OpenAI streaming chat with model: {model}")
-            
-            kwargs = {
-                "model": model,
-                "messages": messages,
-                "stream": True
-            }
-            
-            if self.tools:
-                kwargs["tools"] = [
-                    {
-                        "type": "function",
-                        "function": {
-                            "name": name,
-                            "description": tool["description"],
-                            "parameters": tool["input_schema"]
-                        }
+    async def stream_message(self, messages: List[Dict[str, Any]], model: str, callback) -> Dict[str, Any]:
+        """Stream one model step, returning its text and the tool calls it requested.
+
+        The request goes through the shared scheduler, which paces it against
+        the rate limits and retries it if it is throttled before streaming.
+        """
+        self.initialize_client()
+        logger.info(f"Starting OpenAI streaming chat with model: {model}")
+        
+        kwargs = {
+            "model": model,
+            "messages": messages,
+            "stream": True,
+            **self.sampling_params
+        }
+        
+        if self.tools:
+            kwargs["tools"] = [
+                {
+                    "type": "function",
+                    "function": {
+                        "name": name,
+                        "description": tool["description"],
+                        "parameters": tool["input_schema"]
                     }
-                    for name, tool in self.tools.items()
-                ]
-            
-            stream = self.client.chat.completions.create(**kwargs)
+                }
+                for name, tool in self.tools.items()
+            ]
+        
+        async def attempt(slot: Attempt) -> Dict[str, Any]:
+            stream = await self.client.chat.completions.create(**kwargs)
+            response = getattr(stream, 'response', None)
+            slot.observe_headers(getattr(response, 'headers', None))
             
             full_response = []
-            for chunk in stream:
-                if asyncio.current_task().cancelled():
-                    raise asyncio.CancelledError()
+            current_tool_calls = {}  # Incomplete tool calls keyed by stream index
+            chunk_count = 0
+            started = time.monotonic()
+            log_chunks = stream_logger.isEnabledFor(logging.DEBUG)
+            
+            async for chunk in stream:
+                chunk_count += 1
+                if log_chunks:
+                    stream_logger.debug("Received chunk: %r", chunk)
                 
                 # Handle tool calls
                 if hasattr(chunk.choices[0], 'delta') and hasattr(chunk.choices[0].delta, 'tool_calls'):
@@ -64,115 +77,123 @@ class OpenAIStrategy(AIStrategy):
                     tool_calls = delta.tool_calls
                     
                     if tool_calls:
+                        slot.mark_streamed()
+                        self.output_started()
                         for tool_call in tool_calls:
-                            tool_call_id = tool_call.id if tool_call.id else list(self.current_tool_calls.keys())[-1]
-                            
                             # Initialize new tool call
-                            if tool_call_id not in self.current_tool_calls:
-                                self.current_tool_calls[tool_call_id] = {
-                                    'function': {'name': '', 'arguments': ''},
-                                    'type': 'function',
-                                    'complete': False
+                            current_call = current_tool_calls.get(tool_call.index)
+                            if current_call is None:
+                                current_call = current_tool_calls[tool_call.index] = {
+                                    'id': tool_call.id,
+                                    'name': '',
+                                    'parser': IncrementalJSONParser()
                                 }
                             
-                            current_call = self.current_tool_calls[tool_call_id]
-                            
                             # Update function name if present
                             if hasattr(tool_call.function, 'name') and tool_call.function.name:
-                                current_call['function']['name'] = tool_call.function.name
+                                current_call['name'] = tool_call.function.name
                             
-                            # Append arguments if present
+                            # Feed argument fragments; completeness is tracked incrementally
                             if hasattr(tool_call.function, 'arguments') and tool_call.function.arguments:
-                                current_call['function']['arguments'] += tool_call.function.arguments
-                            
-                            # Check if we have a complete tool call
-                            try:
-                                # Attempt to parse arguments as JSON to check completeness
-                                if current_call['function']['name'] and current_call['function']['arguments']:
-                                    json.loads(current_call['function']['arguments'])
-                                    current_call['complete'] = True
-                            except json.JSONDecodeError:
-                                # Arguments are not complete JSON yet
-                                continue
-                            
-                            # Execute complete tool calls
-                            if current_call['complete'] and not current_call.get('executed', False):
-                                try:
-                                    tool_name = current_call['function']['name']
-                                    logger.info(f"Executing complete tool call: {tool_name}")
-                                    args = json.loads(current_call['function']['arguments'])
-                                    
-                                    if tool_name in self.tools:
-                                        tool_func = self.tools[tool_name]["function"]
-                                        
-                                        if asyncio.iscoroutinefunction(tool_func):
-                                            result = await tool_func(**args)
-                                        else:
-                                            result = tool_func(**args)
-                                        
-                                        result_text = f"\n{result}\n"
-                                        callback(result_text)
-                                        full_response.append(result_text)
-                                        
-                                        current_call['executed'] = True
-                                    
-                                except Exception as e:
-                                    error_msg = f"\nError executing tool {tool_name}: {str(e)}\n"
-                                    logger.error(error_msg)
-                                    callback(error_msg)
-                                    full_response.append(error_msg)
-                                    current_call['executed'] = True
+                                current_call['parser'].feed(tool_call.function.arguments)
                 
                     # Handle regular content
                     elif hasattr(chunk.choices[0].delta, 'content') and chunk.choices[0].delta.content:
+                        slot.mark_streamed()
+                        self.output_started()
                         content = chunk.choices[0].delta.content
                         callback(content)
                         full_response.append(content)
-                
-                await asyncio.sleep(0)
             
-            # Clean up completed tool calls at the end
-            self.current_tool_calls = {k: v for k, v in self.current_tool_calls.items() 
-                                     if not v.get('executed', False)}
+            completed_calls = []
+            for index in sorted(current_tool_calls):
+                current_call = current_tool_calls[index]
+                call = {'id': current_call['id'], 'name': current_call['name']}
+                try:
+                    call['arguments'] = current_call['parser'].result()
+                except ValueError as e:
+                    call['arguments'] = {}
+                    call['error'] = f"Invalid JSON arguments for tool {call['name']}: {e}"
+                call['raw_arguments'] = current_call['parser'].text or "{}"
+                completed_calls.append(call)
             
-            return "".join(full_response)
+            turn = current_turn()
+            if turn is not None:
+                # The stream reports no usage, so both counts are estimated from the text
+                output_chars = sum(len(text) for text in full_response) + sum(len(call['raw_arguments']) for call in completed_calls)
+                turn.step("openai", slot, estimate_request_tokens(messages), output_chars // 4, estimated=True)
             
+            logger.info(
+                f"OpenAI step: chunks={chunk_count} text_chunks={len(full_response)} "
+                f"tool_calls={len(completed_calls)} duration={time.monotonic() - started:.2f}s"
+            )
+            return {"content": "".join(full_response), "tool_calls": completed_calls}
+        
+        try:
+            return await self.scheduler.run(attempt, estimate_request_tokens(messages))
         except asyncio.CancelledError:
             logger.info("OpenAI stream cancelled")
-            raise CancelledError()
+            raise
         except Exception as e:
             logger.error(f"Error in OpenAI stream: {e}", exc_info=True)
             raise
 
-    def chat(self, prompts: List[Dict[str, str]], model: Optional[str] = None) -> str:
-        if self.current_task:
-            self.cancel_current_stream()
-        
+    async def achat(self, prompts: List[Dict[str, str]], model: Optional[str] = None) -> str:
         model = model or self.default_model
         messages = [
             {"role": "system", "content": "You are a helpful assistant."},
         ]
         messages.extend(prompts)
         
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        chunks = []
+        separator = ""
         
-        async def run_stream():
-            chunks = []
-            
-            def collect_chunks(chunk):
-                chunks.append(chunk)
-                self.stream_chunk(chunk)
-            
-            try:
-                await self.stream_message(messages, model, collect_chunks)
-                return "".join(chunks)
-            except CancelledError:
-                return "".join(chunks) + " (cancelled)"
+        def collect_chunks(chunk):
+            nonlocal separator
+            if separator:
+                chunks.append(separator)
+                self.stream_chunk(separator)
+                separator = ""
+            chunks.append(chunk)
+            self.stream_chunk(chunk)
         
-        self.current_task = asyncio.ensure_future(run_stream(), loop=loop)
+        cache_key = self.response_cache_key(
+            provider="openai", model=model, messages=messages,
+            tools=self.get_tool_definitions()
+        )
+        cached = await self.replay_cached_response(cache_key)
+        if cached is not None:
+            return cached
         
-        try:
-            return loop.run_until_complete(self.current_task)
-        finally:
-            loop.close()
\ No newline at end of file
+        # Agentic loop: feed tool results back until the model stops calling tools
+        used_tools = False
+        for iteration in range(self.max_tool_iterations + 1):
+            separator = "\n\n" if chunks else ""
+            step = await self.stream_message(messages, model, collect_chunks)
+            if not step["tool_calls"]:
+                break
+            used_tools = True
+            if iteration == self.max_tool_iterations:
+                logger.warning(f"Stopping after {self.max_tool_iterations} tool iterations")
+                break
+            
+            results = await self.run_tool_calls(step["tool_calls"])
+            messages.append({
+                "role": "assistant",
+                "content": step["content"] or None,
+                "tool_calls": [
+                    {
+                        "id": call["id"],
+                        "type": "function",
+                        "function": {"name": call["name"], "arguments": call["raw_arguments"]}
+                    }
+                    for call in step["tool_calls"]
+                ]
+            })
+            messages.extend(
+                {"role": "tool", "tool_call_id": result["id"], "content": result["result"]}
+                for result in results
+            )
+        
+        self.store_response(cache_key, chunks, used_tools)
+        return "".join(chunks)
@@ -0,0 +1,212 @@
+import asyncio
+import atexit
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from ..logger_config import logger
+
+class ResponseCache:
+    """Content-addressed cache of complete responses to deterministic requests.
+
+    Keys are SHA-256 hashes of everything that determines a response (provider,
+    model, system prompt, messages, tool definitions and sampling parameters).
+    Values are the streamed chunks, so a hit can be replayed through the same
+    stream callback. Lookups go to an in-memory LRU first and then to a SQLite
+    file, which is trimmed by age and total size; entries older than
+    ``max_age`` are misses in both tiers.
+
+    Strategies call ``aget`` on the runtime loop, which reads the file on a
+    worker thread, and ``put`` only queues the write for a background writer
+    thread, so turns streaming on the loop never wait for the disk.
+    """
+
+    _shared: Optional["ResponseCache"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        path: str = os.path.join(".cache", "responses.sqlite3"),
+        memory_entries: int = 256,
+        max_bytes: int = 50 * 1024 * 1024,
+        max_age: float = 7 * 24 * 3600,
+    ):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._memory: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()  # key -> (created, chunks)
+        self._memory_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()  # Guards the SQLite connection
+        self._pending: "queue.SimpleQueue[Optional[Tuple[str, str, float]]]" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._writes = 0
+        self._flushed = threading.Event()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+    @classmethod
+    def shared(cls) -> "ResponseCache":
+        """Process-wide cache instance"""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        """Hash the request parts into a stable cache key"""
+        canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str, ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, chunks TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+        return self._db
+
+    def _recall(self, key: str) -> Optional[List[str]]:
+        """Chunks from the memory tier, dropping them once expired"""
+        with self._memory_lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.max_age:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self.hits_memory += 1
+            return entry[1]
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """Return the cached chunks for ``key`` or None; may block on the disk"""
+        chunks = self._recall(key)
+        return chunks if chunks is not None else self._read(key)
+
+    async def aget(self, key: str) -> Optional[List[str]]:
+        """``get`` for the event loop: a memory hit is returned at once, the disk is read on a thread"""
+        chunks = self._recall(key)
+        return chunks if chunks is not None else await asyncio.to_thread(self._read, key)
+
+    def _read(self, key: str) -> Optional[List[str]]:
+        with self._lock:
+            try:
+                db = self._connection()
+                row = db.execute(
+                    "SELECT chunks, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row and time.time() - row[1] <= self.max_age:
+                    db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+                    db.commit()
+                    chunks = json.loads(row[0])
+                    self._remember(key, chunks, row[1])
+                    self.hits_disk += 1
+                    return chunks
+            except sqlite3.Error as e:
+                logger.error(f"Response cache read failed: {e}")
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, chunks: List[str]) -> None:
+        """Store the chunks of a complete response; the disk write happens in the background"""
+        now = time.time()
+        self._remember(key, chunks, now)
+        if self._writer is None:
+            with self._memory_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="response-cache-writer", daemon=True)
+                    self._writer.start()
+                    atexit.register(self.flush)
+        self._pending.put((key, json.dumps(chunks, ensure_ascii=False), now))
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._pending.get()
+            if item is None:
+                self._flushed.set()
+                continue
+            key, payload, now = item
+            with self._lock:
+                try:
+                    db = self._connection()
+                    db.execute(
+                        "INSERT OR REPLACE INTO responses (key, chunks, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                        (key, payload, len(payload), now, now)
+                    )
+                    self._writes += 1
+                    if self._writes % 50 == 1:
+                        self._evict(db, now)
+                    db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Response cache write failed: {e}")
+
+    def flush(self, timeout: Optional[float] = 5.0) -> None:
+        """Wait until the queued writes have reached the disk"""
+        if self._writer is None:
+            return
+        self._flushed.clear()
+        self._pending.put(None)
+        self._flushed.wait(timeout)
+
+    def _remember(self, key: str, chunks: List[str], created: float) -> None:
+        with self._memory_lock:
+            self._memory[key] = (created, chunks)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> None:
+        """Drop expired rows, then least recently used rows until under max_bytes"""
+        db.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        stale = []
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        db.executemany("DELETE FROM responses WHERE key = ?", stale)
+        logger.info(f"Response cache evicted {len(stale)} entries ({freed} bytes)")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters"""
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        self.flush()
+        with self._memory_lock:
+            self._memory.clear()
+        with self._lock:
+            try:
+                self._connection().execute("DELETE FROM responses")
+                self._connection().commit()
+            except sqlite3.Error as e:
+                logger.error(f"Response cache clear failed: {e}")
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+from ..logger_config import logger
+
+class StrategyRuntime:
+    """Process-wide background event loop shared by all strategies.
+
+    The loop lives on a single daemon thread for the lifetime of the process.
+    Strategies submit coroutines to it instead of creating (and tearing down)
+    a private loop per turn, so several turns can be in flight at once.
+    """
+
+    _instance: Optional["StrategyRuntime"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get(cls) -> "StrategyRuntime":
+        """Return the shared runtime, creating it on first use"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The running background loop, started lazily"""
+        if self._loop is None or self._loop.is_closed():
+            self.start()
+        return self._loop
+
+    def start(self) -> None:
+        """Start the loop thread if it is not already running"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._started.clear()
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._run_loop,
+                name="strategy-runtime",
+                daemon=True
+            )
+            self._thread.start()
+        self._started.wait()
+        logger.info("Strategy runtime event loop started")
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(self._started.set)
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    def in_loop_thread(self) -> bool:
+        """Whether the caller is running on the runtime thread"""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> Future:
+        """Schedule a coroutine on the loop and return a concurrent future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and block the calling thread for its result"""
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("StrategyRuntime.run() cannot be called from the runtime thread")
+        return self.submit(coro).result(timeout)
+
+    def shutdown(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop the loop and wait for the thread to exit"""
+        with self._lock:
+            if not self._loop or not self._thread:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            if not self.in_loop_thread():
+                self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,323 @@
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Tuple, Type, TypeVar
+from ..logger_config import logger
+from ..settings import get_settings
+
+T = TypeVar("T")
+
+# Statuses worth retrying; 429 (rate limited) and 529 (overloaded) also pause the whole scheduler
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504, 529}
+THROTTLE_STATUSES = {429, 529}
+
+# Provider defaults until the first response reports the real limits
+DEFAULT_LIMITS = {
+    "anthropic": {"requests_per_minute": 50, "tokens_per_minute": 40000},
+    "openai": {"requests_per_minute": 500, "tokens_per_minute": 30000},
+}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def estimate_request_tokens(payload: Any) -> int:
+    """Rough token count of a request payload (about four characters per token)"""
+    return len(json.dumps(payload, default=str, ensure_ascii=False)) // 4
+
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds until a rate limit resets.
+
+    Accepts RFC 3339 timestamps (Anthropic), Go-style durations such as
+    ``6m0s`` or ``20ms`` (OpenAI) and plain seconds (``retry-after``).
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if parts:
+        return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+    try:
+        reset = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return max(0.0, reset.timestamp() - time.time())
+    except ValueError:
+        return None
+
+
+def parse_rate_limit_headers(headers: Mapping[str, str]) -> Dict[str, Tuple[Optional[float], Optional[float], Optional[float]]]:
+    """Extract ``(limit, remaining, reset_seconds)`` for requests and tokens.
+
+    Understands both the ``anthropic-ratelimit-*`` and the ``x-ratelimit-*``
+    (OpenAI) header families; missing values are None.
+    """
+    def number(name: str) -> Optional[float]:
+        value = headers.get(name)
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+    limits = {}
+    for kind in ("requests", "tokens"):
+        if f"anthropic-ratelimit-{kind}-limit" in headers:
+            limits[kind] = (
+                number(f"anthropic-ratelimit-{kind}-limit"),
+                number(f"anthropic-ratelimit-{kind}-remaining"),
+                _parse_reset(headers.get(f"anthropic-ratelimit-{kind}-reset")),
+            )
+        elif f"x-ratelimit-limit-{kind}" in headers:
+            limits[kind] = (
+                number(f"x-ratelimit-limit-{kind}"),
+                number(f"x-ratelimit-remaining-{kind}"),
+                _parse_reset(headers.get(f"x-ratelimit-reset-{kind}")),
+            )
+    return limits
+
+
+class TokenBucket:
+    """Per-minute budget that refills continuously.
+
+    Reservations may take the level below zero; the caller then waits until
+    the refill has covered the debt, so waiting requests are admitted in the
+    order they reserved.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take ``amount`` and return the seconds to wait before using it"""
+        self._refill(now)
+        self.level -= amount
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def refund(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], now: float) -> None:
+        """Adopt the limit reported by the provider and never exceed its remaining budget"""
+        self._refill(now)
+        if limit:
+            self.capacity = limit
+            self.rate = limit / 60.0
+        if remaining is not None:
+            self.level = min(self.level, remaining)
+
+
+class Attempt:
+    """Handle given to one try of a scheduled request"""
+
+    def __init__(self, scheduler: "RequestScheduler", release: Optional[Callable[[], None]] = None):
+        self.scheduler = scheduler
+        self._release = release
+        self.streamed = False
+        self.used_tokens: Optional[int] = None
+        # Monotonic timestamps for telemetry
+        self.started = time.monotonic()
+        self.headers_at: Optional[float] = None
+        self.streamed_at: Optional[float] = None
+
+    def mark_streamed(self) -> None:
+        """Output has reached the caller; the request can no longer be retried"""
+        if not self.streamed:
+            self.streamed = True
+            self.streamed_at = time.monotonic()
+
+    def release_slot(self) -> None:
+        """Give the concurrency slot back; called once the response has started"""
+        if self._release is not None:
+            release, self._release = self._release, None
+            release()
+
+    def observe_headers(self, headers: Optional[Mapping[str, str]]) -> None:
+        self.headers_at = time.monotonic()
+        # Streaming the body costs the provider nothing the rate limits do not already cover
+        self.release_slot()
+        if headers is not None:
+            self.scheduler.update_limits(headers)
+
+    def record_usage(self, tokens: int) -> None:
+        """Actual tokens used, to correct the estimate charged at admission"""
+        self.used_tokens = tokens
+
+
+class RequestScheduler:
+    """Paces requests to one provider and retries the ones that were throttled.
+
+    Every request reserves one request and its estimated tokens from two
+    token buckets (requests/min and tokens/min), which are kept in line with
+    the provider's rate-limit response headers. At most ``max_concurrency``
+    requests wait for their response headers at a time; once the headers
+    have arrived the slot is handed on, so long streams do not hold it and
+    many sessions can stream at once. Throttling (429) and overload (529) responses
+    pause all requests for the ``retry-after`` time or a jittered exponential
+    backoff, then retry; a request is only retried if nothing has been
+    streamed from it yet.
+    """
+
+    _shared: Dict[str, "RequestScheduler"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float = 50,
+        tokens_per_minute: float = 40000,
+        max_concurrency: int = 4,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        retryable_errors: Tuple[Type[BaseException], ...] = (),
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable_errors = retryable_errors
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._paused_until = 0.0
+        self.in_flight = 0
+        self.completed = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+
+    @classmethod
+    def shared(cls, provider: str, **kwargs: Any) -> "RequestScheduler":
+        """Scheduler shared by every strategy talking to ``provider``.
+
+        Limits default to ``DEFAULT_LIMITS`` and can be set with
+        ``<PROVIDER>_REQUESTS_PER_MINUTE``, ``<PROVIDER>_TOKENS_PER_MINUTE``
+        and ``<PROVIDER>_MAX_CONCURRENCY``.
+        """
+        with cls._shared_lock:
+            scheduler = cls._shared.get(provider)
+            if scheduler is None:
+                limits = {
+                    "requests_per_minute": 50, "tokens_per_minute": 40000, "max_concurrency": 4,
+                    **DEFAULT_LIMITS.get(provider, {}),
+                    **get_settings().provider_limits.get(provider, {}),
+                }
+                scheduler = cls(
+                    provider,
+                    requests_per_minute=limits["requests_per_minute"],
+                    tokens_per_minute=limits["tokens_per_minute"],
+                    max_concurrency=int(limits["max_concurrency"]),
+                    **kwargs
+                )
+                cls._shared[provider] = scheduler
+            return scheduler
+
+    def update_limits(self, headers: Mapping[str, str]) -> None:
+        now = time.monotonic()
+        for kind, (limit, remaining, reset) in parse_rate_limit_headers(headers).items():
+            bucket = self.requests if kind == "requests" else self.tokens
+            bucket.sync(limit, remaining, now)
+            if remaining is not None and remaining <= 0 and reset:
+                self._paused_until = max(self._paused_until, now + reset)
+
+    async def _admit(self, tokens: int) -> None:
+        now = time.monotonic()
+        wait = max(self.requests.reserve(1, now), self.tokens.reserve(tokens, now))
+        try:
+            while True:
+                wait = max(wait, self._paused_until - time.monotonic())
+                if wait <= 0:
+                    return
+                self.throttled_seconds += wait
+                await asyncio.sleep(wait)
+                wait = 0.0
+        except asyncio.CancelledError:
+            now = time.monotonic()
+            self.requests.refund(1, now)
+            self.tokens.refund(tokens, now)
+            raise
+
+    def _status(self, error: BaseException) -> Optional[int]:
+        status = getattr(error, "status_code", None)
+        if status is None and isinstance(error, self.retryable_errors):
+            return 0
+        return status
+
+    def _backoff(self, retry: int, error: BaseException) -> float:
+        """Jittered exponential backoff, never shorter than the server's retry-after"""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** retry)
+        delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+        response = getattr(error, "response", None)
+        retry_after = _parse_reset(response.headers.get("retry-after")) if response is not None else None
+        return max(delay, retry_after or 0.0)
+
+    async def run(self, request: Callable[[Attempt], Awaitable[T]], estimated_tokens: int = 0) -> T:
+        """Run ``request(attempt)`` once it fits the limits, retrying throttled attempts"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        retry = 0
+        while True:
+            await self._semaphore.acquire()
+            attempt = Attempt(self, self._semaphore.release)
+            try:
+                await self._admit(estimated_tokens)
+                self.in_flight += 1
+                try:
+                    result = await request(attempt)
+                except Exception as e:
+                    status = self._status(e)
+                    if attempt.streamed or retry >= self.max_retries or (status != 0 and status not in RETRY_STATUSES):
+                        raise
+                    # Rejected requests do not count against the token budget
+                    self.tokens.refund(estimated_tokens, time.monotonic())
+                    delay = self._backoff(retry, e)
+                    if status in THROTTLE_STATUSES:
+                        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                    logger.warning(
+                        f"{self.name} request failed with status {status or 'connection error'}, "
+                        f"retry {retry + 1}/{self.max_retries} in {delay:.1f}s"
+                    )
+                else:
+                    self.completed += 1
+                    if attempt.used_tokens is not None:
+                        # Settle the estimate against the real usage
+                        difference = estimated_tokens - attempt.used_tokens
+                        if difference > 0:
+                            self.tokens.refund(difference, time.monotonic())
+                        else:
+                            self.tokens.reserve(-difference, time.monotonic())
+                    return result
+                finally:
+                    self.in_flight -= 1
+            finally:
+                # Requests that never got headers (errors, cancellation) release it here
+                attempt.release_slot()
+
+            self.retries += 1
+            retry += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "retries": self.retries,
+            "throttled_seconds": round(self.throttled_seconds, 2),
+            "requests_per_minute": self.requests.capacity,
+            "tokens_per_minute": self.tokens.capacity,
+        }
@@ -0,0 +1,123 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+_STRING_STOP = re.compile(r'["\\]')
+
+
+class IncrementalJSONParser:
+    """Incremental parser for JSON documents streamed in fragments.
+
+    Each fragment is scanned exactly once to track nesting depth and string
+    state, so completeness is known in O(1) after every ``feed``. Top-level
+    object members are decoded as soon as their closing ``,`` or ``}`` arrives
+    and exposed through ``partial``; the whole document is decoded only once,
+    when it is complete.
+    """
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._member: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self._complete = False
+        self._in_member = False
+        self._value: Any = None
+        self._decoded = False
+        self.partial: Dict[str, Any] = {}
+
+    @property
+    def is_complete(self) -> bool:
+        """Whether a full top-level object or array has been received"""
+        return self._complete
+
+    @property
+    def is_empty(self) -> bool:
+        """Whether no non-whitespace input has been received yet"""
+        return not self._started
+
+    @property
+    def text(self) -> str:
+        """The raw text received so far"""
+        return "".join(self._parts)
+
+    def feed(self, fragment: str) -> bool:
+        """Consume the next fragment; returns ``is_complete``"""
+        if not fragment or self._complete:
+            return self._complete
+        self._parts.append(fragment)
+
+        member_start = 0
+        i = 0
+        length = len(fragment)
+        while i < length:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                match = _STRING_STOP.search(fragment, i)
+                if not match:
+                    break
+                i = match.start()
+                if fragment[i] == "\\":
+                    self._escape = True
+                else:
+                    self._in_string = False
+                i += 1
+                continue
+
+            char = fragment[i]
+            if char == '"':
+                self._in_string = True
+                self._started = True
+                if self._depth == 1 and not self._in_member:
+                    self._in_member = True
+                    member_start = i
+            elif char in "{[":
+                self._started = True
+                self._depth += 1
+                if self._depth == 1:
+                    member_start = i + 1
+            elif char in "}]":
+                if self._depth == 1 and self._in_member:
+                    self._close_member(fragment[member_start:i])
+                self._depth -= 1
+                if self._depth == 0:
+                    self._complete = True
+                    break
+            elif char == "," and self._depth == 1:
+                if self._in_member:
+                    self._close_member(fragment[member_start:i])
+                member_start = i + 1
+            elif not char.isspace():
+                self._started = True
+            i += 1
+
+        if self._in_member and not self._complete:
+            self._member.append(fragment[member_start:])
+        return self._complete
+
+    def _close_member(self, tail: str) -> None:
+        """Decode one finished ``"key": value`` member of the top-level object"""
+        self._member.append(tail)
+        text = "".join(self._member)
+        self._member = []
+        self._in_member = False
+        try:
+            self.partial.update(json.loads("{" + text + "}"))
+        except json.JSONDecodeError:
+            # Top-level arrays have no key/value members to expose
+            pass
+
+    def result(self, default: Optional[Any] = None) -> Any:
+        """Decode the full document (once), or return ``default`` if nothing was received"""
+        if self._decoded:
+            return self._value
+        if self.is_empty:
+            return {} if default is None else default
+        self._value = json.loads(self.text)
+        self._decoded = True
+        return self._value
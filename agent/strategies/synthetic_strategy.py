@@ -0,0 +1,149 @@
+import asyncio
+import json
+import random
+from typing import Any, Dict, List, Optional, Sequence
+from .base import AIStrategy
+from .streaming_json import IncrementalJSONParser
+from ..logger_config import logger
+
+_WORDS = "alfred stream token chunk agent model project python render latency".split()
+
+
+class SyntheticError(Exception):
+    """Failure injected by SyntheticStrategy; carries a status code like the SDK errors"""
+
+    def __init__(self, status_code: int, message: str = "Synthetic provider error"):
+        super().__init__(f"{message} (status {status_code})")
+        self.status_code = status_code
+
+
+class SyntheticStrategy(AIStrategy):
+    """Deterministic stand-in for a provider, for tests and benchmarks.
+
+    A turn streams ``chunks`` text chunks of ``chunk_size`` characters (or the
+    given ``text`` chunks). Chunks are spaced by ``delay`` seconds drawn from
+    ``distribution``: ``"constant"``, ``"uniform"`` (between 0 and twice the
+    delay) or ``"exponential"`` (mean ``delay``); ``first_token_delay`` comes
+    before the first chunk. With ``tool_calls`` set, the first step requests
+    that many calls to ``tool_name`` (the first registered tool by default),
+    each with a JSON argument payload of about ``tool_payload_size`` bytes fed
+    through the incremental parser in ``tool_fragment_size`` pieces, and the
+    text follows in a second step once the tools have run. A turn fails with
+    ``SyntheticError(error_status)`` with probability ``error_rate``, after
+    ``error_after`` chunks. All randomness comes from ``seed``.
+    """
+
+    def __init__(
+        self,
+        api_key: str = "",
+        chunks: int = 20,
+        chunk_size: int = 8,
+        text: Optional[Sequence[str]] = None,
+        delay: float = 0.0,
+        distribution: str = "constant",
+        first_token_delay: float = 0.0,
+        tool_calls: int = 0,
+        tool_name: Optional[str] = None,
+        tool_payload_size: int = 1024,
+        tool_fragment_size: int = 64,
+        error_rate: float = 0.0,
+        error_after: int = 0,
+        error_status: int = 500,
+        seed: int = 0,
+    ):
+        super().__init__()
+        if distribution not in ("constant", "uniform", "exponential"):
+            raise ValueError(f"Unknown delay distribution: {distribution}")
+        self.text = list(text) if text is not None else None
+        self.chunks = chunks
+        self.chunk_size = chunk_size
+        self.delay = delay
+        self.distribution = distribution
+        self.first_token_delay = first_token_delay
+        self.tool_calls = tool_calls
+        self.tool_name = tool_name
+        self.tool_payload_size = tool_payload_size
+        self.tool_fragment_size = tool_fragment_size
+        self.error_rate = error_rate
+        self.error_after = error_after
+        self.error_status = error_status
+        self.random = random.Random(seed)
+
+    def initialize_client(self) -> None:
+        pass
+
+    @property
+    def default_model(self) -> str:
+        return "synthetic"
+
+    def _chunk_texts(self) -> List[str]:
+        if self.text is not None:
+            return list(self.text)
+        texts = []
+        for index in range(self.chunks):
+            word = _WORDS[index % len(_WORDS)] + " "
+            texts.append((word * (self.chunk_size // len(word) + 1))[:self.chunk_size])
+        return texts
+
+    def _next_delay(self) -> float:
+        if self.delay <= 0:
+            return 0.0
+        if self.distribution == "uniform":
+            return self.random.uniform(0, 2 * self.delay)
+        if self.distribution == "exponential":
+            return self.random.expovariate(1 / self.delay)
+        return self.delay
+
+    def _tool_arguments(self, index: int) -> str:
+        """JSON arguments of about ``tool_payload_size`` bytes"""
+        filler = "".join(_WORDS[(index + i) % len(_WORDS)][0] for i in range(max(0, self.tool_payload_size - 32)))
+        return json.dumps({"call": index, "payload": filler})
+
+    async def stream_message(self, chunks: List[str], separator: str = "", request_tools: bool = False,
+                             fail_at: Optional[int] = None) -> Dict[str, Any]:
+        """Stream one synthetic model step into ``chunks``; returns the tool calls it requested"""
+        if self.first_token_delay:
+            await asyncio.sleep(self.first_token_delay)
+
+        if request_tools:
+            self.output_started()
+            name = self.tool_name or next(iter(self.tools), "synthetic_tool")
+            calls = []
+            for index in range(self.tool_calls):
+                parser = IncrementalJSONParser()
+                arguments = self._tool_arguments(index)
+                for start in range(0, len(arguments), self.tool_fragment_size):
+                    parser.feed(arguments[start:start + self.tool_fragment_size])
+                calls.append({"id": f"synthetic_{index}", "name": name, "arguments": parser.result()})
+            return {"tool_calls": calls}
+
+        texts = self._chunk_texts()
+        for index, text in enumerate(texts):
+            if index == fail_at:
+                raise SyntheticError(self.error_status)
+            if index:
+                delay = self._next_delay()
+                if delay:
+                    await asyncio.sleep(delay)
+            self.output_started()
+            if separator:
+                chunks.append(separator)
+                self.stream_chunk(separator)
+                separator = ""
+            chunks.append(text)
+            self.stream_chunk(text)
+        if fail_at is not None and fail_at >= len(texts):
+            raise SyntheticError(self.error_status)
+        return {"tool_calls": []}
+
+    async def achat(self, prompts: List[Dict[str, str]], model: Optional[str] = None) -> str:
+        chunks: List[str] = []
+        fail_at = self.error_after if self.error_rate and self.random.random() < self.error_rate else None
+        if self.tool_calls:
+            step = await self.stream_message(chunks, request_tools=True)
+            results = await self.run_tool_calls(step["tool_calls"])
+            failed = sum(1 for result in results if result["is_error"])
+            if failed:
+                logger.warning(f"{failed} of {len(results)} synthetic tool calls failed")
+        await self.stream_message(chunks, fail_at=fail_at)
+        return "".join(chunks)
@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+class ToolCache:
+    """Memoized results of tools registered as idempotent.
+
+    A tool opts in at registration (``AIAgent.register_tool``) with
+    ``idempotent=True``, an optional ``ttl`` in seconds and an optional
+    ``key`` naming the arguments that determine its result (all arguments by
+    default). Results are kept in an LRU of ``max_entries``; failed calls are
+    never cached. Every strategy has its own cache, so entries live as long
+    as the session they belong to.
+
+    Tools can also list events in ``invalidated_by``; ``invalidate_all(event)``
+    drops their entries in every live cache, e.g. from a ``ProjectIndex``
+    listener when the projects directory changes.
+    """
+
+    _instances: "weakref.WeakSet[ToolCache]" = weakref.WeakSet()
+    _instances_lock = threading.Lock()
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        # key -> (expires, tool name, invalidating events, result)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, str, Tuple[str, ...], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        with self._instances_lock:
+            self._instances.add(self)
+
+    @staticmethod
+    def key(name: str, tool: Dict[str, Any], args: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        """Cache key of a call, or None if the tool is not idempotent"""
+        if not tool.get("idempotent"):
+            return None
+        fields = tool.get("key")
+        if fields is not None:
+            args = {field: args.get(field) for field in fields}
+        return name, json.dumps(args, sort_keys=True, separators=(",", ":"), default=str, ensure_ascii=False)
+
+    def get(self, key: Tuple[str, str]) -> Tuple[bool, Any]:
+        """``(True, result)`` if ``key`` is cached, else ``(False, None)``; counts towards the hit rate"""
+        name = key[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses[name] = self.misses.get(name, 0) + 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits[name] = self.hits.get(name, 0) + 1
+            return True, entry[3]
+
+    def put(self, key: Tuple[str, str], tool: Dict[str, Any], result: Any) -> None:
+        ttl = tool.get("ttl")
+        expires = time.monotonic() + ttl if ttl is not None else float("inf")
+        with self._lock:
+            self._entries[key] = (expires, key[0], tuple(tool.get("invalidated_by") or ()), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tool: Optional[str] = None, event: Optional[str] = None) -> int:
+        """Drop the entries of ``tool``, of tools invalidated by ``event``, or all; return how many"""
+        with self._lock:
+            stale = [
+                key for key, (_, name, events, _) in self._entries.items()
+                if (tool is None or name == tool) and (event is None or event in events)
+            ]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    @classmethod
+    def invalidate_all(cls, event: str) -> int:
+        """Drop the entries of tools invalidated by ``event`` in every live cache"""
+        with cls._instances_lock:
+            caches = list(cls._instances)
+        return sum(cache.invalidate(event=event) for cache in caches)
+
+    def stats(self, tool: Optional[str] = None) -> Dict[str, Any]:
+        """Hits, misses and hit rate of one tool, or of all tools together"""
+        with self._lock:
+            if tool is None:
+                hits, misses = sum(self.hits.values()), sum(self.misses.values())
+            else:
+                hits, misses = self.hits.get(tool, 0), self.misses.get(tool, 0)
+            return {
+                "entries": len(self._entries),
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            }
@@ -0,0 +1,325 @@
+import asyncio
+import atexit
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from .logger_config import logger
+from .settings import get_settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+FRAME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.016, 0.033, 0.05, 0.1, 0.25, 0.5, 1.0)
+RATE_BUCKETS = (5, 10, 20, 40, 60, 80, 100, 150, 200, 400, 1000)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 200000)
+
+# Name -> (help, buckets)
+HISTOGRAMS: Dict[str, Tuple[str, Sequence[float]]] = {
+    "alfred_turn_seconds": ("Wall time of an agent turn", LATENCY_BUCKETS),
+    "alfred_ttft_seconds": ("Time from the start of a turn to its first streamed chunk", LATENCY_BUCKETS),
+    "alfred_connect_seconds": ("Time from sending a model request to its response headers", LATENCY_BUCKETS),
+    "alfred_output_tokens_per_second": ("Output tokens per second while a model step streams", RATE_BUCKETS),
+    "alfred_input_tokens": ("Input tokens of a model step, including cache reads and writes", TOKEN_BUCKETS),
+    "alfred_output_tokens": ("Output tokens of a model step", TOKEN_BUCKETS),
+    "alfred_tool_seconds": ("Execution time of a tool call", LATENCY_BUCKETS),
+    "alfred_ui_lag_seconds": ("Time from a chunk reaching the UI until it is drawn", FRAME_BUCKETS),
+    "alfred_ui_render_seconds": ("Time spent drawing one UI frame", FRAME_BUCKETS),
+}
+COUNTERS: Dict[str, str] = {
+    "alfred_turns_total": "Agent turns by outcome",
+    "alfred_tool_errors_total": "Tool calls that failed",
+    "alfred_tool_cache_total": "Lookups of idempotent tool calls in the tool cache, by result",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_current_turn: contextvars.ContextVar[Optional["TurnMetrics"]] = contextvars.ContextVar("alfred_turn", default=None)
+
+
+def current_turn() -> Optional["TurnMetrics"]:
+    """Metrics of the turn running in this context, or None when telemetry is off"""
+    return _current_turn.get()
+
+
+def provider_label(strategy: Any) -> str:
+    return type(strategy).__name__.replace("Strategy", "").lower()
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds, as Prometheus exports them"""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the ``q`` quantile, or None if empty"""
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return float("inf")
+
+
+class TurnMetrics:
+    """Where one agent turn spent its time.
+
+    Started by ``AIAgent.chat``/``achat`` and reachable from the strategy and
+    tool code through ``current_turn()``. Only chunks streamed by the agent's
+    own strategy count towards time to first token, so the providers racing
+    inside a ``HedgedStrategy`` are not counted twice.
+    """
+
+    def __init__(self, strategy: Any, model: str):
+        self.strategy = strategy
+        self.provider = provider_label(strategy)
+        self.model = model
+        self.started = time.perf_counter()
+        self.first_chunk: Optional[float] = None
+        self.chunks = 0
+        self.steps: List[Dict[str, Any]] = []
+        self.tools: List[Dict[str, Any]] = []
+
+    def chunk(self) -> None:
+        if self.first_chunk is None:
+            self.first_chunk = time.perf_counter()
+        self.chunks += 1
+
+    def step(self, provider: str, attempt: Any, input_tokens: int, output_tokens: int, estimated: bool = False) -> None:
+        """Record a finished model step from the timestamps of its scheduler ``Attempt``"""
+        now = time.monotonic()
+        step: Dict[str, Any] = {
+            "provider": provider,
+            "duration": round(now - attempt.started, 4),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+        }
+        if estimated:
+            step["estimated"] = True
+        if attempt.headers_at is not None:
+            step["connect"] = round(attempt.headers_at - attempt.started, 4)
+        if attempt.streamed_at is not None and output_tokens and now > attempt.streamed_at:
+            step["tokens_per_second"] = round(output_tokens / (now - attempt.streamed_at), 1)
+        self.steps.append(step)
+
+    def tool(self, name: str, seconds: float, is_error: bool) -> None:
+        self.tools.append({"name": name, "seconds": round(seconds, 4), "error": is_error})
+
+
+class Telemetry:
+    """Process-wide performance metrics for turns, model steps, tools and the UI.
+
+    Off unless ``TELEMETRY=True``; when off ``turn()`` sets no turn, so the
+    hooks in the strategies cost one context variable lookup. When on,
+    metrics are kept as Prometheus histograms (served by the chat server at
+    ``/metrics`` and written to ``metrics.prom``) and every turn is appended
+    to a daily JSONL log in ``TELEMETRY_DIR``. Files are written by a
+    background thread every ``TELEMETRY_INTERVAL`` seconds and at exit; logs
+    older than ``TELEMETRY_RETENTION_DAYS`` are deleted.
+    """
+
+    _instance: Optional["Telemetry"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, enabled: bool = False, directory: Optional[str] = None,
+                 interval: float = 10.0, retention_days: float = 7.0):
+        self.enabled = enabled
+        self.directory = directory
+        self.interval = interval
+        self.retention = retention_days * 86400
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {name: {} for name in HISTOGRAMS}
+        self._counters: Dict[str, Dict[Labels, float]] = {name: {} for name in COUNTERS}
+        self._pending: List[Dict[str, Any]] = []
+        self._stopped = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        if enabled and directory:
+            os.makedirs(directory, exist_ok=True)
+            self._writer = threading.Thread(target=self._write_loop, name="telemetry-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
+
+    @classmethod
+    def get(cls) -> "Telemetry":
+        """Return the shared instance, configured from the settings on first use"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    settings = get_settings()
+                    cls._instance = cls(
+                        enabled=settings.telemetry,
+                        directory=settings.telemetry_dir,
+                        interval=settings.telemetry_interval,
+                        retention_days=settings.telemetry_retention_days,
+                    )
+        return cls._instance
+
+    # Recording
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            histogram = self._histograms[name].get(key)
+            if histogram is None:
+                histogram = self._histograms[name][key] = Histogram(HISTOGRAMS[name][1])
+            histogram.observe(value)
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counters = self._counters[name]
+            counters[key] = counters.get(key, 0) + value
+
+    @contextmanager
+    def turn(self, strategy: Any, model: str) -> Iterator[Optional[TurnMetrics]]:
+        """Measure the agent turn run inside the block"""
+        if not self.enabled:
+            yield None
+            return
+        metrics = TurnMetrics(strategy, model)
+        # Tasks copy the context when they are created, so the turn is also
+        # visible on the runtime loop when the block submits work to it
+        token = _current_turn.set(metrics)
+        outcome = "error"
+        try:
+            yield metrics
+            outcome = "ok"
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            _current_turn.reset(token)
+            self._finish(metrics, outcome)
+
+    def _finish(self, turn: TurnMetrics, outcome: str) -> None:
+        duration = time.perf_counter() - turn.started
+        ttft = turn.first_chunk - turn.started if turn.first_chunk is not None else None
+        self.increment("alfred_turns_total", provider=turn.provider, outcome=outcome)
+        self.observe("alfred_turn_seconds", duration, provider=turn.provider)
+        if ttft is not None:
+            self.observe("alfred_ttft_seconds", ttft, provider=turn.provider)
+        for step in turn.steps:
+            provider = step["provider"]
+            if "connect" in step:
+                self.observe("alfred_connect_seconds", step["connect"], provider=provider)
+            if "tokens_per_second" in step:
+                self.observe("alfred_output_tokens_per_second", step["tokens_per_second"], provider=provider)
+            self.observe("alfred_input_tokens", step["input_tokens"], provider=provider)
+            self.observe("alfred_output_tokens", step["output_tokens"], provider=provider)
+        for tool in turn.tools:
+            self.observe("alfred_tool_seconds", tool["seconds"], tool=tool["name"])
+            if tool["error"]:
+                self.increment("alfred_tool_errors_total", tool=tool["name"])
+
+        if not self.directory:
+            return  # No turn log to flush to; keeping the record would only grow _pending
+        record = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "provider": turn.provider,
+            "model": turn.model,
+            "outcome": outcome,
+            "duration": round(duration, 4),
+            "ttft": round(ttft, 4) if ttft is not None else None,
+            "chunks": turn.chunks,
+            "steps": turn.steps,
+            "tools": turn.tools,
+        }
+        with self._lock:
+            self._pending.append(record)
+
+    # Export
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        def render_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = labels + extra
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name, series in self._histograms.items():
+                lines.append(f"# HELP {name} {HISTOGRAMS[name][0]}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.bounds + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{name}_bucket{render_labels(labels, (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{render_labels(labels)} {histogram.sum:g}")
+                    lines.append(f"{name}_count{render_labels(labels)} {histogram.count}")
+            for name, series in self._counters.items():
+                lines.append(f"# HELP {name} {COUNTERS[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{render_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """p50/p95 and count of every histogram series, keyed like ``name{labels}``"""
+        result = {}
+        with self._lock:
+            for name, series in self._histograms.items():
+                for labels, histogram in series.items():
+                    key = name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+                    result[key] = {"count": histogram.count, "p50": histogram.quantile(0.5), "p95": histogram.quantile(0.95)}
+        return result
+
+    def flush(self) -> None:
+        """Append pending turn records to today's JSONL log and rewrite ``metrics.prom``"""
+        if not self.enabled or not self.directory:
+            return
+        with self._lock:
+            records, self._pending = self._pending, []
+        try:
+            if records:
+                path = os.path.join(self.directory, f"turns_{datetime.now().strftime('%Y%m%d')}.jsonl")
+                with open(path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+            path = os.path.join(self.directory, "metrics.prom")
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.prometheus())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write telemetry: {e}")
+
+    def _write_loop(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.flush()
+            self._expire_logs()
+
+    def _expire_logs(self) -> None:
+        cutoff = time.time() - self.retention
+        try:
+            for entry in os.scandir(self.directory):
+                if entry.name.startswith("turns_") and entry.name.endswith(".jsonl") and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+        except OSError as e:
+            logger.warning(f"Could not expire telemetry logs: {e}")
+
+    def close(self) -> None:
+        """Stop the writer and write what is left"""
+        self._stopped.set()
+        self.flush()
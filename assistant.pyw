@@ -1,23 +1,30 @@
+import argparse
 import subprocess
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# Install packages from requirements.txt if they are missing
-requirements_file = "requirements.txt"
-if os.path.exists(requirements_file):
-    with open(requirements_file) as f:
-        required_packages = f.read().splitlines()
+REQUIREMENTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "requirements.txt")
 
-    for package in required_packages:
-        try:
-            __import__(package.split('==')[0])  # Import package (handles version specifiers)
-        except ImportError:
-            subprocess.check_call([sys.executable, "-m", "pip", "install", package])
-
-from management import ChatApplication
+def install_requirements():
+    """Install the packages from requirements.txt; needed once after cloning or updating"""
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", REQUIREMENTS_FILE])
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alfred desktop assistant")
+    parser.add_argument("--install", action="store_true", help="install the packages from requirements.txt and exit")
+    args = parser.parse_args()
+
+    if args.install:
+        install_requirements()
+        sys.exit(0)
+
+    # Dependencies are not probed on every launch; a missing one points to --install instead
+    try:
+        from management import ChatApplication
+    except ImportError as e:
+        sys.exit(f"Missing dependency '{e.name}'. Install the requirements with: python assistant.pyw --install")
+
     app = ChatApplication()
-    app.run()
\ No newline at end of file
+    app.run()
@@ -0,0 +1,132 @@
+"""Time the BM25 code search index over a large synthetic source tree.
+
+Usage:
+    python benchmarks/bench_code_search.py [--files 100000] [--lines 120] [--workers 8] [--queries 300]
+
+Writes a synthetic project whose identifiers follow a Zipf distribution
+over a large vocabulary (so a few terms like ``self`` are everywhere and
+most are rare, as in real code), then reports the initial build, the size
+of the postings on disk, a no-op ``update``, an incremental update after
+editing 100 files, and the latency of ``search`` for rare, mixed and
+common-only queries, including reading the snippets.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.functions.codebase.code_index import CodeSearchIndex
+
+KEYWORDS = "self return if for in def class import from not and or None True False else while try except with as".split()
+ROOTS = (
+    "user session token cache query index stream client server parser render model project config event "
+    "buffer socket request response schema record batch worker handler manager factory builder context "
+    "window message chunk provider strategy agent tool result error retry limit timeout file path node"
+).split()
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        parts = [rng.choice(ROOTS) for _ in range(rng.randint(1, 3))]
+        words.add("_".join(parts) + (str(rng.randint(0, 99)) if rng.random() < 0.5 else "") if rng.random() < 0.5
+                  else parts[0] + "".join(part.capitalize() for part in parts[1:]) + str(rng.randint(0, 999)))
+    return sorted(words)
+
+
+class Source:
+    def __init__(self, rng, words):
+        self.rng = rng
+        self.words = words
+
+    def word(self):
+        rng = self.rng
+        if rng.random() < 0.3:
+            return rng.choice(KEYWORDS)
+        return self.words[min(int(rng.paretovariate(0.8)) - 1, len(self.words) - 1)] if rng.random() < 0.6 \
+            else self.words[rng.randrange(len(self.words))]
+
+    def file(self, lines):
+        out = []
+        for _ in range(lines):
+            indent = " " * (4 * self.rng.randint(0, 3))
+            out.append(indent + " ".join(self.word() for _ in range(self.rng.randint(2, 9))))
+        return "\n".join(out) + "\n"
+
+
+def write_project(directory, count, lines, rng, words):
+    source = Source(rng, words)
+    paths = []
+    for n in range(count):
+        package = os.path.join(f"pkg{n % 50}", f"sub{n % 31}")
+        path = os.path.join(package, f"{source.word()}_{n}.py")
+        os.makedirs(os.path.join(directory, package), exist_ok=True)
+        with open(os.path.join(directory, path), "w", encoding="utf-8") as f:
+            f.write(source.file(lines))
+        paths.append(path)
+    return paths
+
+
+def timed_queries(index, queries):
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, limit=10)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return (f"median {statistics.median(timings) * 1000:6.2f} ms, p95 {timings[int(len(timings) * 0.95)] * 1000:6.2f} ms, "
+            f"max {timings[-1] * 1000:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--lines", type=int, default=120)
+    parser.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1))
+    parser.add_argument("--queries", type=int, default=300)
+    args = parser.parse_args()
+    rng = random.Random(11)
+    words = vocabulary(50000, rng)
+
+    with tempfile.TemporaryDirectory() as directory:
+        root = os.path.join(directory, "project")
+        started = time.perf_counter()
+        paths = write_project(root, args.files, args.lines, rng, words)
+        size = sum(os.path.getsize(os.path.join(root, path)) for path in paths)
+        print(f"Wrote {args.files} files ({size / 2**20:.0f} MB) in {time.perf_counter() - started:.1f} s")
+
+        index = CodeSearchIndex(root, directory=os.path.join(directory, "index"), workers=args.workers)
+        started = time.perf_counter()
+        index.update()
+        postings = sum(os.path.getsize(index._segment_path(segment)) for segment in index._maps)
+        print(f"Initial build: {time.perf_counter() - started:.1f} s ({args.workers} workers), "
+              f"{len(index._maps)} segments, {postings / 2**20:.0f} MB of postings")
+
+        started = time.perf_counter()
+        index.update()
+        print(f"No-op update: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        for path in rng.sample(paths, 100):
+            with open(os.path.join(root, path), "a", encoding="utf-8") as f:
+                f.write("edited_marker " * 3 + "\n")
+        started = time.perf_counter()
+        changed = index.update()
+        print(f"Incremental update: {(time.perf_counter() - started) * 1000:.0f} ms for {changed} changed files")
+
+        source = Source(rng, words)
+        rare = [rng.choice(words[len(words) // 2:]) for _ in range(args.queries)]
+        mixed = [" ".join(source.word() for _ in range(3)) for _ in range(args.queries)]
+        common = [" ".join(rng.sample(KEYWORDS, 2)) for _ in range(args.queries)]
+        print(f"search rare identifier: {timed_queries(index, rare)}")
+        print(f"search 3 mixed terms:   {timed_queries(index, mixed)}")
+        print(f"search 2 common terms:  {timed_queries(index, common)}")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare trigram-indexed fuzzy project matching with the linear SequenceMatcher scan.
+
+Usage:
+    python benchmarks/bench_fuzzy_match.py [--names 50000] [--queries 50]
+
+Builds synthetic project directory names, then times ``FuzzyMatcher.search``
+against scoring every name with ``similarity_score`` (the previous
+``open_project`` approach) and reports how often both pick the same project.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.functions.projects.fuzzy import FuzzyMatcher, similarity_score
+
+PARTS = [
+    "alfred", "assistant", "api", "web", "app", "core", "service", "data", "pipeline",
+    "ml", "model", "cli", "tools", "infra", "docs", "frontend", "backend", "mobile",
+    "game", "engine", "parser", "compiler", "bot", "dashboard", "sdk", "lib", "utils",
+]
+
+
+def make_names(count, rng):
+    names = set()
+    while len(names) < count:
+        words = rng.sample(PARTS, rng.randint(1, 3))
+        sep = rng.choice(["-", "_", ""])
+        names.add(sep.join(words) + (f"{rng.randint(0, 999)}" if rng.random() < 0.7 else ""))
+    return sorted(names)
+
+
+def make_query(name, rng):
+    chars = list(name)
+    for _ in range(rng.randint(0, 2)):
+        if len(chars) > 3:
+            del chars[rng.randrange(len(chars))]
+    return "".join(chars).replace("-", " ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--names", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    names = make_names(args.names, rng)
+    queries = [make_query(rng.choice(names), rng) for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    matcher = FuzzyMatcher(names)
+    print(f"index build: {len(names)} names in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    linear_times, indexed_times, agree = [], [], 0
+    for query in queries:
+        start = time.perf_counter()
+        linear_best = max(((name, similarity_score(query, name)) for name in names), key=lambda x: x[1])
+        linear_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        ranked = matcher.search(query, k=5)
+        indexed_times.append(time.perf_counter() - start)
+
+        if ranked and ranked[0][1] >= linear_best[1] - 1e-9:
+            agree += 1
+
+    linear_ms = statistics.median(linear_times) * 1000
+    indexed_ms = statistics.median(indexed_times) * 1000
+    print(f"linear similarity_score: median {linear_ms:.1f} ms/query")
+    print(f"trigram FuzzyMatcher:    median {indexed_ms:.2f} ms/query (top-5 with scores)")
+    print(f"speedup: {linear_ms / indexed_ms:.0f}x, best score matched linear scan in {agree}/{len(queries)} queries")
+
+
+if __name__ == "__main__":
+    main()
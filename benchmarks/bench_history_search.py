@@ -0,0 +1,113 @@
+"""Time the full-text history index over a large synthetic .history directory.
+
+Usage:
+    python benchmarks/bench_history_search.py [--sessions 20000] [--queries 200]
+
+Writes synthetic sessions (legacy ``.json`` dumps and ``.jsonl`` journals) to
+a temporary directory, then reports the initial index build, a no-op
+``update``, a search right after a turn was appended to the running
+session's journal (which has to pick the turn up), and the latency of
+``search`` queries.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.functions.history.index import HistoryIndex
+
+WORDS = (
+    "python rust docker kubernetes deploy database migration index query cache latency "
+    "thread async stream token model prompt project refactor test coverage benchmark "
+    "memory leak profile parser compiler release branch merge review config logging "
+    "error timeout retry network socket server client api schema json yaml build"
+).split()
+
+
+# Long tail of rarer words so term frequencies are roughly Zipf-distributed, like real chat text
+VOCABULARY = WORDS + [f"{word}{suffix}" for word in WORDS for suffix in ("er", "ing", "ed", "s", "ly", "ness", "ize", "able")] \
+    + [f"term{i}" for i in range(5000)]
+
+
+def word(rng):
+    return VOCABULARY[min(int(rng.paretovariate(1.0)) - 1, len(VOCABULARY) - 1)] if rng.random() < 0.5 \
+        else VOCABULARY[rng.randrange(len(VOCABULARY))]
+
+
+def sentence(rng, words=12):
+    return " ".join(word(rng) for _ in range(words)).capitalize() + "."
+
+
+def write_sessions(directory, count, rng):
+    for i in range(count):
+        day = f"2024{1 + i % 12:02d}{1 + i % 28:02d}"
+        turns = [(sentence(rng), " ".join(sentence(rng) for _ in range(4))) for _ in range(rng.randint(2, 8))]
+        if i % 2:
+            with open(os.path.join(directory, f"AIAgent_{day}_{i:05d}.jsonl"), "w", encoding="utf-8") as f:
+                f.write(json.dumps({"type": "session", "time": 0}) + "\n")
+                for question, answer in turns:
+                    f.write(json.dumps({"type": "message", "role": "user", "content": question}) + "\n")
+                    f.write(json.dumps({"type": "message", "role": "assistant", "content": answer}) + "\n")
+                # The last journal belongs to the running session and has no end record yet
+                if i < count - 2:
+                    f.write(json.dumps({"type": "end", "time": 0}) + "\n")
+        else:
+            history = [{"role": "system", "content": "You are Alfred."}]
+            for question, answer in turns:
+                history += [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+            with open(os.path.join(directory, f"AIAgent_{day}_{i:05d}.json"), "w", encoding="utf-8") as f:
+                json.dump(history, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(13)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history_dir = os.path.join(tmp, "history")
+        os.makedirs(history_dir)
+        write_sessions(history_dir, args.sessions, rng)
+        index = HistoryIndex(history_dir, os.path.join(tmp, "history.sqlite3"))
+
+        start = time.perf_counter()
+        index.update()
+        print(f"initial build:      {time.perf_counter() - start:8.2f} s for {index.count()} sessions")
+
+        start = time.perf_counter()
+        index.update()
+        print(f"no-op update:       {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+        # A turn appended to the running session's journal is found by the next search
+        live = args.sessions - 1 if (args.sessions - 1) % 2 else args.sessions - 2
+        journal = next(name for name in os.listdir(history_dir) if name.endswith(f"_{live:05d}.jsonl"))
+        with open(os.path.join(history_dir, journal), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"type": "message", "role": "user", "content": "zebra quokka"}) + "\n")
+        start = time.perf_counter()
+        hits = index.search("quokka")
+        print(f"append + search:    {(time.perf_counter() - start) * 1000:8.1f} ms")
+        assert hits[0].session == journal
+
+        timings = []
+        for _ in range(args.queries):
+            query = " ".join(word(rng) for _ in range(rng.randint(1, 3)))
+            start = time.perf_counter()
+            index.search(query, limit=5)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        print(
+            f"search ({args.queries} queries): median {statistics.median(timings):.2f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Measure throughput against a rate-limited provider with and without the scheduler.
+
+Usage:
+    python benchmarks/bench_scheduler.py [--rpm 600] [--workers 24] [--seconds 20]
+
+A simulated provider admits requests through its own token bucket (one
+second of burst) and answers 429 with rate-limit headers when it is empty.
+``workers`` clients send requests back to back, first directly (the old
+behaviour: a 429 is a failed turn) and then through ``RequestScheduler``.
+Reports completed requests per minute relative to the quota, and failures.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.strategies.scheduler import RequestScheduler
+
+
+class RateLimited(Exception):
+    def __init__(self, headers):
+        super().__init__("429 rate limited")
+        self.status_code = 429
+        self.response = type("Response", (), {"headers": headers})()
+
+
+class SimulatedProvider:
+    def __init__(self, rpm, latency):
+        self.rpm = rpm
+        self.rate = rpm / 60.0
+        self.capacity = max(1.0, self.rate)  # One second of burst
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.latency = latency
+
+    def headers(self):
+        return {
+            "anthropic-ratelimit-requests-limit": str(self.rpm),
+            "anthropic-ratelimit-requests-remaining": str(int(self.level)),
+            "anthropic-ratelimit-requests-reset": "",
+        }
+
+    async def request(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.level < 1:
+            await asyncio.sleep(0.01)
+            raise RateLimited({**self.headers(), "retry-after": f"{(1 - self.level) / self.rate:.3f}"})
+        self.level -= 1
+        await asyncio.sleep(self.latency)
+        return self.headers()
+
+
+async def run_direct(provider, workers, seconds):
+    done = failed = 0
+    deadline = time.monotonic() + seconds
+
+    async def worker():
+        nonlocal done, failed
+        while time.monotonic() < deadline:
+            try:
+                await provider.request()
+                done += 1
+            except RateLimited:
+                failed += 1
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return done, failed
+
+
+async def run_scheduled(provider, workers, seconds, rpm):
+    scheduler = RequestScheduler(
+        "bench", requests_per_minute=rpm, tokens_per_minute=10 ** 9,
+        max_concurrency=workers, base_delay=0.05, max_delay=2.0
+    )
+    done = failed = 0
+    deadline = time.monotonic() + seconds
+
+    async def attempt(slot):
+        slot.observe_headers(await provider.request())
+
+    async def worker():
+        nonlocal done, failed
+        while time.monotonic() < deadline:
+            try:
+                await scheduler.run(attempt)
+                done += 1
+            except RateLimited:
+                failed += 1
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return done, failed, scheduler.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rpm", type=int, default=600)
+    parser.add_argument("--workers", type=int, default=24)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    def quota(elapsed):
+        # Requests the provider admits in ``elapsed`` seconds, including its initial burst
+        return args.rpm * elapsed / 60 + max(1.0, args.rpm / 60)
+
+    start = time.monotonic()
+    done, failed = asyncio.run(run_direct(SimulatedProvider(args.rpm, args.latency), args.workers, args.seconds))
+    elapsed = time.monotonic() - start
+    print(f"direct:    {done:5d} completed ({done / quota(elapsed):6.1%} of quota), {failed} failed turns")
+
+    start = time.monotonic()
+    done, failed, stats = asyncio.run(
+        run_scheduled(SimulatedProvider(args.rpm, args.latency), args.workers, args.seconds, args.rpm)
+    )
+    elapsed = time.monotonic() - start
+    print(
+        f"scheduled: {done:5d} completed ({done / quota(elapsed):6.1%} of quota), {failed} failed turns, "
+        f"{stats['retries']} retries"
+    )
+
+
+if __name__ == "__main__":
+    main()
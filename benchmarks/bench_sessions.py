@@ -0,0 +1,109 @@
+"""Measure memory and turn overhead of many sessions with and without SessionManager.
+
+Usage:
+    python benchmarks/bench_sessions.py [--users 5000] [--turns 4] [--max-resident 100]
+
+Simulates users coming and going: each user opens a session, holds a few
+turns (messages of about 2 KB, no provider calls) and one in ten comes back
+later for another turn. First every session keeps its agent in a plain dict
+(the old behaviour of one agent per user, never released), then sessions go
+through ``SessionManager``. Reports traced memory at the end and the mean and
+p99 time to get a session ready for a turn, including restores from disk.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import GeneralAgent
+from management.session_manager import SessionManager
+
+
+def message(rng):
+    return " ".join(rng.choice(("alpha", "beta", "gamma", "delta", "epsilon")) for _ in range(350))
+
+
+def turn(agent, rng):
+    agent.add_message("user", message(rng))
+    agent.add_message("assistant", message(rng))
+
+
+def schedule(users, turns, seed=7):
+    """(user, is_new) events: each user's turns in a row, some users returning later"""
+    rng = random.Random(seed)
+    events = []
+    for user in range(users):
+        events.extend((user, index == 0) for index in range(turns))
+        if user > 50 and rng.random() < 0.1:
+            events.append((rng.randrange(user - 50), False))
+    return events
+
+
+def run_unbounded(events):
+    rng = random.Random(1)
+    agents = {}
+    latencies = []
+    for user, is_new in events:
+        start = time.perf_counter()
+        if is_new:
+            agents[user] = GeneralAgent()
+        agent = agents[user]
+        latencies.append(time.perf_counter() - start)
+        turn(agent, rng)
+    return latencies, agents
+
+
+def run_managed(events, max_resident, directory):
+    rng = random.Random(1)
+    sessions = SessionManager(directory=directory, max_resident=max_resident, sweep_interval=None)
+    ids = {}
+    latencies = []
+    for user, is_new in events:
+        start = time.perf_counter()
+        if is_new:
+            ids[user] = sessions.create().id
+        with sessions.use(ids[user]) as session:
+            agent = sessions.agent(session)
+            latencies.append(time.perf_counter() - start)
+            turn(agent, rng)
+    return latencies, sessions
+
+
+def report(name, latencies, memory):
+    latencies = sorted(latencies)
+    print(f"{name:<22} memory {memory / 1024 / 1024:8.1f} MiB   "
+          f"ready mean {statistics.mean(latencies) * 1000:6.3f} ms   "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--max-resident", type=int, default=100)
+    args = parser.parse_args()
+    events = schedule(args.users, args.turns)
+    print(f"{args.users} users, {len(events)} turns")
+
+    tracemalloc.start()
+    latencies, agents = run_unbounded(events)
+    report("agent per user", latencies, tracemalloc.get_traced_memory()[0])
+    tracemalloc.stop()
+    del agents
+
+    with tempfile.TemporaryDirectory() as directory:
+        tracemalloc.start()
+        latencies, sessions = run_managed(events, args.max_resident, directory)
+        report("SessionManager", latencies, tracemalloc.get_traced_memory()[0])
+        tracemalloc.stop()
+        print(f"pool: {sessions.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Measure cold start: import time breakdown and time until the app is ready.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--top 15]
+
+Each measurement runs in a fresh interpreter. The import breakdown comes from
+``python -X importtime -c "import management"``: the self time of every
+module is summed per top-level package, slowest first. Time-to-ready is measured from
+process launch until ``ChatApplication`` has drawn its window, or, without a
+display, until ``AIManager`` is constructed. Run with a real ``.env`` to see
+the path users get; the session journal goes to a temporary directory.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+READY_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+try:
+    import tkinter
+    tkinter.Tk().destroy()
+    has_display = True
+except Exception:
+    has_display = False
+if has_display:
+    from management import ChatApplication
+    app = ChatApplication()
+    app.root.update()
+    print("READY window", flush=True)
+    app.ai_manager.close()
+    app.root.destroy()
+else:
+    from management.ai_manager import AIManager
+    manager = AIManager()
+    print("READY headless", flush=True)
+    manager.close()
+"""
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)")
+
+
+def import_breakdown():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import management"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    packages = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_time, package = int(match.group(1)), match.group(2).partition(".")[0]
+        packages[package] = packages.get(package, 0) + self_time
+    return packages
+
+
+def time_to_ready():
+    # A scratch working directory keeps the session journal out of the real .history
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-c", READY_SCRIPT.format(root=ROOT)],
+            cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        mode = None
+        for line in process.stdout:
+            if line.startswith("READY"):
+                mode = line.split()[1]
+                elapsed = time.perf_counter() - start
+                break
+        process.wait()
+    if mode is None:
+        raise RuntimeError("The app did not start; run it directly to see the error")
+    return elapsed, mode
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    breakdowns = [import_breakdown() for _ in range(args.runs)]
+    totals = {package: statistics.median(b.get(package, 0) for b in breakdowns) for package in set().union(*breakdowns)}
+    print(f"import management: {sum(totals.values()) / 1000:.1f} ms (median of {args.runs})")
+    for package, micros in sorted(totals.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {package:<28} {micros / 1000:8.1f} ms")
+
+    runs = [time_to_ready() for _ in range(args.runs)]
+    times = sorted(elapsed for elapsed, _ in runs)
+    print(f"time to ready ({runs[0][1]}): median {statistics.median(times) * 1000:.0f} ms, "
+          f"min {times[0] * 1000:.0f} ms, max {times[-1] * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""Measure the streaming hot path from provider chunks to the stream callback and the UI.
+
+Usage:
+    python benchmarks/bench_streaming.py [--chunks 2000] [--chunk-size 8] [--turns 20]
+                                         [--tool-payload 65536] [--only agent,anthropic,openai,ui]
+
+Scenarios, each run for ``turns`` turns without network or sleeps:
+    agent      AIAgent.chat on SyntheticStrategy (the full agent -> runtime -> callback path),
+               plain text and with four large tool calls
+    anthropic  AnthropicStrategy.achat over a mocked SDK event stream, text and a tool call
+               whose JSON arguments arrive as input_json_delta fragments
+    openai     OpenAIStrategy.achat over mocked chat.completions chunks, text and a tool call
+    ui         ChatUI.update_current_message and the frame render that drains it
+               (skipped when Tk cannot open a window)
+
+Reports median time to first token, chunks per second and per-chunk overhead
+(turn time divided by chunks streamed).
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace as NS
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.agents.ai_agent import AIAgent
+from agent.strategies import AnthropicStrategy, OpenAIStrategy, SyntheticStrategy
+from agent.strategies.scheduler import RequestScheduler
+
+FRAGMENT = 64  # Bytes of tool arguments per streamed fragment
+
+
+class BenchAgent(AIAgent):
+    def system_prompt(self):
+        return "You are a benchmark."
+
+    def init_chat_history(self):
+        self.chat_history = [{"role": "system", "content": self.system_prompt()}]
+
+    def _register_tools(self):
+        self.register_tool(
+            name="echo",
+            func=lambda **kwargs: f"received {len(json.dumps(kwargs))} bytes",
+            description="Return the size of the arguments.",
+            input_schema={"type": "object", "properties": {"payload": {"type": "string"}}, "required": []}
+        )
+
+
+def tool_arguments(size):
+    return json.dumps({"payload": "x" * max(0, size - 16)})
+
+
+# Mocked SDK streams
+
+class AnthropicStream:
+    def __init__(self, events):
+        self.events = events
+        self.response = NS(headers={})
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for event in self.events:
+            yield event
+
+
+def anthropic_events(texts, tool_arguments_json=None):
+    events = [NS(type="message_start", message=NS(usage=NS(input_tokens=10, cache_read_input_tokens=0, cache_creation_input_tokens=0)))]
+    if tool_arguments_json is not None:
+        events.append(NS(type="content_block_start", index=0, content_block=NS(type="tool_use", id="toolu_bench", name="echo")))
+        events.extend(
+            NS(type="content_block_delta", index=0, delta=NS(type="input_json_delta", partial_json=tool_arguments_json[i:i + FRAGMENT]))
+            for i in range(0, len(tool_arguments_json), FRAGMENT)
+        )
+        events.append(NS(type="content_block_stop", index=0))
+    else:
+        events.append(NS(type="content_block_start", index=0, content_block=NS(type="text", text="")))
+        events.extend(NS(type="content_block_delta", index=0, delta=NS(type="text_delta", text=text)) for text in texts)
+        events.append(NS(type="content_block_stop", index=0))
+    events.append(NS(type="message_delta", usage=NS(output_tokens=len(texts)), delta=NS(stop_reason="end_turn")))
+    events.append(NS(type="message_stop"))
+    return events
+
+
+class AnthropicClient:
+    """Answers with the scripted steps in turn, starting over after the last"""
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.calls = 0
+        self.messages = NS(stream=self._stream)
+
+    def _stream(self, **kwargs):
+        step = self.steps[self.calls % len(self.steps)]
+        self.calls += 1
+        return AnthropicStream(step)
+
+
+class OpenAIStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.response = NS(headers={})
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def openai_chunks(texts, tool_arguments_json=None):
+    def chunk(content=None, tool_calls=None, finish_reason=None):
+        return NS(choices=[NS(delta=NS(content=content, tool_calls=tool_calls), finish_reason=finish_reason)])
+    if tool_arguments_json is not None:
+        chunks = [chunk(tool_calls=[NS(index=0, id="call_bench", function=NS(name="echo", arguments=""))])]
+        chunks.extend(
+            chunk(tool_calls=[NS(index=0, id=None, function=NS(name=None, arguments=tool_arguments_json[i:i + FRAGMENT]))])
+            for i in range(0, len(tool_arguments_json), FRAGMENT)
+        )
+        return chunks + [chunk(finish_reason="tool_calls")]
+    return [chunk(content=text) for text in texts] + [chunk(finish_reason="stop")]
+
+
+class OpenAIClient:
+    def __init__(self, steps):
+        self.steps = steps
+        self.calls = 0
+        self.chat = NS(completions=NS(create=self._create))
+
+    async def _create(self, **kwargs):
+        step = self.steps[self.calls % len(self.steps)]
+        self.calls += 1
+        return OpenAIStream(step)
+
+
+# Measurement
+
+class Probe:
+    """Stream callback recording time to first chunk and chunk count"""
+
+    def __init__(self):
+        self.start = 0.0
+        self.first = None
+        self.count = 0
+
+    def reset(self):
+        self.start = time.perf_counter()
+        self.first = None
+        self.count = 0
+
+    def __call__(self, chunk):
+        if self.first is None:
+            self.first = time.perf_counter()
+        self.count += 1
+
+
+def measure(name, turn, probe, turns):
+    ttft, rates, per_chunk = [], [], []
+    turn()  # Warm-up
+    for _ in range(turns):
+        probe.reset()
+        turn()
+        elapsed = time.perf_counter() - probe.start
+        ttft.append((probe.first or time.perf_counter()) - probe.start)
+        rates.append(probe.count / elapsed)
+        per_chunk.append(elapsed / max(1, probe.count))
+    print(f"{name:<28} ttft {statistics.median(ttft) * 1000:8.3f} ms   "
+          f"{statistics.median(rates):>12,.0f} chunks/s   "
+          f"{statistics.median(per_chunk) * 1e6:8.2f} us/chunk")
+
+
+def unthrottled(strategy, name):
+    strategy.scheduler = RequestScheduler(name, requests_per_minute=1e9, tokens_per_minute=1e12, max_concurrency=1000)
+    strategy.use_response_cache = False
+    return strategy
+
+
+def bench_agent(args, probe):
+    for label, tool_calls in (("agent.chat text", 0), ("agent.chat 4 tool calls", 4)):
+        agent = BenchAgent()
+        agent.strategy = SyntheticStrategy(chunks=args.chunks, chunk_size=args.chunk_size,
+                                           tool_calls=tool_calls, tool_payload_size=args.tool_payload)
+        agent.strategy.set_tools(agent.tools)
+        agent.set_stream_callback(probe)
+
+        def turn():
+            agent.init_chat_history()
+            agent.chat("Benchmark turn")
+        measure(label, turn, probe, args.turns)
+
+
+def bench_anthropic(args, probe, texts):
+    arguments = tool_arguments(args.tool_payload)
+    for label, steps in (
+        ("anthropic text", [anthropic_events(texts)]),
+        ("anthropic tool call", [anthropic_events([], arguments), anthropic_events(texts)]),
+    ):
+        strategy = unthrottled(AnthropicStrategy("bench"), "anthropic-bench")
+        strategy.client = AnthropicClient(steps)
+        strategy.set_tools(BenchAgent().tools)
+        strategy.on_stream = probe
+        prompts = [{"role": "system", "content": "You are a benchmark."}, {"role": "user", "content": "Benchmark turn"}]
+        measure(label, lambda: strategy.chat(prompts), probe, args.turns)
+
+
+def bench_openai(args, probe, texts):
+    arguments = tool_arguments(args.tool_payload)
+    for label, steps in (
+        ("openai text", [openai_chunks(texts)]),
+        ("openai tool call", [openai_chunks([], arguments), openai_chunks(texts)]),
+    ):
+        strategy = unthrottled(OpenAIStrategy("bench"), "openai-bench")
+        strategy.client = OpenAIClient(steps)
+        strategy.set_tools(BenchAgent().tools)
+        strategy.on_stream = probe
+        prompts = [{"role": "user", "content": "Benchmark turn"}]
+        measure(label, lambda: strategy.chat(prompts), probe, args.turns)
+
+
+def bench_ui(args, texts):
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        print(f"ui: skipped, no display ({e})")
+        return
+    from ui.chat_ui import ChatUI
+    assistant = ChatUI(root, lambda message: None, None)
+    assistant.renderer.stop()  # Frames are driven by hand below
+    per_chunk, per_frame = [], []
+    chunks_per_frame = max(1, len(texts) // 60)  # A turn spread over about 60 frames
+    for _ in range(args.turns):
+        assistant.streaming = False
+        for start in range(0, len(texts), chunks_per_frame):
+            began = time.perf_counter()
+            for text in texts[start:start + chunks_per_frame]:
+                assistant.update_current_message(text)
+            pushed = time.perf_counter()
+            assistant.renderer.flush()
+            root.update_idletasks()
+            per_chunk.append((pushed - began) / chunks_per_frame)
+            per_frame.append(time.perf_counter() - pushed)
+    print(f"{'ui update_current_message':<28} {statistics.median(per_chunk) * 1e6:8.2f} us/chunk   "
+          f"render {statistics.median(per_frame) * 1000:.3f} ms/frame ({chunks_per_frame} chunks)")
+    root.destroy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--tool-payload", type=int, default=65536)
+    parser.add_argument("--only", default="agent,anthropic,openai,ui")
+    args = parser.parse_args()
+    only = set(args.only.split(","))
+
+    # Keep per-step log lines out of the measurement and the output
+    logging.getLogger("ai_chat").setLevel(logging.WARNING)
+    texts = [("token " * args.chunk_size)[:args.chunk_size] for _ in range(args.chunks)]
+    probe = Probe()
+    print(f"{args.chunks} chunks of {args.chunk_size} chars, {args.turns} turns, "
+          f"tool payload {args.tool_payload} bytes")
+    if "agent" in only:
+        bench_agent(args, probe)
+    if "anthropic" in only:
+        bench_anthropic(args, probe, texts)
+    if "openai" in only:
+        bench_openai(args, probe, texts)
+    if "ui" in only:
+        bench_ui(args, texts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Time the project symbol index over a large synthetic source tree.
+
+Usage:
+    python benchmarks/bench_symbol_index.py [--files 100000] [--workers 8] [--queries 500]
+
+Writes a synthetic project (Python, TypeScript and Go files in nested
+packages) to a temporary directory, then reports the initial build on a
+background thread together with the frame times of a 60 fps ticker on the
+main thread (standing in for the Tk event loop), a no-op ``update``, an
+incremental update after editing 100 files, the outline and the latency of
+``lookup``.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.functions.codebase.symbols import SymbolIndex
+
+WORDS = (
+    "user session token cache query index stream client server parser render model "
+    "project config event buffer socket request response schema record batch worker"
+).split()
+
+
+def identifier(rng, parts=2):
+    return "_".join(rng.choice(WORDS) for _ in range(parts))
+
+
+def camel(rng, parts=2):
+    return "".join(rng.choice(WORDS).capitalize() for _ in range(parts))
+
+
+def python_source(rng, n):
+    lines = [f'"""Module {n} handling {rng.choice(WORDS)} data."""', "import os", "", f"LIMIT_{n} = {n}", ""]
+    for c in range(rng.randint(1, 3)):
+        lines += [f"class {camel(rng)}{n}_{c}(object):", f'    """A {rng.choice(WORDS)} holder."""', ""]
+        for m in range(rng.randint(2, 6)):
+            lines += [f"    def {identifier(rng)}_{m}(self, value: int, name: str = 'x') -> int:",
+                      f'        """Return the {rng.choice(WORDS)}."""', "        return value + len(name)", ""]
+    for f in range(rng.randint(1, 4)):
+        lines += [f"def {identifier(rng)}_{n}_{f}(path, *args, **kwargs):", "    return os.path.join(path, *args)", ""]
+    return "\n".join(lines)
+
+
+def typescript_source(rng, n):
+    lines = [f"export interface {camel(rng)}Props{n} {{", "  id: number;", "}", ""]
+    lines += [f"export class {camel(rng)}{n} {{", "  render(): void {}", "}", ""]
+    for f in range(rng.randint(1, 4)):
+        lines += [f"export const {identifier(rng).replace('_', '')}{n}_{f} = (a: number) => a * 2;", ""]
+    return "\n".join(lines)
+
+
+def go_source(rng, n):
+    lines = ["package main", "", f"type {camel(rng)}{n} struct {{", "  ID int", "}", ""]
+    for f in range(rng.randint(1, 4)):
+        lines += [f"func ({rng.choice(WORDS)[0]} *{camel(rng)}{n}) {camel(rng)}{f}(x int) int {{", "  return x", "}", ""]
+    return "\n".join(lines)
+
+
+def write_project(directory, count, rng):
+    """Write ``count`` source files in nested packages; return their relative paths"""
+    writers = ((".py", python_source), (".ts", typescript_source), (".go", go_source))
+    paths = []
+    for n in range(count):
+        package = os.path.join(f"pkg{n % 40}", f"sub{n % 23}", f"mod{n % 7}")
+        extension, writer = writers[0] if n % 3 else writers[1 + n % 2]
+        path = os.path.join(package, f"file{n}{extension}")
+        os.makedirs(os.path.join(directory, package), exist_ok=True)
+        with open(os.path.join(directory, path), "w", encoding="utf-8") as f:
+            f.write(writer(rng, n))
+        paths.append(path)
+    return paths
+
+
+def build_with_ticker(index):
+    """Build on a background thread; return build seconds and the 60 fps frame times of this thread"""
+    done = threading.Event()
+    worker = threading.Thread(target=lambda: (index.update(), done.set()), daemon=True)
+    started = time.perf_counter()
+    worker.start()
+    frames, last = [], time.perf_counter()
+    while not done.is_set():
+        time.sleep(1 / 60)
+        # A frame's worth of Python work, like a Tk callback would do
+        sum(i * i for i in range(2000))
+        now = time.perf_counter()
+        frames.append(now - last)
+        last = now
+    return time.perf_counter() - started, sorted(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1))
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as directory:
+        root = os.path.join(directory, "project")
+        started = time.perf_counter()
+        paths = write_project(root, args.files, rng)
+        print(f"Wrote {args.files} files in {time.perf_counter() - started:.1f} s")
+
+        index = SymbolIndex(root, db_path=os.path.join(directory, "symbols.sqlite3"), workers=args.workers)
+        elapsed, frames = build_with_ticker(index)
+        symbols = index._connection().execute("SELECT COUNT(*) FROM symbols").fetchone()[0]
+        print(f"Initial build: {elapsed:.2f} s for {index.count()} files, {symbols} symbols ({args.workers} workers)")
+        print(f"Main-thread frames during the build: p50 {statistics.median(frames) * 1000:.1f} ms, "
+              f"p99 {frames[int(len(frames) * 0.99)] * 1000:.1f} ms, max {frames[-1] * 1000:.1f} ms, "
+              f"{sum(frame > 0.05 for frame in frames)} of {len(frames)} over 50 ms")
+
+        started = time.perf_counter()
+        index.update()
+        print(f"No-op update: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        for path in rng.sample(paths, 100):
+            with open(os.path.join(root, path), "a", encoding="utf-8") as f:
+                f.write("\n\ndef added_later():\n    pass\n" if path.endswith(".py") else "\n// edited\n")
+        started = time.perf_counter()
+        changed = index.update()
+        print(f"Incremental update: {(time.perf_counter() - started) * 1000:.0f} ms for {changed} changed files")
+
+        started = time.perf_counter()
+        outline = index.outline(1500)
+        print(f"Outline: {(time.perf_counter() - started) * 1000:.1f} ms, {len(outline)} chars")
+
+        names = [identifier(rng) for _ in range(args.queries // 2)] + [camel(rng) for _ in range(args.queries // 2)]
+        timings = []
+        for name in names:
+            started = time.perf_counter()
+            index.lookup(name, limit=5)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        print(f"lookup: median {statistics.median(timings) * 1000:.2f} ms, "
+              f"p95 {timings[int(len(timings) * 0.95)] * 1000:.2f} ms over {len(timings)} queries")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Scroll through a 10,000-message session in the virtualized transcript.
+
+Usage:
+    python benchmarks/bench_transcript.py [--messages 10000] [--steps 500]
+
+The model benchmark runs headless. The view benchmark needs a display and is
+skipped when Tk cannot open a window.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ui.transcript import TranscriptModel, VirtualTranscript
+
+
+def make_messages(count):
+    rng = random.Random(42)
+    words = "alfred project python stream token render widget message session scroll".split()
+    for i in range(count):
+        sender, right = ("You", True) if i % 2 == 0 else ("Alfred", False)
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(3, 120)))
+        yield sender, f"{sender}: {text}", right
+
+
+def bench_model(count):
+    model = TranscriptModel()
+    start = time.perf_counter()
+    for sender, text, right in make_messages(count):
+        model.append(sender, text, right, 40)
+    append_s = time.perf_counter() - start
+
+    rng = random.Random(1)
+    total = model.total_height
+    start = time.perf_counter()
+    for _ in range(100000):
+        model.index_at(rng.uniform(0, total))
+    lookup_us = (time.perf_counter() - start) / 100000 * 1e6
+
+    print(f"model: appended {count} messages in {append_s * 1000:.1f} ms, "
+          f"index_at {lookup_us:.2f} us/lookup")
+
+
+def bench_view(count, steps):
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"view: skipped ({e})")
+        return
+    root.geometry("400x500")
+    view = VirtualTranscript(root)
+    view.pack(expand=True, fill="both")
+
+    start = time.perf_counter()
+    for sender, text, right in make_messages(count):
+        view.model.append(sender, text, right, view.estimate_height(text))
+    view._update_scrollregion()
+    root.update()
+    print(f"view: loaded {count} messages in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    frame_times = []
+    for step in range(steps + 1):
+        start = time.perf_counter()
+        view.canvas.yview_moveto(step / steps)
+        view.render()
+        root.update_idletasks()
+        frame_times.append((time.perf_counter() - start) * 1000)
+
+    frame_times.sort()
+    print(f"view: scrolled {steps} steps, frame median {statistics.median(frame_times):.2f} ms, "
+          f"p95 {frame_times[int(len(frame_times) * 0.95)]:.2f} ms, "
+          f"max {frame_times[-1]:.2f} ms, live bubble widgets {view.widget_count}")
+    root.destroy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--steps", type=int, default=500)
+    args = parser.parse_args()
+
+    bench_model(args.messages)
+    bench_view(args.messages, args.steps)
+
+
+if __name__ == "__main__":
+    main()
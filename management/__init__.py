@@ -1,4 +1,5 @@
 from .ai_manager import AIManager
 from .chat_application import ChatApplication
+from .session_manager import SessionManager
 
-__all__ = ['AIManager', 'ChatApplication']
\ No newline at end of file
+__all__ = ['AIManager', 'ChatApplication', 'SessionManager']
\ No newline at end of file
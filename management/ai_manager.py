@@ -1,14 +1,52 @@
-from agent import GeneralAgent
+from typing import Callable, Optional
+from agent.agents import ProjectAgentCache
+from agent.settings import get_settings
+from .session_journal import SessionJournal
+from .session_manager import SessionManager
 
 class AIManager:
-    def __init__(self):
-        self.agent = GeneralAgent()
+    def __init__(self, sessions: Optional[SessionManager] = None):
+        settings = get_settings()
+        self.sessions = sessions or SessionManager()
+        self.stream_callback: Optional[Callable[[str], None]] = None
+        self.session_id = self.sessions.create().id
+        self.journal = SessionJournal()
+        # Pick up a session that ended without a clean shutdown
+        self.resumed_messages = self.journal.recover() if settings.resume_session else []
+        if self.resumed_messages:
+            with self.sessions.use(self.session_id) as session:
+                self.sessions.agent(session).chat_history.extend(self.resumed_messages)
+        self.journal.open()
+
+    @property
+    def agent(self):
+        """Agent of the current session, built or restored on demand"""
+        return self.sessions.agent(self.sessions.get(self.session_id))
 
     def change_agent(self, agent):
-        self.agent = agent
+        """Switch to a new session for ``agent``; the previous session stays in the pool"""
+        self.session_id = self.sessions.adopt(agent).id
+
+    def switch_session(self, session_id):
+        self.sessions.get(session_id)
+        self.session_id = session_id
         
     def set_stream_callback(self, callback):
-        self.agent.set_stream_callback(callback)
+        self.stream_callback = callback
         
     def process_message(self, user_input):
-        return self.agent.chat(user_input)
\ No newline at end of file
+        with self.sessions.use(self.session_id) as session:
+            agent = self.sessions.agent(session)
+            agent.set_stream_callback(self.stream_callback)
+            # Opening a project hands the conversation to that project's agent
+            agent.set_change_callback(self.change_agent)
+            response = agent.chat(user_input)
+        self.journal.append_turn(user_input, response)
+        return response
+
+    def close(self):
+        self.journal.close()
+        # The journal already holds this window's conversation and is what the next start resumes from
+        self.sessions.close(self.session_id)
+        self.sessions.shutdown(spill=False)
+        ProjectAgentCache.shared().shutdown()
@@ -1,4 +1,6 @@
 import tkinter as tk
+from agent.functions import get_history_index
+from agent.strategies import prewarm_clients
 from management.ai_manager import AIManager
 from ui import ChatUI
 
@@ -7,7 +9,12 @@ class ChatApplication:
         self.ai_manager = AIManager()
         self.root = tk.Tk()
         self.assistant = ChatUI(self.root, self.ai_manager.process_message, self.ai_manager)
+        self.assistant.show_history(self.ai_manager.resumed_messages)
         self.ai_manager.set_stream_callback(self.assistant.update_current_message)
+        # Connect to the providers once the window is up, ahead of the first turn
+        self.root.after_idle(prewarm_clients)
+        # Index earlier sessions in the background so search_history is ready when first used
+        self.root.after_idle(get_history_index)
     
     def run(self):
-        self.root.mainloop()
\ No newline at end of file
+        self.root.mainloop()
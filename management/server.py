@@ -0,0 +1,295 @@
+import asyncio
+import json
+import re
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+from agent.functions import get_history_index
+from agent.logger_config import logger
+from agent.settings import get_settings
+from agent.strategies import prewarm_clients
+from agent.telemetry import Telemetry
+from .session_manager import Session, SessionManager
+
+_TURN_DONE = object()
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: Dict[str, str]
+    headers: Dict[str, str]
+    body: bytes
+
+    def json(self) -> Dict[str, Any]:
+        try:
+            data = json.loads(self.body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Request body is not valid JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Request body must be a JSON object")
+        return data
+
+    def wants_stream(self) -> bool:
+        if self.query.get("stream") in ("0", "false", "False"):
+            return False
+        accept = self.headers.get("accept", "")
+        return "text/event-stream" in accept or "application/json" not in accept
+
+
+class ChatServer:
+    """Headless HTTP server exposing agent sessions, with replies streamed as Server-Sent Events.
+
+    Sessions live in a ``SessionManager``: each gets its own agent, built on its
+    first message and spilled to disk when idle. The server is plain asyncio and
+    runs on the ``StrategyRuntime`` loop next to the strategies, so a streaming
+    turn costs one task and one socket rather than a thread. Session calls that
+    may touch the disk (restoring, spilling, building an agent) run on worker
+    threads so they never stall the other connections. Sessions run one
+    turn at a time; a client that disconnects mid-stream cancels its turn.
+
+    Routes:
+        GET    /health
+        GET    /metrics                    -> Prometheus text (with TELEMETRY=True)
+        POST   /sessions                   -> {"id": ...}
+        GET    /sessions
+        POST   /sessions/{id}/messages     {"message": ...} -> SSE stream or JSON
+        GET    /sessions/{id}/messages
+        DELETE /sessions/{id}
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        sessions: Optional[SessionManager] = None,
+        token: Optional[str] = None,
+        max_body: int = 1024 * 1024,
+        header_timeout: float = 30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.sessions = sessions or SessionManager()
+        self.token = token if token is not None else get_settings().alfred_server_token
+        self.max_body = max_body
+        self.header_timeout = header_timeout
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._turns: set = set()
+        self._routes: List[Tuple[str, re.Pattern, Callable[..., Awaitable[None]]]] = [
+            ("GET", re.compile(r"/health"), self._health),
+            ("GET", re.compile(r"/metrics"), self._metrics),
+            ("POST", re.compile(r"/sessions"), self._create_session),
+            ("GET", re.compile(r"/sessions"), self._list_sessions),
+            ("POST", re.compile(r"/sessions/([\w-]+)/messages"), self._post_message),
+            ("GET", re.compile(r"/sessions/([\w-]+)/messages"), self._get_messages),
+            ("DELETE", re.compile(r"/sessions/([\w-]+)"), self._delete_session),
+        ]
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        prewarm_clients()
+        get_history_index()
+        logger.info(f"Chat server listening on http://{self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in list(self._turns):
+            task.cancel()
+        if self._turns:
+            await asyncio.wait(list(self._turns), timeout=5)
+        await asyncio.to_thread(self.sessions.shutdown)
+        logger.info("Chat server stopped")
+
+    # HTTP plumbing
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Request:
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.header_timeout)
+        except asyncio.LimitOverrunError:
+            raise HTTPError(431, "Request headers too large")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > self.max_body:
+            raise HTTPError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        path, _, query = target.partition("?")
+        return Request(method.upper(), path.rstrip("/") or "/", dict(parse_qsl(query)), headers, body)
+
+    @staticmethod
+    def _head(status: int, content_type: str, length: Optional[int] = None, extra: str = "") -> bytes:
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}", f"Content-Type: {content_type}", "Connection: close"]
+        if length is not None:
+            lines.append(f"Content-Length: {length}")
+        return ("\r\n".join(lines) + "\r\n" + extra + "\r\n").encode("latin-1")
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Any = None) -> None:
+        body = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(self._head(status, "application/json", len(body)) + body)
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await self._read_request(reader)
+            if self.token and request.headers.get("authorization") != f"Bearer {self.token}":
+                raise HTTPError(401, "Missing or invalid bearer token")
+
+            path_matched = False
+            for method, pattern, handler in self._routes:
+                match = pattern.fullmatch(request.path)
+                if not match:
+                    continue
+                path_matched = True
+                if method == request.method:
+                    await handler(request, writer, *match.groups())
+                    break
+            else:
+                raise HTTPError(405 if path_matched else 404, "Method not allowed" if path_matched else "Not found")
+        except HTTPError as e:
+            await self._respond(writer, e.status, {"error": e.message})
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"Error handling request: {e}", exc_info=True)
+            try:
+                await self._respond(writer, 500, {"error": "Internal server error"})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    # Routes
+
+    async def _session(self, session_id: str) -> Session:
+        try:
+            return await asyncio.to_thread(self.sessions.get, session_id)
+        except KeyError:
+            raise HTTPError(404, f"Unknown session {session_id}")
+
+    async def _health(self, request: Request, writer: asyncio.StreamWriter) -> None:
+        stats = await asyncio.to_thread(self.sessions.stats)
+        await self._respond(writer, 200, {"status": "ok", "active_turns": len(self._turns), **stats})
+
+    async def _metrics(self, request: Request, writer: asyncio.StreamWriter) -> None:
+        telemetry = Telemetry.get()
+        if not telemetry.enabled:
+            raise HTTPError(404, "Telemetry is disabled; set TELEMETRY=True")
+        body = telemetry.prometheus().encode("utf-8")
+        writer.write(self._head(200, "text/plain; version=0.0.4; charset=utf-8", len(body)) + body)
+        await writer.drain()
+
+    async def _create_session(self, request: Request, writer: asyncio.StreamWriter) -> None:
+        session = await asyncio.to_thread(self.sessions.create)
+        logger.info(f"Created session {session.id}")
+        await self._respond(writer, 201, {"id": session.id})
+
+    async def _list_sessions(self, request: Request, writer: asyncio.StreamWriter) -> None:
+        await self._respond(writer, 200, await asyncio.to_thread(self.sessions.list))
+
+    async def _get_messages(self, request: Request, writer: asyncio.StreamWriter, session_id: str) -> None:
+        history = self.sessions.messages(await self._session(session_id))
+        await self._respond(writer, 200, [message for message in history if message["role"] != "system"])
+
+    async def _delete_session(self, request: Request, writer: asyncio.StreamWriter, session_id: str) -> None:
+        try:
+            await asyncio.to_thread(self.sessions.close, session_id)
+        except KeyError:
+            raise HTTPError(404, f"Unknown session {session_id}")
+        await self._respond(writer, 204)
+
+    async def _post_message(self, request: Request, writer: asyncio.StreamWriter, session_id: str) -> None:
+        message = request.json().get("message")
+        if not isinstance(message, str) or not message.strip():
+            raise HTTPError(400, "Field 'message' must be a non-empty string")
+        try:
+            session = await asyncio.to_thread(self.sessions.hold, session_id)
+        except KeyError:
+            raise HTTPError(404, f"Unknown session {session_id}")
+        try:
+            await self._run_turn(request, writer, session, message)
+        finally:
+            await asyncio.to_thread(self.sessions.release, session)
+
+    async def _run_turn(self, request: Request, writer: asyncio.StreamWriter, session: Session, message: str) -> None:
+        if session.lock.locked():
+            raise HTTPError(409, "A turn is already running in this session")
+
+        async with session.lock:
+            agent = await asyncio.to_thread(self.sessions.agent, session)
+            queue: asyncio.Queue = asyncio.Queue()
+            stream = request.wants_stream()
+            agent.set_stream_callback(queue.put_nowait if stream else None)
+
+            task = asyncio.ensure_future(agent.achat(message))
+            self._turns.add(task)
+            task.add_done_callback(self._turns.discard)
+            task.add_done_callback(lambda _: queue.put_nowait(_TURN_DONE))
+            try:
+                if stream:
+                    await self._stream_turn(writer, queue, task)
+                else:
+                    try:
+                        response = await asyncio.shield(task)
+                    except Exception as e:
+                        logger.error(f"Turn failed: {e}")
+                        raise HTTPError(502, str(e))
+                    await self._respond(writer, 200, {"response": response})
+            except (ConnectionError, asyncio.CancelledError):
+                task.cancel()
+                raise
+            finally:
+                agent.set_stream_callback(None)
+
+    async def _stream_turn(self, writer: asyncio.StreamWriter, queue: asyncio.Queue, task: asyncio.Task) -> None:
+        writer.write(self._head(200, "text/event-stream; charset=utf-8", extra="Cache-Control: no-cache\r\n"))
+
+        def event(name: str, data: Dict[str, Any]) -> bytes:
+            return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+        finished = False
+        while not finished:
+            parts = [await queue.get()]
+            # Coalesce everything that queued up while the socket was busy
+            while not queue.empty():
+                parts.append(queue.get_nowait())
+            if parts[-1] is _TURN_DONE:
+                finished = True
+                parts.pop()
+            if parts:
+                writer.write(event("token", {"text": "".join(parts)}))
+            await writer.drain()
+
+        if task.cancelled():
+            writer.write(event("error", {"error": "Turn cancelled"}))
+        elif task.exception() is not None:
+            logger.error(f"Turn failed: {task.exception()}")
+            writer.write(event("error", {"error": str(task.exception())}))
+        else:
+            writer.write(event("done", {"response": task.result()}))
+        await writer.drain()
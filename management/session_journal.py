@@ -0,0 +1,190 @@
+import datetime
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from agent.logger_config import logger
+
+class SessionJournal:
+    """Append-only JSONL journal of a chat session.
+
+    Every finished turn is appended as ``message`` records and flushed to the
+    OS right away; a background thread fsyncs the file at most every
+    ``sync_interval`` seconds. A clean shutdown writes an ``end`` record, so a
+    journal without one belongs to a session that crashed and can be resumed.
+
+    File IDs come from a small counter file (``.counter``) that remembers the
+    last index used per day and the last journal written, so allocating a
+    new file and finding the previous session are both O(1).
+    """
+
+    def __init__(self, directory: str = ".history", prefix: str = "AIAgent", sync_interval: float = 1.0):
+        self.directory = directory
+        self.prefix = prefix
+        self.sync_interval = sync_interval
+        self.path: Optional[str] = None
+        self._file = None
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._closed = threading.Event()
+        self._syncer: Optional[threading.Thread] = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def counter_path(self) -> str:
+        return os.path.join(self.directory, ".counter")
+
+    def _read_counter(self) -> Dict[str, Any]:
+        try:
+            with open(self.counter_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_counter(self, counter: Dict[str, Any]) -> None:
+        tmp_path = f"{self.counter_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(counter, f)
+        os.replace(tmp_path, self.counter_path)
+
+    def _allocate(self) -> str:
+        """Create the next free journal file for today and return its path"""
+        date = datetime.datetime.now().strftime("%Y%m%d")
+        counter = self._read_counter()
+        index = counter.get("index", 0) + 1 if counter.get("date") == date else 1
+
+        while True:
+            base = os.path.join(self.directory, f"{self.prefix}_{date}_{index:03d}")
+            # Skip indices taken by history files written before the journal existed
+            if not os.path.exists(f"{base}.json"):
+                try:
+                    fd = os.open(f"{base}.jsonl", os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                    os.close(fd)
+                    break
+                except FileExistsError:
+                    pass
+            index += 1
+
+        self._write_counter({"date": date, "index": index, "last": os.path.basename(base) + ".jsonl"})
+        return f"{base}.jsonl"
+
+    @staticmethod
+    def _scan(path: str) -> Tuple[List[Dict[str, Any]], int]:
+        """Records of a journal and its size without a torn final line.
+
+        A crash can only tear the line being appended, so an unterminated or
+        unreadable final line is left out of the size for ``recover`` to cut
+        off. Corrupt lines elsewhere are skipped but kept in the file.
+        """
+        records = []
+        size = 0
+        corrupt = None
+        with open(path, "rb") as f:
+            for number, line in enumerate(f, 1):
+                if corrupt is not None:
+                    logger.warning(f"Skipping unreadable journal line {number - 1} in {path}")
+                    size += len(corrupt)
+                    corrupt = None
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    corrupt = line
+                    continue
+                if not line.endswith(b"\n"):
+                    corrupt = line
+                    continue
+                records.append(record)
+                size += len(line)
+        if corrupt is not None:
+            logger.warning(f"Dropping torn final line of {path}")
+        return records, size
+
+    @classmethod
+    def read(cls, path: str) -> List[Dict[str, Any]]:
+        """Read the records of a journal, ignoring unreadable lines"""
+        return cls._scan(path)[0]
+
+    def recover(self) -> List[Dict[str, str]]:
+        """Reopen the last session if it did not end cleanly and return its messages.
+
+        Returns an empty list (and leaves the journal unopened) when the last
+        session was closed normally or there is none.
+        """
+        last = self._read_counter().get("last")
+        if not last:
+            return []
+        path = os.path.join(self.directory, last)
+        try:
+            records, size = self._scan(path)
+        except OSError:
+            return []
+        if not records or records[-1].get("type") == "end":
+            return []
+
+        messages = [
+            {"role": record["role"], "content": record["content"]}
+            for record in records if record.get("type") == "message"
+        ]
+        self.path = path
+        if size < os.path.getsize(path):
+            os.truncate(path, size)
+        logger.info(f"Resuming unfinished session {path} with {len(messages)} messages")
+        return messages
+
+    def open(self) -> None:
+        """Start a new journal, or continue the one picked up by ``recover``"""
+        if self._file is not None:
+            return
+        resumed = self.path is not None
+        if not resumed:
+            self.path = self._allocate()
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._write({"type": "resume" if resumed else "session", "time": time.time()})
+
+        self._syncer = threading.Thread(target=self._sync_loop, name="session-journal", daemon=True)
+        self._syncer.start()
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self._dirty = True
+
+    def append_turn(self, user_message: str, response: str) -> None:
+        """Journal a finished turn"""
+        if self._file is None:
+            self.open()
+        now = time.time()
+        try:
+            self._write({"type": "message", "role": "user", "content": user_message, "time": now})
+            self._write({"type": "message", "role": "assistant", "content": response, "time": now})
+        except (OSError, ValueError) as e:
+            logger.error(f"Error writing session journal: {e}")
+
+    def sync(self) -> None:
+        with self._lock:
+            if self._file is not None and self._dirty:
+                os.fsync(self._file.fileno())
+                self._dirty = False
+
+    def _sync_loop(self) -> None:
+        while not self._closed.wait(self.sync_interval):
+            try:
+                self.sync()
+            except (OSError, ValueError) as e:
+                logger.error(f"Error syncing session journal: {e}")
+
+    def close(self) -> None:
+        """Mark the session as finished; costs the same however long it ran"""
+        if self._file is None:
+            return
+        self._closed.set()
+        try:
+            self._write({"type": "end", "time": time.time()})
+            self.sync()
+            with self._lock:
+                self._file.close()
+        except (OSError, ValueError) as e:
+            logger.error(f"Error closing session journal: {e}")
+        self._file = None
@@ -0,0 +1,326 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from agent import GeneralAgent
+from agent.agents import ProjectAgentCache
+from agent.agents.ai_agent import AIAgent
+from agent.logger_config import logger
+from agent.settings import get_settings
+
+_SESSION_ID = re.compile(r"[\w-]{1,64}")
+
+
+@dataclass
+class Session:
+    """A chat session; its agent is only built when a turn needs it"""
+    id: str
+    created: float = field(default_factory=time.time)
+    last_active: float = field(default_factory=time.time)
+    agent: Optional[AIAgent] = None
+    history: Optional[List[Dict[str, Any]]] = None  # Restored history, applied when the agent is built
+    env: Optional[Dict[str, Any]] = None  # Restored environment of a project agent, rebuilt through ProjectAgentCache
+    touched: float = field(default_factory=time.monotonic)  # Last access, for eviction
+    size: int = 0  # Estimated resident bytes
+    busy: int = 0  # Users holding the session through SessionManager.use
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class SessionManager:
+    """Pool of chat sessions keyed by ID, with a bounded number of live agents.
+
+    Creating a session only reserves its ID; the agent (tools, chat history,
+    strategy client) is built on first use. Sessions that have been idle for
+    ``idle_timeout`` seconds, and the least recently used ones once more than
+    ``max_resident`` sessions or ``max_memory`` estimated bytes are resident,
+    are spilled to ``directory`` as JSON and dropped from memory. A spilled
+    session is restored transparently the next time it is asked for; one whose
+    agent was a project agent (see ``adopt``) gets it back from
+    ``project_agents`` with the same project environment. Sessions held
+    through ``use`` are never evicted.
+
+    Limits default to ``SESSION_MAX_RESIDENT``, ``SESSION_MEMORY_LIMIT_MB``
+    and ``SESSION_IDLE_TIMEOUT``; spill files older than
+    ``SESSION_SPILL_RETENTION_DAYS`` are deleted by the background sweep.
+    """
+
+    def __init__(
+        self,
+        agent_factory: Callable[[], AIAgent] = GeneralAgent,
+        project_agents: Optional[ProjectAgentCache] = None,
+        directory: str = os.path.join(".cache", "sessions"),
+        max_resident: Optional[int] = None,
+        max_memory: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        spill_retention: Optional[float] = None,
+        agent_overhead: int = 256 * 1024,
+        sweep_interval: Optional[float] = 60.0,
+    ):
+        settings = get_settings()
+        self.agent_factory = agent_factory
+        self.project_agents = project_agents or ProjectAgentCache.shared()
+        self.directory = directory
+        self.max_resident = max_resident if max_resident is not None else settings.session_max_resident
+        self.max_memory = max_memory if max_memory is not None else int(settings.session_memory_limit_mb * 1024 * 1024)
+        self.idle_timeout = idle_timeout if idle_timeout is not None else settings.session_idle_timeout
+        self.spill_retention = spill_retention if spill_retention is not None else settings.session_spill_retention_days * 86400
+        self.agent_overhead = agent_overhead  # Rough fixed cost of a built agent: tools, strategy and client
+        self._resident: "OrderedDict[str, Session]" = OrderedDict()  # Least recently used first
+        self._memory = 0
+        self._lock = threading.RLock()
+        self.spills = 0
+        self.restores = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._stopped = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+        if sweep_interval:
+            self._sweeper = threading.Thread(target=self._sweep_loop, args=(sweep_interval,), name="session-sweep", daemon=True)
+            self._sweeper.start()
+
+    def _spill_path(self, session_id: str) -> str:
+        return os.path.join(self.directory, f"{session_id}.json")
+
+    def _measure(self, session: Session) -> int:
+        history = session.agent.chat_history if session.agent else session.history or []
+        size = sum(
+            256 + len(message["content"] if isinstance(message.get("content"), str) else json.dumps(message, default=str))
+            for message in history
+        )
+        return size + (self.agent_overhead if session.agent else 0)
+
+    def _account(self, session: Session) -> None:
+        size = self._measure(session)
+        self._memory += size - session.size
+        session.size = size
+
+    def _admit(self, session: Session) -> None:
+        self._resident[session.id] = session
+        self._account(session)
+
+    def _touch(self, session: Session) -> None:
+        session.touched = time.monotonic()
+        self._resident.move_to_end(session.id)
+
+    def create(self, session_id: Optional[str] = None) -> Session:
+        """Reserve a new session; no agent is built yet"""
+        session_id = session_id or uuid.uuid4().hex
+        if not _SESSION_ID.fullmatch(session_id):
+            raise ValueError(f"Invalid session ID {session_id!r}")
+        with self._lock:
+            if session_id in self._resident or os.path.exists(self._spill_path(session_id)):
+                raise ValueError(f"Session {session_id} already exists")
+            session = Session(session_id)
+            self._admit(session)
+        self.evict()
+        return session
+
+    def adopt(self, agent: AIAgent) -> Session:
+        """Add a session around an agent that was built elsewhere, or return the one it already has"""
+        with self._lock:
+            for session in self._resident.values():
+                if session.agent is agent:
+                    self._touch(session)
+                    return session
+            session = Session(uuid.uuid4().hex, agent=agent)
+            self._admit(session)
+        self.evict()
+        return session
+
+    def get(self, session_id: str) -> Session:
+        """Return a session, restoring it from disk if it was spilled; KeyError if unknown"""
+        session = self._get(session_id)
+        self.evict()
+        return session
+
+    def _get(self, session_id: str) -> Session:
+        with self._lock:
+            session = self._resident.get(session_id)
+            if session is not None:
+                self._touch(session)
+                return session
+            if not _SESSION_ID.fullmatch(session_id):
+                raise KeyError(session_id)
+            try:
+                with open(self._spill_path(session_id), encoding="utf-8") as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                raise KeyError(session_id)
+            session = Session(
+                session_id, created=data["created"], last_active=data["last_active"],
+                history=data["history"], env=data.get("env"),
+            )
+            self._admit(session)
+            os.remove(self._spill_path(session_id))
+            self.restores += 1
+        logger.debug(f"Restored session {session_id}")
+        return session
+
+    def agent(self, session: Session) -> AIAgent:
+        """The session's agent, built on first call.
+
+        The agent is built outside the pool lock so other sessions are not held
+        up meanwhile; if two callers race, the first agent installed wins.
+        """
+        if session.agent is None:
+            history = session.history
+            if session.env is not None:
+                # The project's agent may still be warm; its system prompt is rebuilt from env
+                agent = self.project_agents.get(session.env["project"], session.env)
+                if history is not None:
+                    agent.chat_history[1:] = history[1:]
+            else:
+                agent = self.agent_factory()
+                if history is not None:
+                    agent.chat_history = history
+            with self._lock:
+                if session.agent is None:
+                    session.agent = agent
+                    session.history = None
+                    session.env = None
+                    if session.id in self._resident:
+                        self._account(session)
+        return session.agent
+
+    def messages(self, session: Session) -> List[Dict[str, Any]]:
+        """Chat history of a session without building its agent"""
+        return session.agent.chat_history if session.agent else session.history or []
+
+    @contextmanager
+    def use(self, session_id: str) -> Iterator[Session]:
+        """Hold a session for the duration of a turn so it cannot be evicted meanwhile"""
+        session = self.hold(session_id)
+        try:
+            yield session
+        finally:
+            self.release(session)
+
+    def hold(self, session_id: str) -> Session:
+        """Restore a session if needed and keep it from being evicted until ``release``; KeyError if unknown"""
+        with self._lock:
+            session = self._get(session_id)
+            session.busy += 1
+        self.evict()
+        return session
+
+    def release(self, session: Session) -> None:
+        """End a turn started with ``hold``"""
+        with self._lock:
+            session.busy -= 1
+            session.last_active = time.time()
+            if session.id in self._resident:
+                self._touch(session)
+                self._account(session)
+        self.evict()
+
+    def close(self, session_id: str) -> None:
+        """Forget a session, resident or spilled; KeyError if unknown"""
+        with self._lock:
+            session = self._resident.pop(session_id, None)
+            if session is not None:
+                self._memory -= session.size
+                if session.agent and session.agent.strategy:
+                    session.agent.strategy.cancel_current_stream()
+                return
+            if not _SESSION_ID.fullmatch(session_id):
+                raise KeyError(session_id)
+            try:
+                os.remove(self._spill_path(session_id))
+            except FileNotFoundError:
+                raise KeyError(session_id)
+
+    def _spill(self, session: Session) -> None:
+        env = session.env
+        if session.agent is not None and "project" in session.agent.env:
+            env = session.agent.env
+        data = {
+            "id": session.id,
+            "created": session.created,
+            "last_active": session.last_active,
+            "history": self.messages(session) if session.agent or session.history is not None else None,
+            "env": env,
+        }
+        path = self._spill_path(session.id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        del self._resident[session.id]
+        self._memory -= session.size
+        self.spills += 1
+
+    def evict(self) -> int:
+        """Spill idle sessions, then least recently used ones until within limits; return how many"""
+        spilled = 0
+        with self._lock:
+            now = time.monotonic()
+            for session in list(self._resident.values()):
+                over_limit = len(self._resident) > self.max_resident or self._memory > self.max_memory
+                if not over_limit and now - session.touched <= self.idle_timeout:
+                    break  # Sessions are ordered by last access, so the rest are fresher
+                if session.busy:
+                    continue
+                try:
+                    self._spill(session)
+                    spilled += 1
+                except OSError as e:
+                    logger.error(f"Could not spill session {session.id}: {e}")
+                    break
+        if spilled:
+            logger.debug(f"Spilled {spilled} sessions to {self.directory}")
+        return spilled
+
+    def _sweep_loop(self, interval: float) -> None:
+        while not self._stopped.wait(interval):
+            self.evict()
+            self._expire_spilled()
+
+    def _expire_spilled(self) -> None:
+        cutoff = time.time() - self.spill_retention
+        try:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".json") and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+        except OSError as e:
+            logger.warning(f"Could not expire spilled sessions: {e}")
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Resident and spilled sessions"""
+        with self._lock:
+            sessions = [
+                {"id": session.id, "created": session.created, "last_active": session.last_active, "resident": True}
+                for session in self._resident.values()
+            ]
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".json"):
+                    sessions.append({"id": entry.name[:-5], "last_active": entry.stat().st_mtime, "resident": False})
+        return sessions
+
+    def shutdown(self, spill: bool = True) -> None:
+        """Stop the sweep and, with ``spill``, spill every resident session so a restart can pick them up"""
+        self._stopped.set()
+        if not spill:
+            return
+        with self._lock:
+            for session in list(self._resident.values()):
+                try:
+                    self._spill(session)
+                except OSError as e:
+                    logger.error(f"Could not spill session {session.id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "resident": len(self._resident),
+                "agents": sum(1 for session in self._resident.values() if session.agent),
+                "memory_bytes": self._memory,
+                "spills": self.spills,
+                "restores": self.restores,
+            }
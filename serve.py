@@ -0,0 +1,34 @@
+import argparse
+import os
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent.settings import get_settings
+from agent.strategies.runtime import StrategyRuntime
+from management.server import ChatServer
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Run Alfred as a headless HTTP/SSE service")
+    parser.add_argument("--host", default=settings.alfred_host)
+    parser.add_argument("--port", type=int, default=settings.alfred_port)
+    args = parser.parse_args()
+
+    # The server shares the strategies' event loop, so turns run as tasks next to their streams
+    runtime = StrategyRuntime.get()
+    server = ChatServer(args.host, args.port)
+    runtime.run(server.start())
+
+    stop = threading.Event()
+    try:
+        while not stop.wait(1.0):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runtime.run(server.stop(), timeout=10)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
 import tkinter as tk
-import datetime
 import threading
-import os
-import json
+from agent.logger_config import transcript_logger
+from .stream_renderer import StreamRenderer
+from .transcript import VirtualTranscript
 
 class ChatUI:
     def __init__(self, root, message_callback, ai_manager):
@@ -14,12 +14,11 @@ class ChatUI:
         self.root.attributes('-alpha', 0.9)
         self.root.resizable(False, False)
         
-        # Create .history directory if it doesn't exist
-        os.makedirs('.history', exist_ok=True)
-        
         self.setup_ui()
-        self.log_file = "assistant.log"
         self.loading = False
+        self.streaming = False
+        self.renderer = StreamRenderer(self.root, self._append_to_current_message)
+        self.renderer.start()
         self.add_message("Alfred", "Hello! Type your message and press Enter. Press Escape to exit.")
         
         # Bind window closing events
@@ -27,48 +26,16 @@ class ChatUI:
         self.root.bind("<Escape>", lambda e: self.on_closing())
     
     def on_closing(self, event=None):
-        """Handle window closing and save chat history"""
-        # Get current date
-        date = datetime.datetime.now().strftime("%Y%m%d")
-        
-        # Create .history directory if it doesn't exist
-        os.makedirs('.history', exist_ok=True)
-        
-        # Find the next available index for today's files
-        index = 1
-        while os.path.exists(f'.history/AIAgent_{date}_{index:03d}.json'):
-            index += 1
-        
-        filename = f'.history/AIAgent_{date}_{index:03d}.json'
-        
-        history_data = self.ai_manager.agent.get_chat_history()
-        
-        try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(history_data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error saving chat history: {e}")
-        
+        """Handle window closing; turns are already journaled, so this only marks the session finished"""
+        self.renderer.stop()
+        self.ai_manager.close()
         self.root.destroy()
         
     def setup_ui(self):
-        self.chat_frame = tk.Frame(self.root, bg="#f0f0f0")
-        self.chat_frame.pack(padx=10, pady=10, expand=True, fill='both')
-        
-        self.canvas = tk.Canvas(self.chat_frame, bg="#f0f0f0", highlightthickness=0)
-        self.scrollbar = tk.Scrollbar(self.chat_frame, orient="vertical", command=self.canvas.yview)
-        self.scrollable_frame = tk.Frame(self.canvas, bg="#f0f0f0")
-        
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        )
-        
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
-        
-        self.canvas.pack(side="left", fill="both", expand=True)
-        self.scrollbar.pack(side="right", fill="y")
+        # Only visible bubbles are backed by widgets; message text lives in the transcript model
+        self.transcript = VirtualTranscript(self.root, bg="#f0f0f0")
+        self.transcript.pack(padx=10, pady=10, expand=True, fill='both')
+        self.canvas = self.transcript.canvas
         
         self.canvas.bind_all("<MouseWheel>", self._on_mousewheel)
         
@@ -97,8 +64,6 @@ class ChatUI:
             self.add_message("You", user_input, right=True)
             self.log_message(user_input)
             
-            self.current_message_label = None
-            
             self.show_loading()
             
             def callback_wrapper():
@@ -109,54 +74,39 @@ class ChatUI:
             thread.start()
 
     def handle_response(self, response):
+        # Render chunks still waiting for the next frame before closing the bubble
+        self.renderer.flush()
+        self.transcript.end_stream()
+        self.streaming = False
         self.hide_loading()
         self.log_message(f"Alfred: {response}")
     
     def _on_mousewheel(self, event):
-        self.canvas.yview_scroll(-1 * (event.delta // 120), "units")
+        self.transcript.scroll(-1 * (event.delta // 120))
     
     def add_message(self, sender, message, right=False):
-        bubble_frame = tk.Frame(self.scrollable_frame, bg="#f0f0f0", pady=5)
-        
-        bubble_label = tk.Label(
-            bubble_frame,
-            text=f"{sender}: {message}",
-            padx=10,
-            pady=5,
-            wraplength=300,
-            justify="right" if right else "left",
-            bg="#add8e6" if sender == "Alfred" else "#90ee90",
-            anchor="e" if right else "w"
-        )
-        bubble_label.pack(anchor="e" if right else "w", padx=(50 if right else 10, 10 if right else 50))
-        
-        if sender == "Alfred":
-            self.current_message_label = bubble_label
-        
-        bubble_frame.pack(anchor="e" if right else "w", fill='x', padx=10, pady=2)
-        self.scrollable_frame.update_idletasks()
-        self.canvas.yview_moveto(1.0)
+        self.transcript.append(sender, message, right=right)
+    
+    def show_history(self, messages):
+        """Show the messages of a resumed session"""
+        for message in messages:
+            if message["role"] == "user":
+                self.add_message("You", message["content"], right=True)
+            elif message["role"] == "assistant":
+                self.add_message("Alfred", message["content"])
     
     def update_current_message(self, chunk):
-        if not hasattr(self, 'current_message_label') or self.current_message_label is None:
-            self.add_message("Alfred", chunk)
+        """Stream callback; safe to call from the worker thread"""
+        self.renderer.push(chunk)
+    
+    def _append_to_current_message(self, delta):
+        """Append a coalesced delta to the streaming bubble (Tk main thread)"""
+        if not self.streaming:
+            self.streaming = True
+            self.transcript.begin_stream("Alfred", delta)
         else:
-            current_text = self.current_message_label.cget("text")
-            
-            if current_text.startswith("Alfred: "):
-                current_text = current_text[8:]
-
-            if current_text:
-                new_text = f"{current_text}{chunk}"
-            else:
-                new_text = chunk
-            
-            self.current_message_label.config(text=f"Alfred: {new_text}")
-            
-            self.scrollable_frame.update_idletasks()
-            self.canvas.yview_moveto(1.0)
+            self.transcript.stream(delta)
     
     def log_message(self, message):
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(self.log_file, "a") as log_file:
-            log_file.write(f"[{timestamp}] {message}\n")
\ No newline at end of file
+        # Written to assistant.log by the shared background log listener
+        transcript_logger.info(message)
\ No newline at end of file
@@ -0,0 +1,64 @@
+import queue
+import time
+from typing import Callable
+from agent.telemetry import Telemetry
+
+class StreamRenderer:
+    """Coalesces streamed chunks and renders them from the Tk main loop.
+
+    ``push`` may be called from any thread; it only enqueues the chunk. The Tk
+    main loop drains the queue on an ``after()`` timer capped at ``fps`` and
+    hands all chunks received since the previous frame to ``on_delta`` as one
+    string, so rendering cost is per frame rather than per chunk. With
+    telemetry on, the wait of the oldest chunk in a frame is recorded as UI
+    lag, next to the time the frame took to draw.
+    """
+
+    def __init__(self, root, on_delta: Callable[[str], None], fps: int = 30):
+        self.root = root
+        self.on_delta = on_delta
+        self.interval = max(1, 1000 // fps)
+        self._queue: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+        self._after_id = None
+        self.telemetry = Telemetry.get()
+        self._first_pushed = None  # Arrival of the oldest chunk not yet drawn, with telemetry on
+
+    def push(self, chunk: str) -> None:
+        """Queue a chunk for rendering (thread-safe)"""
+        if chunk:
+            if self.telemetry.enabled and self._first_pushed is None:
+                self._first_pushed = time.perf_counter()
+            self._queue.put(chunk)
+
+    def start(self) -> None:
+        """Start the frame timer on the Tk main loop"""
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval, self._tick)
+
+    def stop(self) -> None:
+        """Cancel the frame timer"""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def flush(self) -> None:
+        """Render everything queued so far (main thread only)"""
+        first_pushed, self._first_pushed = self._first_pushed, None
+        parts = []
+        while True:
+            try:
+                parts.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not parts:
+            return
+        started = time.perf_counter()
+        self.on_delta("".join(parts))
+        if first_pushed is not None:
+            drawn = time.perf_counter()
+            self.telemetry.observe("alfred_ui_lag_seconds", drawn - first_pushed)
+            self.telemetry.observe("alfred_ui_render_seconds", drawn - started)
+
+    def _tick(self) -> None:
+        self.flush()
+        self._after_id = self.root.after(self.interval, self._tick)
@@ -0,0 +1,325 @@
+import math
+import tkinter as tk
+import tkinter.font as tkfont
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+class TranscriptModel:
+    """Compact message store for the chat transcript, kept outside of Tk.
+
+    Texts live in a plain list, senders are interned and flags are packed into
+    arrays. Bubble heights are tracked in a Fenwick tree so the y offset of any
+    message, and the message at any y offset, are found in O(log n) while
+    single heights can change as bubbles are measured.
+    """
+
+    def __init__(self):
+        self._sender_names: List[str] = []
+        self._sender_ids = array('H')
+        self._right = array('b')
+        self._texts: List[str] = []
+        self._heights = array('i')
+        self._tree = array('q', [0])  # Fenwick tree over heights, 1-based
+        self._stream_parts: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def append(self, sender: str, text: str, right: bool, height: int) -> int:
+        """Add a message and return its index"""
+        if sender not in self._sender_names:
+            self._sender_names.append(sender)
+        self._sender_ids.append(self._sender_names.index(sender))
+        self._right.append(1 if right else 0)
+        self._texts.append(text)
+        self._heights.append(height)
+
+        # Fenwick append: node n covers (n - lowbit(n), n]
+        n = len(self._texts)
+        low = n & -n
+        self._tree.append(height + self._prefix(n - 1) - self._prefix(n - low))
+        return n - 1
+
+    def sender(self, index: int) -> str:
+        return self._sender_names[self._sender_ids[index]]
+
+    def is_right(self, index: int) -> bool:
+        return bool(self._right[index])
+
+    def text(self, index: int) -> str:
+        if self._stream_parts is not None and index == len(self._texts) - 1:
+            return "".join(self._stream_parts)
+        return self._texts[index]
+
+    def begin_stream(self, sender: str, height: int) -> int:
+        """Start a message whose text arrives in pieces"""
+        self.end_stream()
+        self._stream_parts = []
+        return self.append(sender, "", False, height)
+
+    def stream(self, delta: str) -> None:
+        if self._stream_parts is not None:
+            self._stream_parts.append(delta)
+
+    def end_stream(self) -> None:
+        if self._stream_parts is not None:
+            self._texts[-1] = "".join(self._stream_parts)
+            self._stream_parts = None
+
+    @property
+    def streaming_index(self) -> Optional[int]:
+        return len(self._texts) - 1 if self._stream_parts is not None else None
+
+    def height(self, index: int) -> int:
+        return self._heights[index]
+
+    def set_height(self, index: int, height: int) -> None:
+        delta = height - self._heights[index]
+        if not delta:
+            return
+        self._heights[index] = height
+        node = index + 1
+        while node < len(self._tree):
+            self._tree[node] += delta
+            node += node & -node
+
+    def _prefix(self, count: int) -> int:
+        total = 0
+        while count > 0:
+            total += self._tree[count]
+            count -= count & -count
+        return total
+
+    def top(self, index: int) -> int:
+        """Y offset of a message"""
+        return self._prefix(index)
+
+    @property
+    def total_height(self) -> int:
+        return self._prefix(len(self._texts))
+
+    def index_at(self, y: float) -> int:
+        """Index of the message covering offset ``y``"""
+        n = len(self._texts)
+        if n == 0:
+            return 0
+        pos = 0
+        remaining = y
+        bit = 1 << (n.bit_length() - 1)
+        while bit:
+            nxt = pos + bit
+            if nxt <= n and self._tree[nxt] <= remaining:
+                pos = nxt
+                remaining -= self._tree[nxt]
+            bit >>= 1
+        return min(pos, n - 1)
+
+
+class VirtualTranscript:
+    """Scrollable chat transcript that only keeps visible bubbles alive.
+
+    Message data lives in a ``TranscriptModel``. On every scroll or resize the
+    view binds the visible range (plus ``overscan`` rows) to pooled ``Label``
+    widgets placed on a canvas and returns the rest to the pool, so the widget
+    count stays constant however long the session gets. The message currently
+    being streamed is shown in a dedicated ``Text`` widget that receives
+    deltas instead of full rewrites.
+    """
+
+    def __init__(self, parent, bg: str = "#f0f0f0", wraplength: int = 300, overscan: int = 3):
+        self.bg = bg
+        self.wraplength = wraplength
+        self.overscan = overscan
+        self.spacing = 14  # Vertical padding around each bubble
+        self.model = TranscriptModel()
+
+        self.frame = tk.Frame(parent, bg=bg)
+        self.canvas = tk.Canvas(self.frame, bg=bg, highlightthickness=0, yscrollincrement=20)
+        self.scrollbar = tk.Scrollbar(self.frame, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._on_yscroll)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.bind("<Configure>", lambda e: self.schedule_render())
+
+        self.font = tkfont.nametofont("TkDefaultFont")
+        self._char_width = max(1, self.font.measure("0"))
+        self._line_height = self.font.metrics("linespace")
+
+        self._pool: List[Tuple[tk.Label, int]] = []
+        self._bound: Dict[int, Tuple[tk.Label, int]] = {}
+        self._stream_widget: Optional[tk.Text] = None
+        self._stream_item: Optional[int] = None
+        self._render_pending = False
+
+    def pack(self, **kwargs) -> None:
+        self.frame.pack(**kwargs)
+
+    # Model updates
+
+    def estimate_height(self, text: str) -> int:
+        """Bubble height estimate used until the bubble is first measured"""
+        chars_per_line = max(1, self.wraplength // self._char_width)
+        lines = sum(max(1, math.ceil(len(line) / chars_per_line)) for line in text.split("\n"))
+        return lines * self._line_height + self.spacing + 10
+
+    def append(self, sender: str, message: str, right: bool = False) -> int:
+        text = f"{sender}: {message}"
+        index = self.model.append(sender, text, right, self.estimate_height(text))
+        self._after_append()
+        return index
+
+    def begin_stream(self, sender: str, delta: str = "") -> None:
+        self.model.begin_stream(sender, self.estimate_height(f"{sender}: {delta}"))
+        self.model.stream(f"{sender}: ")
+        widget = self._get_stream_widget()
+        widget.config(state="normal")
+        widget.delete("1.0", "end")
+        widget.insert("end", f"{sender}: ")
+        widget.config(state="disabled")
+        self.stream(delta)
+        self._after_append()
+
+    def stream(self, delta: str) -> None:
+        """Append a delta to the streaming message"""
+        index = self.model.streaming_index
+        if index is None or not delta:
+            return
+        self.model.stream(delta)
+        widget = self._get_stream_widget()
+        widget.config(state="normal")
+        widget.insert("end", delta)
+        widget.config(state="disabled")
+
+        if widget.winfo_ismapped():
+            lines = widget.count("1.0", "end", "displaylines")
+            if isinstance(lines, tuple):
+                lines = lines[0]
+            widget.config(height=max(1, lines or 1))
+            self.model.set_height(index, widget.winfo_reqheight() + self.spacing)
+        else:
+            self.model.set_height(index, self.estimate_height(self.model.text(index)))
+        self._update_scrollregion()
+        self.scroll_to_end()
+
+    def end_stream(self) -> None:
+        if self.model.streaming_index is None:
+            return
+        self.model.end_stream()
+        if self._stream_item is not None:
+            self.canvas.itemconfigure(self._stream_item, state="hidden")
+        self.schedule_render()
+
+    def scroll(self, units: int) -> None:
+        self.canvas.yview_scroll(units, "units")
+
+    def scroll_to_end(self) -> None:
+        self.canvas.yview_moveto(1.0)
+        self.schedule_render()
+
+    # Rendering
+
+    def _after_append(self) -> None:
+        self._update_scrollregion()
+        self.scroll_to_end()
+
+    def _update_scrollregion(self) -> None:
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), self.model.total_height))
+
+    def _on_yscroll(self, first, last) -> None:
+        self.scrollbar.set(first, last)
+        self.schedule_render()
+
+    def schedule_render(self) -> None:
+        if not self._render_pending:
+            self._render_pending = True
+            self.canvas.after_idle(self.render)
+
+    def visible_range(self) -> Tuple[int, int]:
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        last_index = len(self.model) - 1
+        first = max(0, self.model.index_at(top) - self.overscan)
+        last = min(last_index, self.model.index_at(bottom) + self.overscan)
+        return first, last
+
+    def render(self) -> None:
+        """Bind the visible messages to widgets and recycle the rest"""
+        self._render_pending = False
+        if not len(self.model):
+            return
+        first, last = self.visible_range()
+
+        for index in [i for i in self._bound if i < first or i > last]:
+            label, item = self._bound.pop(index)
+            self.canvas.itemconfigure(item, state="hidden")
+            self._pool.append((label, item))
+
+        width = self.canvas.winfo_width()
+        streaming = self.model.streaming_index
+        heights_changed = False
+        for index in range(first, last + 1):
+            right = self.model.is_right(index)
+            x = width - 10 if right else 10
+            anchor = "ne" if right else "nw"
+
+            if index == streaming:
+                self._get_stream_widget()
+                self.canvas.coords(self._stream_item, x, self.model.top(index) + self.spacing // 2)
+                self.canvas.itemconfigure(self._stream_item, state="normal", anchor=anchor)
+                continue
+
+            entry = self._bound.get(index)
+            if entry is None:
+                entry = self._acquire()
+                self._bind(entry[0], index)
+                self._bound[index] = entry
+            label, item = entry
+
+            height = label.winfo_reqheight() + self.spacing
+            if height != self.model.height(index):
+                self.model.set_height(index, height)
+                heights_changed = True
+            self.canvas.coords(item, x, self.model.top(index) + self.spacing // 2)
+            self.canvas.itemconfigure(item, state="normal", anchor=anchor)
+
+        if heights_changed:
+            self._update_scrollregion()
+
+    def _acquire(self) -> Tuple[tk.Label, int]:
+        if self._pool:
+            return self._pool.pop()
+        label = tk.Label(self.canvas, padx=10, pady=5, wraplength=self.wraplength)
+        item = self.canvas.create_window(0, 0, window=label, anchor="nw")
+        return label, item
+
+    def _bind(self, label: tk.Label, index: int) -> None:
+        right = self.model.is_right(index)
+        label.config(
+            text=self.model.text(index),
+            justify="right" if right else "left",
+            bg="#add8e6" if self.model.sender(index) == "Alfred" else "#90ee90"
+        )
+
+    def _get_stream_widget(self) -> tk.Text:
+        if self._stream_widget is None:
+            self._stream_widget = tk.Text(
+                self.canvas,
+                width=42,
+                height=1,
+                wrap="word",
+                padx=10,
+                pady=5,
+                borderwidth=0,
+                highlightthickness=0,
+                bg="#add8e6",
+                state="disabled"
+            )
+            self._stream_item = self.canvas.create_window(
+                0, 0, window=self._stream_widget, anchor="nw", state="hidden"
+            )
+        return self._stream_widget
+
+    @property
+    def widget_count(self) -> int:
+        """Number of bubble widgets currently alive"""
+        return len(self._pool) + len(self._bound) + (1 if self._stream_widget else 0)